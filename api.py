@@ -0,0 +1,246 @@
+import json
+from datetime import datetime
+
+from flask import Blueprint, Response, abort, request
+from werkzeug.exceptions import HTTPException
+
+from cache import add_cache_tags, response_cache
+from export import EXPORTS
+from matchmaking import matches
+from models import db, Venue, Artist, Show
+from pagination import paginate_request
+
+try:
+    import orjson
+except ImportError:  # optional; falls back to the json module
+    orjson = None
+
+# ----------------------------------------------------------------------------#
+# JSON API.
+# ----------------------------------------------------------------------------#
+
+# Resources are read as plain column rows: `fields=` picks the columns (id is
+# always included) and related tables are only joined when one of their
+# columns is asked for. `include=shows` adds each venue's/artist's shows with
+# one more query for the whole page. Lists are keyset-paginated by id.
+
+api = Blueprint("api", __name__, url_prefix="/api/v1")
+
+
+def _columns(model, names):
+    return {name: getattr(model, name) for name in names}
+
+
+FIELDS = {
+    "venues": _columns(
+        Venue, EXPORTS["venues"][1] + ("upcoming_shows_count", "past_shows_count")
+    ),
+    "artists": _columns(
+        Artist, EXPORTS["artists"][1] + ("upcoming_shows_count", "past_shows_count")
+    ),
+    "shows": dict(
+        _columns(Show, EXPORTS["shows"][1]),
+        venue_name=Venue.name,
+        venue_image_link=Venue.image_link,
+        artist_name=Artist.name,
+        artist_image_link=Artist.image_link,
+    ),
+}
+
+MODELS = {"venues": Venue, "artists": Artist, "shows": Show}
+
+# include=shows: the owner's key on Show, and the other side of each show.
+SHOW_KEYS = {
+    "venues": (Show.venue_id, Artist, Show.artist_id, "artist"),
+    "artists": (Show.artist_id, Venue, Show.venue_id, "venue"),
+}
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, default=_json_default, separators=(",", ":")).encode()
+
+
+def json_response(data, status=200):
+    return Response(dumps(data), status=status, mimetype="application/json")
+
+
+# The app's own 404/500 handlers render HTML; code handlers take precedence
+# over exception classes, so they are overridden here by code.
+@api.errorhandler(404)
+@api.errorhandler(500)
+@api.errorhandler(HTTPException)
+def api_error(error):
+    return json_response({"error": error.description}, error.code)
+
+
+def _requested_fields(kind):
+    fields = FIELDS[kind]
+    names = request.args.get("fields")
+    if not names:
+        return fields
+    names = ["id"] + [name for name in names.split(",") if name and name != "id"]
+    unknown = [name for name in names if name not in fields]
+    if unknown:
+        abort(400, f"Unknown fields: {', '.join(unknown)}")
+    return {name: fields[name] for name in names}
+
+
+def _includes(kind):
+    includes = set(filter(None, request.args.get("include", "").split(",")))
+    unknown = includes - ({"shows"} if kind in SHOW_KEYS else set())
+    if unknown:
+        abort(400, f"Unknown include: {', '.join(sorted(unknown))}")
+    return includes
+
+
+def _query(kind, fields):
+    model = MODELS[kind]
+    query = db.session.query(
+        *[column.label(name) for name, column in fields.items()]
+    ).select_from(model)
+    tables = {column.table for column in fields.values()}
+    if kind == "shows":
+        if Venue.__table__ in tables:
+            query = query.join(Venue, Show.venue_id == Venue.id)
+        if Artist.__table__ in tables:
+            query = query.join(Artist, Show.artist_id == Artist.id)
+    return query
+
+
+def _shows_by_owner(kind, ids):
+    # One query for the shows of every venue/artist on the page.
+    key, other, other_key, side = SHOW_KEYS[kind]
+    rows = (
+        db.session.query(
+            key.label("owner_id"),
+            Show.id,
+            Show.start_time,
+            other.id.label(f"{side}_id"),
+            other.name.label(f"{side}_name"),
+            other.image_link.label(f"{side}_image_link"),
+        )
+        .join(other, other.id == other_key)
+        .filter(key.in_(ids))
+        .order_by(Show.start_time, Show.id)
+    )
+    shows = {}
+    for row in rows:
+        show = row._asdict()
+        shows.setdefault(show.pop("owner_id"), []).append(show)
+        add_cache_tags(f"{side}:{show[side + '_id']}")
+    return shows
+
+
+def _serialize(kind, rows, includes):
+    items = [row._asdict() for row in rows]
+    if "shows" in includes:
+        shows = _shows_by_owner(kind, [item["id"] for item in items])
+        for item in items:
+            item["shows"] = shows.get(item["id"], [])
+    return items
+
+
+def list_view(kind):
+    fields = _requested_fields(kind)
+    includes = _includes(kind)
+    page = paginate_request(_query(kind, fields), (MODELS[kind].id,))
+    return json_response(
+        {
+            "data": _serialize(kind, page.items, includes),
+            "links": {
+                "next": page.next_cursor and page.url(page.next_cursor),
+                "prev": page.prev_cursor and page.url(page.prev_cursor),
+            },
+        }
+    )
+
+
+def matches_view(model, entity_id):
+    # ?limit= (1-100, default 10); ?seeking=0 also ranks candidates that
+    # aren't looking for a booking.
+    limit = max(1, min(request.args.get("limit", 10, type=int), 100))
+    found = matches(model, entity_id, limit, request.args.get("seeking") != "0")
+    if found is None:
+        abort(404, f"No {model.__tablename__.lower()} {entity_id}")
+    return json_response(
+        {
+            "data": [
+                {"id": match_id, "name": name, "score": score}
+                for match_id, name, score in found
+            ]
+        }
+    )
+
+
+def detail_view(kind, entity_id):
+    fields = _requested_fields(kind)
+    includes = _includes(kind)
+    row = _query(kind, fields).filter(MODELS[kind].id == entity_id).first()
+    if row is None:
+        abort(404, f"No {kind[:-1]} {entity_id}")
+    return json_response({"data": _serialize(kind, [row], includes)[0]})
+
+
+# ----------------------------------------------------------------------------#
+# Routes.
+# ----------------------------------------------------------------------------#
+
+# Lists depend on the show counters and on names across tables, so they are
+# also invalidated with "shows".
+
+
+@api.route("/venues")
+@response_cache.cached(lambda: ["venues", "shows"])
+def venues():
+    return list_view("venues")
+
+
+@api.route("/venues/<int:venue_id>")
+@response_cache.cached(lambda venue_id: [f"venue:{venue_id}"])
+def venue(venue_id):
+    return detail_view("venues", venue_id)
+
+
+# Matches rank the whole other side, and use past shows together.
+@api.route("/venues/<int:venue_id>/matches")
+@response_cache.cached(lambda venue_id: [f"venue:{venue_id}", "artists", "shows"])
+def venue_matches(venue_id):
+    return matches_view(Venue, venue_id)
+
+
+@api.route("/artists")
+@response_cache.cached(lambda: ["artists", "shows"])
+def artists():
+    return list_view("artists")
+
+
+@api.route("/artists/<int:artist_id>")
+@response_cache.cached(lambda artist_id: [f"artist:{artist_id}"])
+def artist(artist_id):
+    return detail_view("artists", artist_id)
+
+
+@api.route("/artists/<int:artist_id>/matches")
+@response_cache.cached(lambda artist_id: [f"artist:{artist_id}", "venues", "shows"])
+def artist_matches(artist_id):
+    return matches_view(Artist, artist_id)
+
+
+@api.route("/shows")
+@response_cache.cached(lambda: ["shows", "venues", "artists"])
+def shows():
+    return list_view("shows")
+
+
+@api.route("/shows/<int:show_id>")
+@response_cache.cached(lambda show_id: ["shows", "venues", "artists"])
+def show(show_id):
+    return detail_view("shows", show_id)
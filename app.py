@@ -2,14 +2,54 @@
 # Imports
 # ----------------------------------------------------------------------------#
 
+import hmac
 import json
-import dateutil.parser
-import babel
-from flask import Flask, render_template, request, Response, flash, redirect, url_for
+from datetime import datetime, timedelta
+from functools import partial, wraps
+from itertools import groupby
+from flask import (
+    Flask,
+    abort,
+    current_app,
+    render_template,
+    request,
+    Response,
+    flash,
+    redirect,
+    url_for,
+    jsonify,
+    stream_with_context,
+)
 from flask_moment import Moment
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
-from models import db, Venue, Artist, Show
+from models import db, Area, Venue, Artist, Show
+from loading import query_for
+from pagination import paginate_request
+from counters import counters_cli, forget, record_show
+from search import search
+import areas
+from genres import genre_facets, with_genres
+from scheduling import booked_for, conflict_errors, find_conflicts, show_end
+from cache import add_cache_tags, response_cache
+from instrumentation import instrumentation
+import metrics
+import templating
+import assets
+from autocomplete import NAME_INDEXES, artist_names, venue_names
+from matchmaking import CANDIDATES, artist_candidates, venue_candidates
+from conditional import conditional
+from formatting import format_datetime
+from importer import import_command
+from api import api
+from export import EXPORTS, MIMETYPES, export, export_command, parse_since
+from queries import (
+    artist_page_state,
+    calendar,
+    in_window,
+    parse_window,
+    venue_page_state,
+)
 import logging
 from logging import Formatter, FileHandler
 from flask_wtf import FlaskForm as Form
@@ -21,30 +61,116 @@ from forms import *
 # App Config.
 # ----------------------------------------------------------------------------#
 
-app = Flask(__name__)
-moment = Moment(app)
-app.config.from_object("config")
-db.init_app(app)
-migrate = Migrate(app, db)
+moment = Moment()
+migrate = Migrate()
 
+# Views are collected by route() and errorhandler() and added to each app by
+# create_app(), keeping their plain endpoint names ("venues", not a
+# blueprint's "main.venues") that templates and the API link to.
+ROUTES = []
+ERROR_HANDLERS = []
+
+
+def route(rule, **options):
+    def register(view):
+        ROUTES.append((rule, view, options))
+        return view
+
+    return register
+
+
+def errorhandler(code):
+    def register(handler):
+        ERROR_HANDLERS.append((code, handler))
+        return handler
+
+    return register
+
+
+def build_indexes():
+    # The in-process autocomplete and matchmaking indexes, built before the
+    # first request rather than by it, unless server.warm() did before forking.
+    for index in [*NAME_INDEXES.values(), *CANDIDATES.values()]:
+        index.ensure_built()
+
+
+def create_app(config="config"):
+    # `config` is an import path or object, as for app.config.from_object.
+    app = Flask(__name__)
+    app.config.from_object(config)
+    if not app.config.get("SECRET_KEY"):
+        # Sessions and flashed messages are signed with it, so every worker
+        # must share one.
+        raise RuntimeError("SECRET_KEY must be set outside debug mode.")
+    moment.init_app(app)
+    db.init_app(app)
+    migrate.init_app(app, db)
+    response_cache.init_app(app)
+    instrumentation.init_app(app)
+    metrics.init_app(app)
+    metrics.registry.samplers.update(
+        pool=partial(metrics.pool_gauges, db, app),
+        cache=partial(metrics.cache_samples, response_cache),
+    )
+    assets.init_app(app)
+    app.cli.add_command(counters_cli)
+    app.cli.add_command(import_command)
+    app.cli.add_command(export_command)
+    app.register_blueprint(api)
+    for rule, view, options in ROUTES:
+        app.add_url_rule(rule, view_func=view, **options)
+    for code, handler in ERROR_HANDLERS:
+        app.register_error_handler(code, handler)
+    app.before_first_request(build_indexes)
+    app.jinja_env.filters["datetime"] = format_datetime
+    # After the filters: templates are compiled here, and need them.
+    templating.init_app(app)
+    if not app.debug:
+        file_handler = FileHandler("error.log")
+        file_handler.setFormatter(
+            Formatter(
+                "%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]"
+            )
+        )
+        app.logger.setLevel(logging.INFO)
+        file_handler.setLevel(logging.INFO)
+        app.logger.addHandler(file_handler)
+        app.logger.info("errors")
+    return app
 
-# TODO: connect to a local postgresql database
 
 # ----------------------------------------------------------------------------#
-# Filters.
+# Helpers.
 # ----------------------------------------------------------------------------#
 
 
-def format_datetime(value, format="medium"):
-    date = dateutil.parser.parse(value)
-    if format == "full":
-        format = "EEEE MMMM, d, y 'at' h:mma"
-    elif format == "medium":
-        format = "EE MM, dd, y h:mma"
-    return babel.dates.format_datetime(date, format, locale="en")
+def internal(view):
+    # Operational and bulk endpoints take `Authorization: Bearer
+    # <INTERNAL_TOKEN>`. Without a token configured they are only served in
+    # debug mode.
+    @wraps(view)
+    def wrapper(**view_args):
+        token = current_app.config["INTERNAL_TOKEN"]
+        if not token:
+            if not current_app.debug:
+                abort(404)
+        elif not hmac.compare_digest(
+            request.headers.get("Authorization", "").encode(),
+            f"Bearer {token}".encode(),
+        ):
+            abort(403)
+        return view(**view_args)
+
+    return wrapper
 
 
-app.jinja_env.filters["datetime"] = format_datetime
+def stream_template(template_name, **context):
+    # Renders a template as a generator so the response body can be sent
+    # while the view's rows are still being read.
+    current_app.update_template_context(context)
+    stream = current_app.jinja_env.get_template(template_name).stream(context)
+    stream.enable_buffering(5)
+    return stream
 
 
 # ----------------------------------------------------------------------------#
@@ -52,57 +178,121 @@ app.jinja_env.filters["datetime"] = format_datetime
 # ----------------------------------------------------------------------------#
 
 
-@app.route("/")
+@route("/")
 def index():
     return render_template("pages/home.html")
 
 
-#  Venues
+#  Genre filters
 #  ----------------------------------------------------------------
 
 
-@app.route("/venues")
-def venues():
-    # TODO: replace with real venues data.
-    #       num_upcoming_shows should be aggregated based on number of upcoming shows per venue.
-    areas = db.session.query(Venue).all()
-    final_areas = []
-
-    data = {}
-    for area in areas:
-        city = area.city
-        state = area.state
-        if city not in data:
-            data[city] = {"state": state, "venues": []}
-        data[city]["venues"].append(
+def genre_filter():
+    # ?genre=Jazz&genre=Blues keeps rows with all of them, or with any of
+    # them given genre_match=any.
+    return request.args.getlist("genre"), request.args.get("genre_match") == "any"
+
+
+def genre_facet_links(model, genres, match_any):
+    # The facet sidebar: each genre's count, and a link toggling it.
+    links = []
+    for genre, count in genre_facets(model, genres, match_any):
+        selected = genre in genres
+        chosen = [g for g in genres if g != genre] if selected else genres + [genre]
+        args = {"genre": chosen}
+        if match_any:
+            args["genre_match"] = "any"
+        links.append(
             {
-                "id": area.id,
-                "name": area.name,
-                "num_upcoming_shows": (
-                    db.session.query(func.count(Show.id))
-                    .filter(Show.venue_id == Venue.id)
-                    .filter(Show.start_time > datetime.now())
-                    .scalar()
-                ),
+                "genre": genre,
+                "count": count,
+                "selected": selected,
+                "url": url_for(request.endpoint, **args),
             }
         )
-    for city in data.keys():
-        final_areas.append(
-            dict(city=city, state=data[city]["state"], venues=data[city]["venues"])
+    return links
+
+
+#  Venues
+#  ----------------------------------------------------------------
+
+
+@route("/venues")
+@response_cache.cached(lambda: ["venues", "shows"])
+def venues():
+    # The directory's top level: one row per (city, state), from the Area
+    # summary, or grouped in SQL when filtering by genre. Each area's venues
+    # are loaded on demand from venue_area().
+    genres, match_any = genre_filter()
+    if genres:
+        area_query = with_genres(
+            db.session.query(
+                Venue.state,
+                Venue.city,
+                func.count(Venue.id).label("venue_count"),
+                func.sum(Venue.upcoming_shows_count).label("upcoming_shows_count"),
+            ),
+            Venue,
+            genres,
+            match_any,
+        ).group_by(Venue.state, Venue.city)
+        keys = (Venue.state, Venue.city)
+    else:
+        area_query = db.session.query(
+            Area.state, Area.city, Area.venue_count, Area.upcoming_shows_count
         )
+        keys = (Area.state, Area.city)
+    area_list = paginate_request(area_query, keys)
+    return render_template(
+        "pages/venues.html",
+        areas=area_list,
+        page=area_list,
+        facets=genre_facet_links(Venue, genres, match_any),
+    )
 
-    return render_template("pages/venues.html", areas=final_areas)
 
+@route("/venues/areas/<state>/<city>")
+@response_cache.cached(lambda state, city: ["venues", "shows"])
+def venue_area(state, city):
+    # One area's venues by name; ?partial=1 renders just the list, for the
+    # directory to expand in place.
+    genres, match_any = genre_filter()
+    venue_list = paginate_request(
+        with_genres(
+            db.session.query(
+                Venue.id,
+                Venue.name,
+                Venue.upcoming_shows_count.label("num_upcoming_shows"),
+            ).filter(Venue.state == state, Venue.city == city),
+            Venue,
+            genres,
+            match_any,
+        ),
+        (Venue.name, Venue.id),
+    )
+    template = "pages/venue_area.html"
+    if request.args.get("partial"):
+        template = "pages/area_venues.html"
+    return render_template(
+        template, city=city, state=state, venues=venue_list, page=venue_list
+    )
 
-@app.route("/venues/search", methods=["POST"])
+
+@route("/venues/search", methods=["POST"])
 def search_venues():
     # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
     # search for Hop should return "The Musical Hop".
     # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
     search_term = request.form.get("search_term", "")
+    matches = search(Venue, search_term)
     searched_venues = (
-        db.session.query(Venue)
-        .filter(func.lower(Venue.name).like(f"%{search_term}%"))
+        db.session.query(
+            Venue.id,
+            Venue.name,
+            Venue.upcoming_shows_count.label("num_upcoming_shows"),
+        )
+        .join(matches, matches.c.id == Venue.id)
+        .order_by(matches.c.rank.desc(), Venue.id)
         .all()
     )
 
@@ -112,12 +302,7 @@ def search_venues():
             {
                 "id": venue.id,
                 "name": venue.name,
-                "num_upcoming_shows": (
-                    db.session.query(func.count(Show.id))
-                    .filter(Show.venue_id == venue.id)
-                    .filter(Show.start_time > datetime.now())
-                    .scalar()
-                ),
+                "num_upcoming_shows": venue.num_upcoming_shows,
             }
         )
 
@@ -128,11 +313,13 @@ def search_venues():
     )
 
 
-@app.route("/venues/<int:venue_id>")
+@route("/venues/<int:venue_id>")
+@conditional(venue_page_state)
+@response_cache.cached(lambda venue_id: [f"venue:{venue_id}"])
 def show_venue(venue_id):
     # shows the venue page with the given venue_id
     # TODO: replace with real venue data from the venues table, using venue_id
-    venue = Venue.query.filter(Venue.id == venue_id).first()
+    venue = query_for(Venue, "detail").filter(Venue.id == venue_id).first()
     past_shows = (
         db.session.query(Show, Artist)
         .join(Artist, Show.artist_id == Artist.id)
@@ -148,6 +335,10 @@ def show_venue(venue_id):
         .all()
     )
 
+    add_cache_tags(
+        *(f"artist:{artist.id}" for _, artist in past_shows + upcoming_shows)
+    )
+
     past = []
     for show, artist in past_shows:
         past.append(
@@ -155,7 +346,7 @@ def show_venue(venue_id):
                 "artist_id": artist.id,
                 "artist_name": artist.name,
                 "artist_image_link": artist.image_link,
-                "start_time": str(show.start_time),
+                "start_time": show.start_time,
             }
         )
 
@@ -166,7 +357,7 @@ def show_venue(venue_id):
                 "artist_id": artist.id,
                 "artist_name": artist.name,
                 "artist_image_link": artist.image_link,
-                "start_time": str(show.start_time),
+                "start_time": show.start_time,
             }
         )
 
@@ -194,13 +385,13 @@ def show_venue(venue_id):
 #  ----------------------------------------------------------------
 
 
-@app.route("/venues/create", methods=["GET"])
+@route("/venues/create", methods=["GET"])
 def create_venue_form():
     form = VenueForm()
     return render_template("forms/new_venue.html", form=form)
 
 
-@app.route("/venues/create", methods=["POST"])
+@route("/venues/create", methods=["POST"])
 def create_venue_submission():
     # TODO: insert form data as a new Venue record in the db, instead
     # TODO: modify data to be the data object returned from db insertion
@@ -222,7 +413,11 @@ def create_venue_submission():
             )
 
             db.session.add(venue)
+            areas.refresh([(venue.city, venue.state)])
             db.session.commit()
+            response_cache.invalidate("venues")
+            venue_names.add(venue.id, venue.name)
+            venue_candidates.update(venue.id)
             flash("Venue " + request.form["name"] + " was successfully listed!")
         except ValueError as e:
             flash(
@@ -250,13 +445,19 @@ def create_venue_submission():
     # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
 
 
-@app.route("/venues/<venue_id>", methods=["DELETE"])
+@route("/venues/<venue_id>", methods=["DELETE"])
 def delete_venue(venue_id):
     # TODO: Complete this endpoint for taking a venue_id, and using
     # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
     try:
+        venue_areas = areas.areas_of([venue_id])
+        forget(Venue, venue_id)
         Venue.query.filter_by(id=venue_id).delete()
+        areas.refresh(venue_areas)
         db.session.commit()
+        response_cache.invalidate(f"venue:{venue_id}", "venues", "shows")
+        venue_names.remove(int(venue_id))
+        venue_candidates.remove(int(venue_id))
     except:
         db.session.rollback()
     finally:
@@ -269,36 +470,44 @@ def delete_venue(venue_id):
 
 #  Artists
 #  ----------------------------------------------------------------
-@app.route("/artists")
+@route("/artists")
+@response_cache.cached(lambda: ["artists"])
 def artists():
     # TODO: replace with real data returned from querying the database
-    # artist_list = Artist.query.with_entities(Artist.id, Artist.name)
-    artist_list = Artist.query.all()
-    artist_dic = {}
+    genres, match_any = genre_filter()
+    artist_list = paginate_request(
+        with_genres(
+            db.session.query(Artist.id, Artist.name), Artist, genres, match_any
+        ),
+        (Artist.name, Artist.id),
+    )
     data = []
     for artist in artist_list:
-        artist_id = artist.id
-        print(artist_id)
-        name = artist.name
-        if artist_id not in artist_dic:
-            artist_dic[artist_id] = {"id": artist_id, "name": name}
-    for artist_id in artist_dic.keys():
-        data.append(dict(id=artist_id, name=artist_dic[artist_id]["name"]))
+        data.append(dict(id=artist.id, name=artist.name))
 
-    print(data)
-
-    return render_template("pages/artists.html", artists=data)
+    return render_template(
+        "pages/artists.html",
+        artists=data,
+        page=artist_list,
+        facets=genre_facet_links(Artist, genres, match_any),
+    )
 
 
-@app.route("/artists/search", methods=["POST"])
+@route("/artists/search", methods=["POST"])
 def search_artists():
     # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
     # search for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
     # search for "band" should return "The Wild Sax Band".
     search_term = request.form.get("search_term", "")
+    matches = search(Artist, search_term)
     searched_artists = (
-        db.session.query(Artist)
-        .filter(func.lower(Artist.name).ilike(f"%{search_term}%"))
+        db.session.query(
+            Artist.id,
+            Artist.name,
+            Artist.upcoming_shows_count.label("num_upcoming_shows"),
+        )
+        .join(matches, matches.c.id == Artist.id)
+        .order_by(matches.c.rank.desc(), Artist.id)
         .all()
     )
     response = {"count": len(searched_artists), "data": []}
@@ -307,12 +516,7 @@ def search_artists():
             {
                 "id": artist.id,
                 "name": artist.name,
-                "num_upcoming_shows": (
-                    db.session.query(func.count(Show.id))
-                    .filter(Show.artist_id == artist.id)
-                    .filter(Show.start_time > datetime.now())
-                    .scalar()
-                ),
+                "num_upcoming_shows": artist.num_upcoming_shows,
             }
         )
     return render_template(
@@ -322,11 +526,13 @@ def search_artists():
     )
 
 
-@app.route("/artists/<int:artist_id>")
+@route("/artists/<int:artist_id>")
+@conditional(artist_page_state)
+@response_cache.cached(lambda artist_id: [f"artist:{artist_id}"])
 def show_artist(artist_id):
     # shows the artist page with the given artist_id
     # TODO: replace with real artist data from the artist table, using artist_id
-    artist = Artist.query.filter(Artist.id == artist_id).first()
+    artist = query_for(Artist, "detail").filter(Artist.id == artist_id).first()
     past_shows = (
         db.session.query(Show, Venue)
         .join(Venue, Show.venue_id == Venue.id)
@@ -343,6 +549,8 @@ def show_artist(artist_id):
         .all()
     )
 
+    add_cache_tags(*(f"venue:{venue.id}" for _, venue in past_shows + upcoming_shows))
+
     past = []
     for show, venue in past_shows:
         past.append(
@@ -350,7 +558,7 @@ def show_artist(artist_id):
                 "venue_id": venue.id,
                 "venue_name": venue.name,
                 "venue_image_link": venue.image_link,
-                "start_time": str(show.start_time),
+                "start_time": show.start_time,
             }
         )
 
@@ -361,7 +569,7 @@ def show_artist(artist_id):
                 "venue_id": venue.id,
                 "venue_name": venue.name,
                 "venue_image_link": venue.image_link,
-                "start_time": str(show.start_time),
+                "start_time": show.start_time,
             }
         )
 
@@ -387,19 +595,19 @@ def show_artist(artist_id):
 
 #  Update
 #  ----------------------------------------------------------------
-@app.route("/artists/<int:artist_id>/edit", methods=["GET"])
+@route("/artists/<int:artist_id>/edit", methods=["GET"])
 def edit_artist(artist_id):
     form = ArtistForm()
-    artist = Artist.query.filter(Artist.id == artist_id).first()
+    artist = query_for(Artist, "detail").filter(Artist.id == artist_id).first()
     # TODO: populate form with fields from artist with ID <artist_id>
     return render_template("forms/edit_artist.html", form=form, artist=artist)
 
 
-@app.route("/artists/<int:artist_id>/edit", methods=["POST"])
+@route("/artists/<int:artist_id>/edit", methods=["POST"])
 def edit_artist_submission(artist_id):
     # TODO: take values from the form submitted, and update existing
     # artist record with ID <artist_id> using the new attributes
-    artist = Artist.query.filter(Artist.id == artist_id).first()
+    artist = query_for(Artist, "detail").filter(Artist.id == artist_id).first()
     form = ArtistForm(request.form, meta={"csrf": False})
     if form.validate():
         try:
@@ -414,6 +622,9 @@ def edit_artist_submission(artist_id):
             artist.seeking_venue = form.seeking_venue.data
             artist.seeking_description = form.seeking_description.data
             db.session.commit()
+            response_cache.invalidate(f"artist:{artist_id}", "artists", "shows")
+            artist_names.add(artist_id, form.name.data)
+            artist_candidates.update(artist_id)
         except Exception as e:
             print("Error occurred:", e)
             db.session.rollback()
@@ -424,22 +635,23 @@ def edit_artist_submission(artist_id):
         return render_template("forms/edit_artist.html", form=form, artist=artist)
 
 
-@app.route("/venues/<int:venue_id>/edit", methods=["GET"])
+@route("/venues/<int:venue_id>/edit", methods=["GET"])
 def edit_venue(venue_id):
     form = VenueForm()
-    venue = Venue.query.filter(Venue.id == venue_id).first()
+    venue = query_for(Venue, "detail").filter(Venue.id == venue_id).first()
     # TODO: populate form with values from venue with ID <venue_id>
     return render_template("forms/edit_venue.html", form=form, venue=venue)
 
 
-@app.route("/venues/<int:venue_id>/edit", methods=["POST"])
+@route("/venues/<int:venue_id>/edit", methods=["POST"])
 def edit_venue_submission(venue_id):
     # TODO: take values from the form submitted, and update existing
     # venue record with ID <venue_id> using the new attributes
-    venue = Venue.query.filter(Venue.id == venue_id).first()
+    venue = query_for(Venue, "detail").filter(Venue.id == venue_id).first()
     form = VenueForm(request.form, meta={"csrf": False})
     if form.validate():
         try:
+            moved_from = (venue.city, venue.state)
             venue.name = form.name.data
             venue.city = form.city.data
             venue.state = form.state.data
@@ -451,8 +663,12 @@ def edit_venue_submission(venue_id):
             venue.facebook_link = form.facebook_link.data
             venue.seeking_talent = form.seeking_talent.data
             venue.seeking_description = form.seeking_description.data
+            areas.refresh({moved_from, (venue.city, venue.state)})
 
             db.session.commit()
+            response_cache.invalidate(f"venue:{venue_id}", "venues", "shows")
+            venue_names.add(venue_id, form.name.data)
+            venue_candidates.update(venue_id)
         except:
             db.session.rollback()
         finally:
@@ -465,13 +681,13 @@ def edit_venue_submission(venue_id):
 #  ----------------------------------------------------------------
 
 
-@app.route("/artists/create", methods=["GET"])
+@route("/artists/create", methods=["GET"])
 def create_artist_form():
     form = ArtistForm()
     return render_template("forms/new_artist.html", form=form)
 
 
-@app.route("/artists/create", methods=["POST"])
+@route("/artists/create", methods=["POST"])
 def create_artist_submission():
     # called upon submitting the new artist listing form
     # TODO: insert form data as a new Venue record in the db, instead
@@ -494,6 +710,9 @@ def create_artist_submission():
 
             db.session.add(artist)
             db.session.commit()
+            response_cache.invalidate("artists")
+            artist_names.add(artist.id, artist.name)
+            artist_candidates.update(artist.id)
             flash("Artist " + request.form["name"] + " was successfully listed!")
         except Exception as e:
             flash(
@@ -523,41 +742,49 @@ def create_artist_submission():
 #  ----------------------------------------------------------------
 
 
-@app.route("/shows")
+@route("/shows")
+@response_cache.cached(lambda: ["shows"])
 def shows():
-    # displays list of shows at /shows
-    # TODO: replace with real venues data.
-    shows_list = db.session.query(Show).all()
-    final_shows = []
-
-    for show in shows_list:
-        final_shows.append(
-            {
-                "venue_id": show.venue_id,
-                "venue_name": Venue.query.filter(show.venue_id == Venue.id)
-                .first()
-                .name,
-                "artist_id": show.artist_id,
-                "artist_name": Artist.query.filter(show.artist_id == Artist.id)
-                .first()
-                .name,
-                "artist_image_link": Artist.query.filter(show.artist_id == Artist.id)
-                .first()
-                .image_link,
-                "start_time": format_datetime(str(show.start_time)),
-            }
+    # displays list of shows at /shows, optionally only those starting in
+    # [from, to)
+    try:
+        start, end = parse_window(request.args.get("from"), request.args.get("to"))
+    except ValueError:
+        abort(400)
+    shows_list = paginate_request(
+        in_window(
+            db.session.query(
+                Show.id,
+                Show.start_time,
+                Show.venue_id,
+                Venue.name.label("venue_name"),
+                Show.artist_id,
+                Artist.name.label("artist_name"),
+                Artist.image_link.label("artist_image_link"),
+            )
+            .join(Venue, Show.venue_id == Venue.id)
+            .join(Artist, Show.artist_id == Artist.id),
+            start,
+            end,
+        ),
+        (Show.start_time, Show.id),
+        stream=True,
+    )
+    return Response(
+        stream_with_context(
+            stream_template("pages/shows.html", shows=shows_list, page=shows_list)
         )
-    return render_template("pages/shows.html", shows=final_shows)
+    )
 
 
-@app.route("/shows/create")
+@route("/shows/create")
 def create_shows():
     # renders form. do not touch.
     form = ShowForm()
     return render_template("forms/new_show.html", form=form)
 
 
-@app.route("/shows/create", methods=["POST"])
+@route("/shows/create", methods=["POST"])
 def create_show_submission():
     form = ShowForm(request.form, meta={"csrf": False})
     if form.validate():
@@ -565,10 +792,28 @@ def create_show_submission():
             artist_id=form.artist_id.data,
             venue_id=form.venue_id.data,
             start_time=form.start_time.data,
+            end_time=show_end(form.start_time.data, form.duration.data),
         )
         try:
+            booking = (
+                int(show.venue_id),
+                int(show.artist_id),
+                show.start_time,
+                show.end_time,
+            )
+            clash = find_conflicts([booking], booked_for([booking]))[0]
+            if clash is not None:
+                message = []
+                for field, err in conflict_errors(clash).items():
+                    message.append(field + " " + "|".join(err))
+                flash("Errors " + str(message))
+                return render_template("forms/new_show.html", form=form)
             db.session.add(show)
+            record_show(show)
             db.session.commit()
+            response_cache.invalidate(
+                "shows", f"venue:{show.venue_id}", f"artist:{show.artist_id}"
+            )
             flash("Show was successfully listed!")
         except Exception as e:
             db.session.rollback()
@@ -586,37 +831,149 @@ def create_show_submission():
     return render_template("pages/home.html")
 
 
-@app.errorhandler(404)
+#  Calendars
+#  ----------------------------------------------------------------
+
+
+def calendar_window():
+    # ?from=&to= as on /shows; a missing bound is CALENDAR_DAYS from the
+    # other one, or from today.
+    try:
+        start, end = parse_window(request.args.get("from"), request.args.get("to"))
+    except ValueError:
+        abort(400)
+    days = timedelta(days=current_app.config["CALENDAR_DAYS"])
+    if start is None:
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        start = today if end is None else end - days
+    if end is None:
+        end = start + days
+    if end - start > timedelta(days=current_app.config["MAX_CALENDAR_DAYS"]):
+        abort(400)
+    return start, end
+
+
+def render_calendar(model, entity_id, other_kind):
+    entity = db.session.query(model.id, model.name).filter(model.id == entity_id)
+    entity = entity.first() or abort(404)
+    start, end = calendar_window()
+    shows_list = calendar(model, entity_id, start, end).all()
+    add_cache_tags(*(f"{other_kind}:{show.other_id}" for show in shows_list))
+    days = [
+        (day, list(day_shows))
+        for day, day_shows in groupby(
+            shows_list,
+            lambda show: show.start_time.replace(
+                hour=0, minute=0, second=0, microsecond=0
+            ),
+        )
+    ]
+    span = end - start
+
+    def window_url(window_start, window_end):
+        return url_for(
+            request.endpoint,
+            **request.view_args,
+            **{"from": window_start.isoformat(), "to": window_end.isoformat()},
+        )
+
+    return render_template(
+        "pages/calendar.html",
+        entity=entity,
+        kind=model.__tablename__.lower(),
+        other_kind=other_kind,
+        days=days,
+        start=start,
+        end=end,
+        prev_url=window_url(start - span, start),
+        next_url=window_url(end, end + span),
+    )
+
+
+@route("/venues/<int:venue_id>/calendar")
+@response_cache.cached(lambda venue_id: [f"venue:{venue_id}"])
+def venue_calendar(venue_id):
+    return render_calendar(Venue, venue_id, "artist")
+
+
+@route("/artists/<int:artist_id>/calendar")
+@response_cache.cached(lambda artist_id: [f"artist:{artist_id}"])
+def artist_calendar(artist_id):
+    return render_calendar(Artist, artist_id, "venue")
+
+
+#  Export
+#  ----------------------------------------------------------------
+
+
+@route("/export/<kind>")
+@internal
+def export_catalog(kind):
+    fmt = request.args.get("format", "jsonl")
+    if kind not in EXPORTS or fmt not in MIMETYPES:
+        abort(404)
+    try:
+        since = parse_since(request.args.get("since"))
+    except ValueError:
+        abort(400)
+    return Response(
+        stream_with_context(export(kind, fmt, since)),
+        mimetype=MIMETYPES[fmt],
+        headers={"Content-Disposition": f"attachment; filename={kind}.{fmt}"},
+    )
+
+
+@route("/cache/stats")
+@internal
+def cache_stats():
+    return jsonify(response_cache.stats())
+
+
+@route("/metrics")
+@internal
+def prometheus_metrics():
+    return Response(
+        metrics.render(metrics.registry),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+#  Autocomplete
+#  ----------------------------------------------------------------
+
+
+@route("/autocomplete/<any(venues, artists):kind>")
+def autocomplete(kind):
+    limit = request.args.get(
+        "limit", current_app.config["AUTOCOMPLETE_LIMIT"], type=int
+    )
+    suggestions = NAME_INDEXES[kind].suggest(
+        request.args.get("q", ""), max(1, min(limit, 50))
+    )
+    return jsonify([{"id": id, "name": name} for id, name in suggestions])
+
+
+@route("/autocomplete/stats")
+@internal
+def autocomplete_stats():
+    return jsonify({kind: index.stats() for kind, index in NAME_INDEXES.items()})
+
+
+@errorhandler(404)
 def not_found_error(error):
     return render_template("errors/404.html"), 404
 
 
-@app.errorhandler(500)
+@errorhandler(500)
 def server_error(error):
     return render_template("errors/500.html"), 500
 
 
-if not app.debug:
-    file_handler = FileHandler("error.log")
-    file_handler.setFormatter(
-        Formatter("%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]")
-    )
-    app.logger.setLevel(logging.INFO)
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
-    app.logger.info("errors")
-
 # ----------------------------------------------------------------------------#
 # Launch.
 # ----------------------------------------------------------------------------#
 
-# Default port:
+# Development server; production runs gunicorn with gunicorn.conf.py (see
+# server.py).
 if __name__ == "__main__":
-    app.run()
-
-# Or specify port manually:
-"""
-if __name__ == '__main__':
-    port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port)
-"""
+    create_app().run()
@@ -0,0 +1,77 @@
+from sqlalchemy import exists, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.sql.functions import func
+
+from models import db, Area, Venue
+
+# ----------------------------------------------------------------------------#
+# Area summary.
+# ----------------------------------------------------------------------------#
+
+# The venue directory's top level reads one Area row per (city, state) with
+# its venue count and upcoming show count, instead of grouping every venue on
+# each request. Upcoming counts follow Venue.upcoming_shows_count: counters.py
+# passes every change on through adjust(). Anything that adds, removes or
+# moves venues recomputes the affected areas with refresh(), which upserts
+# them, so two requests refreshing the same area don't both insert its row.
+
+UPSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def adjust(venue_id, upcoming):
+    # Moves the upcoming show count of the venue's area by `upcoming`.
+    Area.query.filter(
+        exists().where(
+            Venue.id == venue_id, Venue.city == Area.city, Venue.state == Area.state
+        )
+    ).update(
+        {Area.upcoming_shows_count: Area.upcoming_shows_count + upcoming},
+        synchronize_session=False,
+    )
+
+
+def areas_of(venue_ids):
+    return set(
+        db.session.query(Venue.city, Venue.state)
+        .filter(Venue.id.in_(venue_ids))
+        .distinct()
+    )
+
+
+def refresh(areas=None):
+    # Recomputes the given (city, state) areas, or all of them, from Venue.
+    # Areas left without venues disappear.
+    db.session.flush()
+    summary = (
+        select(
+            Venue.state,
+            Venue.city,
+            func.count(Venue.id),
+            func.coalesce(func.sum(Venue.upcoming_shows_count), 0),
+        )
+        .where(Venue.city.isnot(None), Venue.state.isnot(None))
+        .group_by(Venue.state, Venue.city)
+    )
+    empty = Area.query.filter(
+        ~exists().where(Venue.city == Area.city, Venue.state == Area.state)
+    )
+    if areas is not None:
+        areas = [(city, state) for city, state in areas]
+        if not areas:
+            return
+        summary = summary.where(tuple_(Venue.city, Venue.state).in_(areas))
+        empty = empty.filter(tuple_(Area.city, Area.state).in_(areas))
+    upsert = UPSERTS[db.engine.dialect.name](Area).from_select(
+        [Area.state, Area.city, Area.venue_count, Area.upcoming_shows_count],
+        summary,
+    )
+    db.session.execute(
+        upsert.on_conflict_do_update(
+            index_elements=[Area.state, Area.city],
+            set_={
+                "venue_count": upsert.excluded.venue_count,
+                "upcoming_shows_count": upsert.excluded.upcoming_shows_count,
+            },
+        )
+    )
+    empty.delete(synchronize_session=False)
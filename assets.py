@@ -0,0 +1,350 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+import urllib.request
+
+import click
+from flask import current_app, request, send_from_directory, url_for
+from flask.cli import AppGroup
+from werkzeug.exceptions import NotFound
+
+try:
+    import brotli
+except ImportError:  # optional; .br siblings are only written when installed
+    brotli = None
+
+try:
+    import rcssmin
+except ImportError:  # optional; falls back to _minify_css
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:  # optional; scripts are only concatenated without it
+    rjsmin = None
+
+# ----------------------------------------------------------------------------#
+# Static asset pipeline.
+# ----------------------------------------------------------------------------#
+
+# `flask assets build` copies every file under static/ to ASSETS_DIR with its
+# content hash in the name (css/main.css -> css/main.3f2a9c1d0b7e.css), joins
+# and minifies the BUNDLES, and writes .gz/.br siblings of text files next to
+# them. manifest.json maps each source name to its built file. Templates
+# link through static_url() and bundle_urls(), which fall back to the plain
+# /static files when nothing has been built, so development needs no build.
+#
+# Built files never change under a name, so /assets serves them with a
+# one-year immutable Cache-Control, and picks the .br or .gz sibling the
+# client accepts instead of compressing per request.
+
+BUNDLES = {
+    "app.css": [
+        "vendor/fontawesome/css/all.min.css",
+        "css/bootstrap.min.css",
+        "css/layout.main.css",
+        "css/main.css",
+        "css/main.responsive.css",
+        "css/main.quickfix.css",
+    ],
+    # layouts/form.html: the same, with the Bootstrap theme on top.
+    "form.css": [
+        "vendor/fontawesome/css/all.min.css",
+        "css/bootstrap.min.css",
+        "css/bootstrap-theme.min.css",
+        "css/layout.main.css",
+        "css/main.css",
+        "css/main.responsive.css",
+        "css/main.quickfix.css",
+    ],
+    "head.js": [
+        "js/libs/modernizr-2.8.2.min.js",
+        "js/libs/moment.min.js",
+    ],
+    "app.js": [
+        "js/libs/jquery-1.11.1.min.js",
+        "js/libs/bootstrap-3.1.1.min.js",
+        "js/plugins.js",
+        "js/script.js",
+    ],
+}
+
+# Third-party files kept under static/ (committed) instead of loaded from a
+# CDN; `flask assets vendor --force` fetches the pinned versions again.
+FONTAWESOME = "https://use.fontawesome.com/releases/v5.15.4"
+VENDOR = {
+    "vendor/fontawesome/css/all.min.css": f"{FONTAWESOME}/css/all.min.css",
+    **{
+        f"vendor/fontawesome/webfonts/{font}{ext}": (
+            f"{FONTAWESOME}/webfonts/{font}{ext}"
+        )
+        for font in ("fa-brands-400", "fa-regular-400", "fa-solid-900")
+        for ext in (".eot", ".svg", ".ttf", ".woff", ".woff2")
+    },
+}
+
+MANIFEST = "manifest.json"
+COMPRESSIBLE = {".css", ".js", ".map", ".json", ".svg", ".txt", ".eot", ".ttf", ".otf"}
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+_manifest = (None, {})
+
+
+def manifest():
+    # {source name: built name}, re-read whenever a build replaces the file.
+    global _manifest
+    path = os.path.join(current_app.config["ASSETS_DIR"], MANIFEST)
+    try:
+        mtime = os.stat(path).st_mtime
+    except FileNotFoundError:
+        mtime = None
+    if mtime != _manifest[0]:
+        files = {}
+        if mtime is not None:
+            with open(path) as f:
+                files = json.load(f)
+        _manifest = (mtime, files)
+    return _manifest[1]
+
+
+def static_url(name):
+    built = manifest().get(name)
+    if built is None:
+        return url_for("static", filename=name)
+    return url_for("assets", filename=built)
+
+
+def bundle_urls(name):
+    # The built bundle, or each of its sources when it hasn't been built.
+    built = manifest().get(name)
+    if built is None:
+        return [url_for("static", filename=source) for source in BUNDLES[name]]
+    return [url_for("assets", filename=built)]
+
+
+# ----------------------------------------------------------------------------#
+# Building.
+# ----------------------------------------------------------------------------#
+
+
+def _fingerprint(name, data):
+    stem, ext = posixpath.splitext(name)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+
+
+def _write(directory, name, data):
+    # Built names are content hashes, so existing files are already right.
+    path = os.path.join(directory, *name.split("/"))
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    if posixpath.splitext(name)[1] not in COMPRESSIBLE:
+        return
+    variants = [(".gz", gzip.compress(data, 9, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", brotli.compress(data)))
+    for suffix, compressed in variants:
+        if len(compressed) < len(data):
+            with open(path + suffix, "wb") as f:
+                f.write(compressed)
+
+
+_CSS_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+_CSS_LITERALS = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'|/\*.*?\*/)""", re.S)
+_SOURCE_MAP = re.compile(
+    r"^\s*(?://[#@] sourceMappingURL=.*|/\*[#@] sourceMappingURL=.*?\*/)\s*$", re.M
+)
+
+
+def _rewrite_urls(source, css, files):
+    # Bundles are written at the top of ASSETS_DIR, so relative url()s are
+    # resolved against their source file and pointed at the built file (or
+    # at /static when there is none).
+    def replace(match):
+        target = match.group(2).strip()
+        if re.match(r"(?:[a-z][a-z0-9+.-]*:|/|#)", target, re.I):
+            return match.group(0)
+        path, suffix = re.match(r"([^?#]*)(.*)", target).groups()
+        name = posixpath.normpath(posixpath.join(posixpath.dirname(source), path))
+        built = files.get(name)
+        if built is None:
+            built = f"{current_app.static_url_path}/{name}"
+        return f'url("{built}{suffix}")'
+
+    return _CSS_URL.sub(replace, css)
+
+
+def _minify_css(css):
+    if rcssmin is not None:
+        return rcssmin.cssmin(css)
+    # Drops comments (but not /*! licences), then whitespace around
+    # punctuation, leaving strings alone. Odd parts are strings/comments.
+    parts = _CSS_LITERALS.split(css)
+    css = "".join(
+        part
+        for i, part in enumerate(parts)
+        if not (i % 2 and part.startswith("/*") and not part.startswith("/*!"))
+    )
+    parts = _CSS_LITERALS.split(css)
+    for i in range(0, len(parts), 2):
+        part = re.sub(r"\s+", " ", parts[i])
+        part = re.sub(r" ?([{};,>]) ?", r"\1", part)
+        parts[i] = part.replace(": ", ":").replace(";}", "}")
+    return "".join(parts).strip()
+
+
+def _minify_js(js):
+    return rjsmin.jsmin(js) if rjsmin is not None else js
+
+
+def _read(static, name):
+    try:
+        with open(os.path.join(static, *name.split("/")), encoding="utf-8") as f:
+            return _SOURCE_MAP.sub("", f.read())
+    except FileNotFoundError:
+        hint = " (run `flask assets vendor`)" if name in VENDOR else ""
+        raise FileNotFoundError(f"Missing static/{name}{hint}") from None
+
+
+def build(clean=False):
+    # Writes the fingerprinted files, bundles and manifest; returns the
+    # manifest. `clean` removes built files the new manifest doesn't use.
+    static = os.path.abspath(current_app.static_folder)
+    directory = os.path.abspath(current_app.config["ASSETS_DIR"])
+    files = {}
+    for root, dirs, names in os.walk(static):
+        dirs[:] = sorted(
+            name
+            for name in dirs
+            if not name.startswith(".") and os.path.join(root, name) != directory
+        )
+        for filename in sorted(names):
+            if filename.startswith("."):
+                continue
+            path = os.path.join(root, filename)
+            name = os.path.relpath(path, static).replace(os.sep, "/")
+            with open(path, "rb") as f:
+                data = f.read()
+            files[name] = _fingerprint(name, data)
+            _write(directory, files[name], data)
+    for name, sources in BUNDLES.items():
+        texts = [_read(static, source) for source in sources]
+        if name.endswith(".css"):
+            css = "\n".join(
+                _rewrite_urls(source, text, files)
+                for source, text in zip(sources, texts)
+            )
+            data = _minify_css(css)
+        else:
+            # A semicolon between scripts, in case one doesn't end with one.
+            data = "\n;\n".join(_minify_js(text) for text in texts)
+        data = data.encode()
+        files[name] = _fingerprint(name, data)
+        _write(directory, files[name], data)
+    if clean:
+        keep = set(files.values())
+        for root, _, names in os.walk(directory):
+            for filename in names:
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, directory).replace(os.sep, "/")
+                if name != MANIFEST and re.sub(r"\.(gz|br)$", "", name) not in keep:
+                    os.remove(path)
+    # Replaced in one step, so running workers never read half a manifest.
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, MANIFEST)
+    with open(path + ".tmp", "w") as f:
+        json.dump(files, f, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+    return files
+
+
+# ----------------------------------------------------------------------------#
+# Serving.
+# ----------------------------------------------------------------------------#
+
+
+def serve(filename):
+    if filename == MANIFEST:
+        raise NotFound()
+    directory = current_app.config["ASSETS_DIR"]
+    max_age = current_app.config["ASSETS_MAX_AGE"]
+    options = {
+        "mimetype": mimetypes.guess_type(filename)[0] or "application/octet-stream",
+        "max_age": max_age,
+    }
+    response = None
+    for encoding, suffix in ENCODINGS:
+        if not request.accept_encodings[encoding]:
+            continue
+        try:
+            response = send_from_directory(directory, filename + suffix, **options)
+        except NotFound:
+            continue
+        response.headers["Content-Encoding"] = encoding
+        break
+    if response is None:
+        response = send_from_directory(directory, filename, **options)
+    response.vary.add("Accept-Encoding")
+    response.headers["Cache-Control"] = f"public, max-age={max_age}, immutable"
+    return response
+
+
+# ----------------------------------------------------------------------------#
+# Commands.
+# ----------------------------------------------------------------------------#
+
+assets_cli = AppGroup("assets", help="Build and vendor static assets.")
+
+
+@assets_cli.command("build")
+@click.option("--clean", is_flag=True, help="Remove outdated built files.")
+def build_command(clean):
+    """Fingerprint, bundle and compress static files."""
+    try:
+        files = build(clean)
+    except FileNotFoundError as error:
+        raise click.ClickException(str(error))
+    directory = current_app.config["ASSETS_DIR"]
+    for name in BUNDLES:
+        path = os.path.join(directory, files[name])
+        sizes = [f"{os.path.getsize(path)} bytes"] + [
+            f"{suffix[1:]} {os.path.getsize(path + suffix)}"
+            for _, suffix in ENCODINGS
+            if os.path.exists(path + suffix)
+        ]
+        click.echo(f"{name} -> {files[name]} ({', '.join(sizes)})")
+    click.echo(f"Built {len(files)} files into {directory}.")
+
+
+@assets_cli.command("vendor")
+@click.option("--force", is_flag=True, help="Download files that exist already.")
+def vendor_command(force):
+    """Download the pinned third-party files into static/."""
+    for name, url in VENDOR.items():
+        path = os.path.join(current_app.static_folder, *name.split("/"))
+        if os.path.exists(path) and not force:
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with urllib.request.urlopen(url, timeout=30) as response:
+            with open(path + ".tmp", "wb") as f:
+                shutil.copyfileobj(response, f)
+        os.replace(path + ".tmp", path)
+        click.echo(f"{name} <- {url}")
+
+
+def init_app(app):
+    app.config.setdefault("ASSETS_DIR", os.path.join(app.static_folder, "dist"))
+    app.config.setdefault("ASSETS_URL_PATH", "/assets")
+    app.config.setdefault("ASSETS_MAX_AGE", 365 * 24 * 3600)
+    app.add_url_rule(
+        f"{app.config['ASSETS_URL_PATH']}/<path:filename>", "assets", serve
+    )
+    app.jinja_env.globals.update(static_url=static_url, bundle_urls=bundle_urls)
+    app.cli.add_command(assets_cli)
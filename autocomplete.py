@@ -0,0 +1,143 @@
+import sys
+import threading
+import time
+from bisect import bisect_left
+
+from flask import current_app
+
+from cache import response_cache
+from models import db, Venue, Artist
+
+# ----------------------------------------------------------------------------#
+# Name prefix index.
+# ----------------------------------------------------------------------------#
+
+# A sorted array of case-folded keys, one for each word start of each name
+# ("the musical hop", "musical hop", "hop"), with the row id at the same
+# position in a parallel array. Suggestions are a bisect to the first key with
+# the prefix and a short scan. The app builds it before its first request
+# (server.warm() already has in a preloaded gunicorn master), and handlers in
+# this process update it as they write; it's rebuilt from the database once it's older than
+# AUTOCOMPLETE_MAX_AGE seconds, which picks up writes from other workers, or
+# as soon as `flask import` invalidates its tag (checked every
+# INDEX_CHECK_SECONDS).
+
+
+def _keys(name):
+    words = name.casefold().split()
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+
+class PrefixIndex:
+    def __init__(self, model, tag):
+        self.model = model
+        self.tag = tag
+        self._token = None
+        self._checked_at = None
+        self._keys = []
+        self._ids = []
+        self._names = {}
+        self._built_at = None
+        self._lock = threading.Lock()
+
+    def build(self):
+        # The token is read first, so an import during the build is seen.
+        token = response_cache.token(self.tag)
+        names = dict(db.session.query(self.model.id, self.model.name))
+        entries = sorted(
+            (key, entity_id)
+            for entity_id, name in names.items()
+            for key in _keys(name or "")
+        )
+        with self._lock:
+            self._keys = [key for key, _ in entries]
+            self._ids = [entity_id for _, entity_id in entries]
+            self._names = names
+            self._token = token
+            self._built_at = self._checked_at = time.monotonic()
+
+    def ensure_built(self):
+        if self._built_at is None:
+            self.build()
+
+    def _ensure_fresh(self):
+        now = time.monotonic()
+        max_age = current_app.config["AUTOCOMPLETE_MAX_AGE"]
+        if self._built_at is None or now - self._built_at > max_age:
+            self.build()
+        elif now - self._checked_at > current_app.config["INDEX_CHECK_SECONDS"]:
+            self._checked_at = now
+            if response_cache.token(self.tag) != self._token:
+                self.build()
+
+    def _remove(self, entity_id):
+        name = self._names.pop(entity_id, None)
+        for key in _keys(name or ""):
+            position = bisect_left(self._keys, key)
+            while self._ids[position] != entity_id:
+                position += 1
+            del self._keys[position]
+            del self._ids[position]
+
+    def add(self, entity_id, name):
+        # Adds a new row, or replaces the name of an indexed one.
+        if self._built_at is None:
+            return
+        with self._lock:
+            self._remove(entity_id)
+            self._names[entity_id] = name
+            for key in _keys(name):
+                position = bisect_left(self._keys, key)
+                self._keys.insert(position, key)
+                self._ids.insert(position, entity_id)
+
+    def remove(self, entity_id):
+        if self._built_at is None:
+            return
+        with self._lock:
+            self._remove(entity_id)
+
+    def suggest(self, prefix, limit=10):
+        # [(id, name)] for up to `limit` rows with a word starting with
+        # `prefix`, in key order.
+        self._ensure_fresh()
+        prefix = " ".join(prefix.casefold().split())
+        found = {}
+        with self._lock:
+            position = bisect_left(self._keys, prefix)
+            while len(found) < limit and position < len(self._keys):
+                if not self._keys[position].startswith(prefix):
+                    break
+                entity_id = self._ids[position]
+                found.setdefault(entity_id, self._names[entity_id])
+                position += 1
+        return list(found.items())
+
+    def footprint(self):
+        # Approximate bytes held by the index (lists, keys, names and ids).
+        with self._lock:
+            return (
+                sys.getsizeof(self._keys)
+                + sys.getsizeof(self._ids)
+                + sys.getsizeof(self._names)
+                + sum(map(sys.getsizeof, self._keys))
+                + sum(map(sys.getsizeof, self._names))
+                + sum(map(sys.getsizeof, self._names.values()))
+            )
+
+    def stats(self):
+        return {
+            "rows": len(self._names),
+            "keys": len(self._keys),
+            "bytes": self.footprint(),
+            "age": (
+                time.monotonic() - self._built_at
+                if self._built_at is not None
+                else None
+            ),
+        }
+
+
+venue_names = PrefixIndex(Venue, "index:venues")
+artist_names = PrefixIndex(Artist, "index:artists")
+NAME_INDEXES = {"venues": venue_names, "artists": artist_names}
@@ -0,0 +1,107 @@
+"""Index check: EXPLAIN the show time-window queries and assert their index.
+
+python benchmarks/explain.py [--scale 1000] [--database-url URL]
+
+The database is reset and seeded (benchmarks/seed.py) at the given scale and
+analyzed, then each query in CHECKS is explained; the run fails unless every
+plan mentions the expected index. Works on SQLite (EXPLAIN QUERY PLAN, the
+default throwaway file) and Postgres (EXPLAIN), which is dropped and
+recreated.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+def checks(now):
+    # name -> (query, index it must use).
+    from models import db, Venue, Artist, Show
+    from queries import calendar, in_window
+
+    week = (now, now + timedelta(days=7))
+    return {
+        "venue past shows": (
+            db.session.query(Show.id, Show.start_time).filter(
+                Show.venue_id == 1, Show.start_time < now
+            ),
+            "ix_Show_venue_id_start_time",
+        ),
+        "artist upcoming shows": (
+            db.session.query(Show.id, Show.start_time).filter(
+                Show.artist_id == 1, Show.start_time > now
+            ),
+            "ix_Show_artist_id_start_time",
+        ),
+        "venue calendar": (calendar(Venue, 1, *week), "ix_Show_venue_id_start_time"),
+        "artist calendar": (
+            calendar(Artist, 1, *week),
+            "ix_Show_artist_id_start_time",
+        ),
+        "shows window": (
+            in_window(db.session.query(Show.id, Show.start_time), *week)
+            .order_by(Show.start_time, Show.id)
+            .limit(50),
+            "ix_Show_start_time",
+        ),
+    }
+
+
+def explain(query):
+    # The plan of an ORM query, as text.
+    from models import db
+
+    connection = db.session.connection()
+    dialect = connection.dialect
+    compiled = query.statement.compile(dialect=dialect)
+    params = compiled.construct_params()
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    prefix = "EXPLAIN QUERY PLAN " if dialect.name == "sqlite" else "EXPLAIN "
+    rows = connection.exec_driver_sql(prefix + str(compiled), params).fetchall()
+    return "\n".join(str(row[-1]) for row in rows)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    scratch = tempfile.TemporaryDirectory()
+    os.environ["DATABASE_URL"] = args.database_url or (
+        f"sqlite:///{os.path.join(scratch.name, 'explain.db')}"
+    )
+    os.environ.pop("DATABASE_REPLICA_URLS", None)
+
+    from app import create_app
+    from models import db
+    from seed import seed
+
+    app = create_app()
+    failures = []
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        seed(args.scale, 2 * args.scale, 10 * args.scale, seed=args.seed)
+        db.session.execute(db.text("ANALYZE"))
+        for name, (query, index) in checks(datetime.now()).items():
+            plan = explain(query)
+            used = index in plan
+            print(f"{'ok' if used else 'FAIL':4} {name}: {index}")
+            if not used:
+                failures.append(f"{name} doesn't use {index}:\n{plan}")
+        db.session.remove()
+
+    if failures:
+        print("\n" + "\n\n".join(failures))
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
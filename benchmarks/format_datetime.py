@@ -0,0 +1,80 @@
+"""Micro-benchmark: formatting the start times of a 10k-show listing.
+
+python benchmarks/format_datetime.py [--shows 10000] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+import babel.dates
+import dateutil.parser
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from formatting import FORMATS, format_datetime, format_datetimes  # noqa: E402
+
+
+def legacy_format_datetime(value, format="medium"):
+    # The filter as it was: re-parse a string and rebuild the pattern.
+    date = dateutil.parser.parse(value)
+    if format == "full":
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == "medium":
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format, locale="en")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    start = datetime(2024, 1, 1, 18)
+    # Shows start on the hour or half hour, so listings repeat start times.
+    times = [
+        start + timedelta(days=rng.randrange(730), minutes=30 * rng.randrange(12))
+        for _ in range(args.shows)
+    ]
+    strings = [str(value) for value in times]
+
+    cases = {
+        # shows() used to format to "medium" and re-parse that in the template.
+        "legacy (str -> medium -> full)": lambda: [
+            legacy_format_datetime(legacy_format_datetime(value), "full")
+            for value in strings
+        ],
+        "legacy (str -> full)": lambda: [
+            legacy_format_datetime(value, "full") for value in strings
+        ],
+        "format_datetime (datetime)": lambda: [
+            format_datetime(value, "full") for value in times
+        ],
+        "format_datetimes (batch)": lambda: format_datetimes(times, "full"),
+        "format_datetimes (str batch)": lambda: format_datetimes(strings, "full"),
+    }
+
+    expected = [legacy_format_datetime(value, "full") for value in strings]
+    assert cases["format_datetime (datetime)"]() == expected
+    assert cases["format_datetimes (batch)"]() == expected
+    assert cases["format_datetimes (str batch)"]() == expected
+    assert set(FORMATS) >= {"full", "medium"}
+
+    baseline = None
+    for name, case in cases.items():
+        best = min(timeit.repeat(case, number=1, repeat=args.repeat))
+        if baseline is None:
+            baseline = best
+        print(
+            f"{name:32} {best * 1000:9.1f} ms  "
+            f"{best / args.shows * 1e6:7.2f} us/show  {baseline / best:6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
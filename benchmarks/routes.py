@@ -0,0 +1,331 @@
+"""Route benchmark: latency percentiles and SQL counts for every route.
+
+python benchmarks/routes.py [--scales 100,1000] [--requests 20] [--cache]
+                            [--duplicate-limit K] [--database-url URL] [--save FILE] [--compare FILE]
+
+For each scale N the database is reset and seeded with N venues, 2N artists
+and 10N shows (benchmarks/seed.py), then every endpoint in app.url_map is
+requested through the Flask test client. Routes without an entry in REQUESTS
+fail the run, so new routes get benchmarked too. --compare exits non-zero if
+a route ran more SQL statements than in the baseline, or got slower than the
+baseline by more than --tolerance (and --slack-ms).
+
+The database defaults to a throwaway SQLite file; a Postgres URL works too but
+is dropped and recreated.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from urllib.parse import quote
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# Routes that aren't benchmarked, and why.
+SKIP = {
+    "static": "served by the web server in production",
+    "assets": "built files, served by the web server in production",
+    "delete_venue": "destroys the data set the other routes read",
+}
+
+
+def _form(rng, kind):
+    data = {
+        "name": f"Benchmark {kind} {rng.randrange(10**6)}",
+        "city": "Austin",
+        "state": "TX",
+        "phone": "512-555-0100",
+        "genres": ["Jazz", "Blues"],
+        "facebook_link": "https://www.facebook.com/benchmark",
+        "image_link": "",
+        "website_link": "",
+        "seeking_description": "",
+    }
+    if kind == "venue":
+        data["address"] = "1 Benchmark Street"
+    return data
+
+
+def _show(rng, ids):
+    start = datetime.now() + timedelta(days=rng.randint(-30, 30))
+    return {
+        "artist_id": str(rng.choice(ids["artists"])),
+        "venue_id": str(rng.choice(ids["venues"])),
+        "start_time": start.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+# endpoint -> function(rng, ids) returning (method, path, form data).
+REQUESTS = {
+    "index": lambda rng, ids: ("GET", "/", None),
+    "venues": lambda rng, ids: ("GET", "/venues", None),
+    "artists": lambda rng, ids: ("GET", "/artists", None),
+    "shows": lambda rng, ids: ("GET", "/shows", None),
+    "venue_area": lambda rng, ids: (
+        "GET",
+        "/venues/areas/{}/{}?partial=1".format(
+            *map(quote, rng.choice(ids["areas"]))
+        ),
+        None,
+    ),
+    "venue_calendar": lambda rng, ids: (
+        "GET",
+        f"/venues/{rng.choice(ids['venues'])}/calendar",
+        None,
+    ),
+    "artist_calendar": lambda rng, ids: (
+        "GET",
+        f"/artists/{rng.choice(ids['artists'])}/calendar",
+        None,
+    ),
+    "show_venue": lambda rng, ids: (
+        "GET",
+        f"/venues/{rng.choice(ids['venues'])}",
+        None,
+    ),
+    "show_artist": lambda rng, ids: (
+        "GET",
+        f"/artists/{rng.choice(ids['artists'])}",
+        None,
+    ),
+    "search_venues": lambda rng, ids: (
+        "POST",
+        "/venues/search",
+        {"search_term": rng.choice(["hop", "blue", "the gold", "lounge 1"])},
+    ),
+    "search_artists": lambda rng, ids: (
+        "POST",
+        "/artists/search",
+        {"search_term": rng.choice(["owl", "wild", "neon tig", "room 2"])},
+    ),
+    "create_venue_form": lambda rng, ids: ("GET", "/venues/create", None),
+    "create_artist_form": lambda rng, ids: ("GET", "/artists/create", None),
+    "create_shows": lambda rng, ids: ("GET", "/shows/create", None),
+    "create_venue_submission": lambda rng, ids: (
+        "POST",
+        "/venues/create",
+        _form(rng, "venue"),
+    ),
+    "create_artist_submission": lambda rng, ids: (
+        "POST",
+        "/artists/create",
+        _form(rng, "artist"),
+    ),
+    "create_show_submission": lambda rng, ids: (
+        "POST",
+        "/shows/create",
+        _show(rng, ids),
+    ),
+    "edit_venue": lambda rng, ids: (
+        "GET",
+        f"/venues/{rng.choice(ids['venues'])}/edit",
+        None,
+    ),
+    "edit_artist": lambda rng, ids: (
+        "GET",
+        f"/artists/{rng.choice(ids['artists'])}/edit",
+        None,
+    ),
+    "edit_venue_submission": lambda rng, ids: (
+        "POST",
+        f"/venues/{rng.choice(ids['venues'])}/edit",
+        _form(rng, "venue"),
+    ),
+    "edit_artist_submission": lambda rng, ids: (
+        "POST",
+        f"/artists/{rng.choice(ids['artists'])}/edit",
+        _form(rng, "artist"),
+    ),
+    "export_catalog": lambda rng, ids: ("GET", "/export/shows", None),
+    "autocomplete": lambda rng, ids: (
+        "GET",
+        f"/autocomplete/{rng.choice(['venues', 'artists'])}"
+        f"?q={rng.choice(['h', 'bl', 'the', 'wild o'])}",
+        None,
+    ),
+    "autocomplete_stats": lambda rng, ids: ("GET", "/autocomplete/stats", None),
+    "cache_stats": lambda rng, ids: ("GET", "/cache/stats", None),
+    "prometheus_metrics": lambda rng, ids: ("GET", "/metrics", None),
+    "api.venues": lambda rng, ids: ("GET", "/api/v1/venues", None),
+    "api.artists": lambda rng, ids: ("GET", "/api/v1/artists?include=shows", None),
+    "api.shows": lambda rng, ids: ("GET", "/api/v1/shows", None),
+    "api.venue_matches": lambda rng, ids: (
+        "GET",
+        f"/api/v1/venues/{rng.choice(ids['venues'])}/matches",
+        None,
+    ),
+    "api.artist_matches": lambda rng, ids: (
+        "GET",
+        f"/api/v1/artists/{rng.choice(ids['artists'])}/matches",
+        None,
+    ),
+    "api.venue": lambda rng, ids: (
+        "GET",
+        f"/api/v1/venues/{rng.choice(ids['venues'])}?include=shows",
+        None,
+    ),
+    "api.artist": lambda rng, ids: (
+        "GET",
+        f"/api/v1/artists/{rng.choice(ids['artists'])}",
+        None,
+    ),
+    "api.show": lambda rng, ids: (
+        "GET",
+        f"/api/v1/shows/{rng.choice(ids['shows'])}",
+        None,
+    ),
+}
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def run_scale(app, scale, requests, seed):
+    # Resets and seeds the database, then times each route. Returns
+    # {endpoint: {"p50": ms, "p90": ms, "p99": ms, "sql": max statements}}.
+    from autocomplete import NAME_INDEXES
+    from matchmaking import CANDIDATES
+    from cache import response_cache
+    from loading import capture_sql
+    from models import db, Venue, Artist, Show
+    from seed import seed as seed_database
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        seed_database(scale, 2 * scale, 10 * scale, seed=seed)
+        ids = {
+            "venues": [id for id, in db.session.query(Venue.id)],
+            "artists": [id for id, in db.session.query(Artist.id)],
+            "shows": [id for id, in db.session.query(Show.id)],
+            "areas": list(db.session.query(Venue.state, Venue.city).distinct()),
+        }
+        for index in NAME_INDEXES.values():
+            index.build()
+        for candidates in CANDIDATES.values():
+            candidates.build()
+        response_cache.backend.clear()
+        db.session.remove()
+
+    rng = random.Random(seed)
+    client = app.test_client()
+    results = {}
+    for endpoint, make_request in sorted(REQUESTS.items()):
+        latencies = []
+        statements = 0
+        for attempt in range(requests + 1):
+            method, path, data = make_request(rng, ids)
+            with app.app_context(), capture_sql(db.engine) as sql:
+                started = time.perf_counter()
+                response = client.open(path, method=method, data=data)
+                response.get_data()
+                elapsed = time.perf_counter() - started
+            if response.status_code >= 400:
+                raise SystemExit(f"{method} {path}: HTTP {response.status_code}")
+            # The first request warms up templates and connections.
+            if attempt:
+                latencies.append(elapsed * 1000)
+                statements = max(statements, len(sql))
+        results[endpoint] = {
+            "p50": round(percentile(latencies, 0.5), 3),
+            "p90": round(percentile(latencies, 0.9), 3),
+            "p99": round(percentile(latencies, 0.99), 3),
+            "sql": statements,
+        }
+    return results
+
+
+def compare(results, baseline, tolerance, slack_ms):
+    # Regressions against the baseline, as printable lines.
+    failures = []
+    for scale, routes in results.items():
+        for endpoint, current in routes.items():
+            before = baseline.get(scale, {}).get(endpoint)
+            if before is None:
+                continue
+            if current["sql"] > before["sql"]:
+                failures.append(
+                    f"{scale} {endpoint}: {current['sql']} SQL statements "
+                    f"(baseline {before['sql']})"
+                )
+            for stat in ("p50", "p90"):
+                limit = before[stat] * (1 + tolerance) + slack_ms
+                if current[stat] > limit:
+                    failures.append(
+                        f"{scale} {endpoint}: {stat} {current[stat]:.2f} ms "
+                        f"(baseline {before[stat]:.2f} ms, limit {limit:.2f} ms)"
+                    )
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", default="100,1000")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--cache", action="store_true", help="Keep the page cache on.")
+    parser.add_argument(
+        "--duplicate-limit",
+        type=int,
+        help="Fail when a request repeats an SQL statement more than this.",
+    )
+    parser.add_argument("--database-url")
+    parser.add_argument("--save", help="Write the results as a baseline file.")
+    parser.add_argument("--compare", help="Fail on regressions against a baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    parser.add_argument("--slack-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    scratch = tempfile.TemporaryDirectory()
+    os.environ["DATABASE_URL"] = args.database_url or (
+        f"sqlite:///{os.path.join(scratch.name, 'benchmark.db')}"
+    )
+    os.environ.pop("DATABASE_REPLICA_URLS", None)
+
+    from app import create_app
+    from cache import response_cache
+
+    app = create_app()
+    missing = sorted(
+        rule.endpoint
+        for rule in app.url_map.iter_rules()
+        if rule.endpoint not in REQUESTS and rule.endpoint not in SKIP
+    )
+    if missing:
+        raise SystemExit(f"No benchmark request for: {', '.join(missing)}")
+    response_cache.enabled = args.cache
+    app.config["SQL_DUPLICATE_LIMIT"] = args.duplicate_limit
+
+    results = {}
+    for scale in [int(scale) for scale in args.scales.split(",")]:
+        results[str(scale)] = run_scale(app, scale, args.requests, args.seed)
+        print(f"\n{scale} venues, {2 * scale} artists, {10 * scale} shows")
+        print(f"{'route':28} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'SQL':>5}")
+        for endpoint, stats in results[str(scale)].items():
+            print(
+                f"{endpoint:28} {stats['p50']:9.2f} {stats['p90']:9.2f} "
+                f"{stats['p99']:9.2f} {stats['sql']:5d}"
+            )
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+    if args.compare:
+        with open(args.compare) as f:
+            failures = compare(results, json.load(f), args.tolerance, args.slack_ms)
+        if failures:
+            print("\nRegressions:\n  " + "\n  ".join(failures))
+            raise SystemExit(1)
+        print("\nNo regressions against", args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""Seed the configured database with generated venues, artists and shows.
+
+python benchmarks/seed.py [--venues 1000] [--artists 2000] [--shows 10000]
+                          [--past-ratio 0.7] [--seed 42] [--reset]
+
+Popularity is skewed: a few cities, genres, venues and artists account for
+most rows and shows, as in the real catalog. --reset drops and recreates the
+tables first, so only point it at a scratch database.
+"""
+
+import argparse
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+CITIES = [
+    ("New York", "NY"),
+    ("Los Angeles", "CA"),
+    ("Chicago", "IL"),
+    ("San Francisco", "CA"),
+    ("Austin", "TX"),
+    ("Nashville", "TN"),
+    ("Seattle", "WA"),
+    ("New Orleans", "LA"),
+    ("Atlanta", "GA"),
+    ("Denver", "CO"),
+    ("Boston", "MA"),
+    ("Portland", "OR"),
+    ("Philadelphia", "PA"),
+    ("Detroit", "MI"),
+    ("Minneapolis", "MN"),
+    ("Kansas City", "MO"),
+]
+
+GENRES = [
+    "Rock n Roll",
+    "Pop",
+    "Hip-Hop",
+    "Jazz",
+    "R&B",
+    "Electronic",
+    "Alternative",
+    "Country",
+    "Folk",
+    "Blues",
+    "Soul",
+    "Funk",
+    "Reggae",
+    "Punk",
+    "Heavy Metal",
+    "Classical",
+    "Instrumental",
+    "Musical Theatre",
+    "Other",
+]
+
+ADJECTIVES = [
+    "Blue",
+    "Golden",
+    "Electric",
+    "Velvet",
+    "Midnight",
+    "Rusty",
+    "Silver",
+    "Crimson",
+    "Lucky",
+    "Wild",
+    "Hidden",
+    "Neon",
+    "Howling",
+    "Quiet",
+    "Broken",
+    "Painted",
+]
+NOUNS = [
+    "Hop",
+    "Room",
+    "Lantern",
+    "Anchor",
+    "Owl",
+    "Garden",
+    "Factory",
+    "Canyon",
+    "Parlor",
+    "Harbor",
+    "Tiger",
+    "Lounge",
+    "Saloon",
+    "Theatre",
+    "Cellar",
+    "Attic",
+]
+
+
+def zipf_weights(count, s=1.0):
+    return [1 / (rank + 1) ** s for rank in range(count)]
+
+
+def _name(rng, pattern, number):
+    return pattern.format(
+        adjective=rng.choice(ADJECTIVES), noun=rng.choice(NOUNS), number=number
+    )
+
+
+def _entity(rng, kind, number, pattern):
+    city, state = rng.choices(CITIES, weights=zipf_weights(len(CITIES)))[0]
+    genres = set(
+        rng.choices(GENRES, weights=zipf_weights(len(GENRES), 0.8), k=rng.randint(1, 3))
+    )
+    slug = f"{kind}{number}"
+    return {
+        "name": _name(rng, pattern, number),
+        "city": city,
+        "state": state,
+        "phone": "{}-{}-{}".format(
+            rng.randint(200, 999), rng.randint(200, 999), rng.randint(1000, 9999)
+        ),
+        "genres": sorted(genres),
+        "image_link": f"https://images.example.com/{slug}.jpg",
+        "facebook_link": f"https://www.facebook.com/{slug}",
+        "website": f"https://{slug}.example.com" if rng.random() < 0.6 else None,
+        "seeking_description": None,
+        "version": 1,
+    }
+
+
+def generate(venues, artists, shows, past_ratio=0.7, seed=42, now=None):
+    # Rows for Venue, Artist and Show; shows reference venues/artists by their
+    # 1-based position, which is their id in an empty database.
+    from scheduling import find_conflicts, show_end
+
+    rng = random.Random(seed)
+    now = now or datetime.now()
+    venue_rows = []
+    for number in range(venues):
+        row = _entity(rng, "venue", number, "The {adjective} {noun} {number}")
+        row["address"] = f"{rng.randint(1, 9999)} {rng.choice(NOUNS)} Street"
+        row["seeking_talent"] = rng.random() < 0.3
+        venue_rows.append(row)
+    artist_rows = []
+    for number in range(artists):
+        row = _entity(rng, "artist", number, "{adjective} {noun}s {number}")
+        row["seeking_venue"] = rng.random() < 0.3
+        artist_rows.append(row)
+
+    # A few venues and artists host most of the shows.
+    venue_weights = zipf_weights(venues, 0.8)
+    artist_weights = zipf_weights(artists, 0.8)
+    rng.shuffle(venue_weights)
+    rng.shuffle(artist_weights)
+    evening = now.replace(hour=19, minute=0, second=0, microsecond=0)
+    # Proposals that would double-book a venue or artist are dropped and
+    # redrawn, a bounded number of times, so busy venues may end up short.
+    show_rows = []
+    for _ in range(10):
+        missing = shows - len(show_rows)
+        if not missing:
+            break
+        proposed = []
+        for venue_id, artist_id in zip(
+            rng.choices(range(1, venues + 1), weights=venue_weights, k=missing),
+            rng.choices(range(1, artists + 1), weights=artist_weights, k=missing),
+        ):
+            days = (
+                -rng.randint(1, 730)
+                if rng.random() < past_ratio
+                else rng.randint(1, 180)
+            )
+            start_time = evening + timedelta(days=days, minutes=30 * rng.randrange(8))
+            proposed.append((venue_id, artist_id, start_time, show_end(start_time)))
+        booked = [
+            (row["venue_id"], row["artist_id"], row["start_time"], row["end_time"])
+            for row in show_rows
+        ]
+        for booking, clash in zip(proposed, find_conflicts(proposed, booked)):
+            if clash is None:
+                venue_id, artist_id, start_time, end_time = booking
+                show_rows.append(
+                    {
+                        "venue_id": venue_id,
+                        "artist_id": artist_id,
+                        "start_time": start_time,
+                        "end_time": end_time,
+                        "counted_past": start_time <= now,
+                        "version": 1,
+                    }
+                )
+    return venue_rows, artist_rows, show_rows
+
+
+def seed(venues, artists, shows, past_ratio=0.7, seed=42, batch_size=1000):
+    # Inserts generated rows into the current app's database and brings the
+    # show counters up to date. Needs an app context and empty tables.
+    from counters import refresh
+    from models import db, Venue, Artist, Show
+
+    tables = zip(
+        (Venue, Artist, Show), generate(venues, artists, shows, past_ratio, seed)
+    )
+    for model, rows in tables:
+        for start in range(0, len(rows), batch_size):
+            db.session.execute(
+                model.__table__.insert(), rows[start : start + batch_size]
+            )
+    refresh(Venue)
+    refresh(Artist)
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--venues", type=int, default=1000)
+    parser.add_argument("--artists", type=int, default=2000)
+    parser.add_argument("--shows", type=int, default=10000)
+    parser.add_argument("--past-ratio", type=float, default=0.7)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true")
+    args = parser.parse_args()
+
+    from app import create_app
+    from models import db, Venue
+
+    app = create_app()
+    with app.app_context():
+        if args.reset:
+            db.drop_all()
+            db.create_all()
+        elif db.session.query(Venue.id).first() is not None:
+            sys.exit("The database isn't empty; use --reset on a scratch database.")
+        seed(args.venues, args.artists, args.shows, args.past_ratio, args.seed)
+    print(f"Seeded {args.venues} venues, {args.artists} artists, {args.shows} shows.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import wraps
+
+from flask import (
+    Response,
+    current_app,
+    g,
+    make_response,
+    request,
+    session,
+    stream_with_context,
+)
+from werkzeug.utils import import_string
+
+from routing import read_replica
+
+# ----------------------------------------------------------------------------#
+# Backends.
+# ----------------------------------------------------------------------------#
+
+
+class CacheBackend:
+    # Minimal key/value interface the response cache needs. Backends shared
+    # between workers (Redis, memcached, ...) only have to implement these.
+
+    # Whether every worker sees the same entries (and tag invalidations).
+    shared = True
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def get_many(self, keys):
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class LocalCache(CacheBackend):
+    # In-process LRU with per-entry expiry. Each worker has its own copy.
+
+    shared = False
+
+    def __init__(self, max_entries=1024, **options):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires is not None and expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisCache(CacheBackend):
+    # Shared cache for multiple workers; needs the optional `redis` package.
+
+    def __init__(self, url="redis://localhost:6379/0", prefix="fyyur:", **options):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.get_many([key])[0]
+
+    def get_many(self, keys):
+        values = self.client.mget([self.prefix + key for key in keys])
+        return [pickle.loads(value) if value is not None else None for value in values]
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=ttl or None)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+
+# ----------------------------------------------------------------------------#
+# Response cache.
+# ----------------------------------------------------------------------------#
+
+# Rendered GET responses are stored under the request path and query string,
+# along with the tags (e.g. "venues", "venue:3") they were built from. Each tag
+# has a random version token in the backend; invalidating a tag replaces its
+# token, so every entry recorded under the old one stops matching. This works
+# unchanged on any shared key/value backend.
+#
+# A token also records when its tag was invalidated. A response isn't stored
+# if any of its tags was invalidated after it started rendering (it may have
+# been built from data read before the write), or, when built from replica
+# reads, within DB_STICKY_SECONDS (the replica may not have caught up yet).
+
+
+def _invalidated_at(token):
+    return float(token.rpartition(":")[0] or 0)
+
+
+def add_cache_tags(*tags):
+    # Lets a cached view tag its response with entities it rendered. Their
+    # tokens are read now, not once the page is complete.
+    tokens = g.get("cache_tokens")
+    if tokens is not None and not tokens.keys() >= set(tags):
+        cache = current_app.extensions["response_cache"]
+        tokens.update(cache._tag_tokens(set(tags) - tokens.keys()))
+
+
+class ResponseCache:
+    def __init__(self, app=None):
+        self.backend = None
+        self.enabled = False
+        self.default_ttl = None
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "invalidations": 0}
+        self._stats_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("CACHE_ENABLED", True)
+        app.config.setdefault("CACHE_BACKEND", "cache.LocalCache")
+        app.config.setdefault("CACHE_OPTIONS", {})
+        app.config.setdefault("CACHE_DEFAULT_TTL", 300)
+        backend = app.config["CACHE_BACKEND"]
+        if isinstance(backend, str):
+            backend = import_string(backend)(**app.config["CACHE_OPTIONS"])
+        self.backend = backend
+        self.enabled = app.config["CACHE_ENABLED"]
+        self.default_ttl = app.config["CACHE_DEFAULT_TTL"]
+        app.extensions["response_cache"] = self
+
+    def _count(self, stat, amount=1):
+        with self._stats_lock:
+            self._stats[stat] += amount
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        if hasattr(self.backend, "__len__"):
+            stats["entries"] = len(self.backend)
+        return stats
+
+    def _tag_tokens(self, tags):
+        tags = sorted(tags)
+        tokens = dict(zip(tags, self.backend.get_many([f"tag:{t}" for t in tags])))
+        for tag, token in tokens.items():
+            if token is None:
+                tokens[tag] = f"0:{uuid.uuid4().hex}"
+                self.backend.set(f"tag:{tag}", tokens[tag])
+        return tokens
+
+    def token(self, tag):
+        # The current token of `tag`; in-process indexes compare it with the
+        # one they were built under to notice writes made by other processes.
+        return self._tag_tokens([tag])[tag]
+
+    def invalidate(self, *tags):
+        for tag in tags:
+            self.backend.set(f"tag:{tag}", f"{time.time()!r}:{uuid.uuid4().hex}")
+        self._count("invalidations", len(tags))
+
+    def _storable(self, tokens, started):
+        # Whether a result built since `started` under `tokens` is current.
+        if any(_invalidated_at(token) > started for token in tokens.values()):
+            return False
+        if self._tag_tokens(tokens) != tokens:
+            return False
+        return not self._replica_may_lag(tokens)
+
+    def _replica_may_lag(self, tokens):
+        if read_replica(current_app) is None:
+            return False
+        since = time.time() - current_app.config["DB_STICKY_SECONDS"]
+        return any(_invalidated_at(token) > since for token in tokens.values())
+
+    def value(self, key, tags, compute, ttl=None):
+        # Like cached(), for a picklable value (e.g. query results a page is
+        # built from) instead of a whole response.
+        if not self.enabled:
+            return compute()
+        key = f"value:{key}"
+        entry = self.backend.get(key)
+        if entry is not None and self._tag_tokens(entry["tags"]) == entry["tags"]:
+            self._count("hits")
+            return entry["value"]
+        self._count("misses")
+        started = time.time()
+        tokens = self._tag_tokens(tags)
+        result = compute()
+        if not self._storable(tokens, started):
+            return result
+        self.backend.set(
+            key, {"value": result, "tags": tokens}, ttl or self.default_ttl
+        )
+        self._count("stores")
+        return result
+
+    @staticmethod
+    def _tee(chunks, charset, store):
+        body = []
+        for chunk in chunks:
+            body.append(chunk.encode(charset) if isinstance(chunk, str) else chunk)
+            yield chunk
+        store(b"".join(body))
+
+    def cached(self, tags=lambda **view_args: (), ttl=None):
+        # `tags` maps the view's arguments to the tags its response depends
+        # on; views may add more with add_cache_tags() while rendering.
+        def decorator(view):
+            @wraps(view)
+            def wrapper(**view_args):
+                # Pages carrying flashed messages are per-user; skip them.
+                if not self.enabled or request.method != "GET" or "_flashes" in session:
+                    return view(**view_args)
+
+                key = f"view:{request.full_path}"
+                entry = self.backend.get(key)
+                if (
+                    entry is not None
+                    and self._tag_tokens(entry["tags"]) == entry["tags"]
+                ):
+                    self._count("hits")
+                    return Response(
+                        entry["body"], status=entry["status"], headers=entry["headers"]
+                    )
+                self._count("misses")
+
+                started = time.time()
+                # add_cache_tags() adds to these while the view renders.
+                tokens = g.cache_tokens = self._tag_tokens(tags(**view_args))
+                response = make_response(view(**view_args))
+                if response.status_code != 200:
+                    return response
+                headers = [
+                    (name, value)
+                    for name, value in response.headers.items()
+                    if name.lower() not in ("set-cookie", "content-length")
+                ]
+
+                def store(body):
+                    if not self._storable(tokens, started):
+                        return
+                    self.backend.set(
+                        key,
+                        {
+                            "body": body,
+                            "status": response.status_code,
+                            "headers": headers,
+                            "tags": tokens,
+                        },
+                        ttl or self.default_ttl,
+                    )
+                    self._count("stores")
+
+                if response.is_streamed:
+                    # Chunks go to the client as they are rendered and are
+                    # copied into the entry, stored once the stream has been
+                    # sent in full (not if the client went away).
+                    response.response = stream_with_context(
+                        self._tee(response.response, response.charset, store)
+                    )
+                    return response
+                body = response.get_data()
+                store(body)
+                return Response(body, status=response.status_code, headers=headers)
+
+            return wrapper
+
+        return decorator
+
+
+response_cache = ResponseCache()
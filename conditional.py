@@ -0,0 +1,36 @@
+import hashlib
+from functools import wraps
+
+from flask import make_response, request
+
+# ----------------------------------------------------------------------------#
+# Conditional GET.
+# ----------------------------------------------------------------------------#
+
+
+def conditional(state):
+    # Answers GETs with 304 Not Modified when the client's ETag still matches,
+    # without calling the view. `state` maps the view's arguments to a cheap
+    # tuple that changes whenever the rendered page would. That includes
+    # shows moving from upcoming to past, which no updated_at records, so
+    # there is no Last-Modified: If-Modified-Since alone would get 304s for
+    # pages whose split had changed.
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**view_args):
+            current = state(**view_args)
+            if current is None:
+                return view(**view_args)
+
+            etag = hashlib.sha1(repr(tuple(current)).encode()).hexdigest()
+            if request.if_none_match.contains(etag):
+                response = make_response("", 304)
+            else:
+                response = make_response(view(**view_args))
+            response.set_etag(etag)
+            response.cache_control.no_cache = True
+            return response
+
+        return wrapper
+
+    return decorator
@@ -1,15 +1,109 @@
 import os
 
-SECRET_KEY = os.urandom(32)
 # Grabs the folder where the script runs.
 basedir = os.path.abspath(os.path.dirname(__file__))
 
-# Enable debug mode.
-DEBUG = True
+# Enable debug mode (gunicorn.conf.py sets FLASK_DEBUG=0).
+DEBUG = os.environ.get('FLASK_DEBUG', '1') == '1'
+
+# Signs sessions and flashed messages, so every worker must use the same one:
+# required outside debug mode, where create_app() refuses to start without it.
+# A random key is only good for one development process.
+SECRET_KEY = os.environ.get('SECRET_KEY') or (os.urandom(32) if DEBUG else None)
 
 # Connect to the database
 
 
 # TODO IMPLEMENT DATABASE URL
-SQLALCHEMY_DATABASE_URI = 'postgresql://lukehaag@localhost:5432/fyyur'
+SQLALCHEMY_DATABASE_URI = os.environ.get(
+    'DATABASE_URL', 'postgresql://lukehaag@localhost:5432/fyyur'
+)
 SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+# Connection pool, shared by the primary and the replicas (pool_size,
+# max_overflow and pool_timeout are ignored for SQLite files)
+SQLALCHEMY_ENGINE_OPTIONS = {
+    'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+    'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+    'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+    'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+    'pool_pre_ping': True,
+}
+# Per-statement timeout in milliseconds (Postgres only)
+DB_STATEMENT_TIMEOUT = int(os.environ.get('DB_STATEMENT_TIMEOUT', 5000))
+
+# Read replicas, as comma separated URLs. GET requests read from one of them;
+# after a write, that client reads from the primary for DB_STICKY_SECONDS.
+SQLALCHEMY_BINDS = {
+    'replica%d' % i: url
+    for i, url in enumerate(os.environ.get('DATABASE_REPLICA_URLS', '').split(','))
+    if url
+}
+DB_STICKY_SECONDS = int(os.environ.get('DB_STICKY_SECONDS', 5))
+
+# Listing pagination
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+# Rows fetched per round trip when a listing streams from a server-side cursor
+YIELD_PER = 100
+
+# Venue/artist calendars: days shown by default, and the longest window
+CALENDAR_DAYS = 31
+MAX_CALENDAR_DAYS = 366
+
+# Rows fetched per round trip by /export and `flask export`
+EXPORT_CHUNK = 1000
+
+# Maximum number of ranked matches returned by venue/artist search
+SEARCH_RESULT_LIMIT = 50
+
+# Bearer token for /metrics, /cache/stats, /autocomplete/stats and /export
+# (`Authorization: Bearer <token>`); when unset they are only served in debug
+# mode
+INTERNAL_TOKEN = os.environ.get('INTERNAL_TOKEN')
+
+# Directory where each server worker writes its metrics for /metrics to sum
+# (one per server, emptied on start); unset, /metrics reports the process
+# that serves it
+METRICS_DIR = os.environ.get('METRICS_DIR')
+
+# Requests slower than this (ms) are logged with their SQL statement counts
+SLOW_REQUEST_MS = 500
+# Raise when a request runs the same SQL statement more than this many times
+# (None to only report it); tests set it to catch N+1 queries
+SQL_DUPLICATE_LIMIT = None
+
+# Venue/artist name autocomplete: suggestions per request, and how long
+# (seconds) the in-process index is used before being rebuilt
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_AGE = 300
+
+# How often (seconds) the in-process indexes below check whether a bulk
+# import asked them to rebuild (through the shared page cache backend)
+INDEX_CHECK_SECONDS = 1
+
+# Artist/venue matchmaking: how long (seconds) the in-process candidate
+# columns are used before being rebuilt
+MATCH_MAX_AGE = 600
+
+# Compiled templates are kept here, shared by workers and across restarts
+# (empty to compile in memory only)
+TEMPLATE_CACHE_DIR = os.environ.get(
+    'TEMPLATE_CACHE_DIR', os.path.join(basedir, '.jinja_cache')
+)
+
+# Built static assets (`flask assets build`), and how long (seconds) browsers
+# may cache them; built file names change whenever their content does
+ASSETS_DIR = os.path.join(basedir, 'static', 'dist')
+ASSETS_MAX_AGE = 31536000
+
+# Rendered-page cache. CACHE_BACKEND is an import path (cache.LocalCache is
+# per-process; cache.RedisCache is shared by all workers, with CACHE_OPTIONS
+# such as {'url': 'redis://...'}). Setting CACHE_REDIS_URL picks RedisCache;
+# gunicorn.conf.py refuses to start several workers on a per-process cache,
+# whose invalidations would only reach the worker that made them.
+CACHE_ENABLED = True
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
+CACHE_BACKEND = 'cache.RedisCache' if CACHE_REDIS_URL else 'cache.LocalCache'
+CACHE_OPTIONS = {'url': CACHE_REDIS_URL} if CACHE_REDIS_URL else {'max_entries': 1024}
+CACHE_DEFAULT_TTL = 300
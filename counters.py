@@ -0,0 +1,175 @@
+from datetime import datetime
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import select
+from sqlalchemy.sql.functions import func
+
+import areas
+from models import db, Venue, Artist, Show
+from queries import show_counts
+
+# ----------------------------------------------------------------------------#
+# Show counters.
+# ----------------------------------------------------------------------------#
+
+# Venue/Artist.upcoming_shows_count and past_shows_count are kept in step with
+# the Show table on write. Each show remembers which bucket it was counted in
+# (Show.counted_past); roll_over() moves shows whose start time has passed
+# from upcoming to past, so counts are as fresh as the last roll-over.
+
+SHOW_KEYS = {Venue: Show.venue_id, Artist: Show.artist_id}
+
+
+def _adjust(model, entity_id, upcoming=0, past=0):
+    model.query.filter(model.id == entity_id).update(
+        {
+            model.upcoming_shows_count: model.upcoming_shows_count + upcoming,
+            model.past_shows_count: model.past_shows_count + past,
+        },
+        synchronize_session=False,
+    )
+    if model is Venue and upcoming:
+        areas.adjust(entity_id, upcoming)
+
+
+def record_show(show, now=None):
+    # Counts a newly added show; call in the same transaction as the insert.
+    show.counted_past = show.start_time <= (now or datetime.now())
+    delta = {"past": 1} if show.counted_past else {"upcoming": 1}
+    _adjust(Venue, show.venue_id, **delta)
+    _adjust(Artist, show.artist_id, **delta)
+
+
+def forget(model, entity_id):
+    # Deletes the shows of a venue/artist that is about to be deleted and
+    # takes them off the counters of the other side of each show.
+    key = SHOW_KEYS[model]
+    other = Artist if model is Venue else Venue
+    other_key = SHOW_KEYS[other]
+    totals = (
+        db.session.query(other_key, Show.counted_past, func.count(Show.id))
+        .filter(key == entity_id)
+        .group_by(other_key, Show.counted_past)
+    )
+    for other_id, counted_past, count in totals:
+        if counted_past:
+            _adjust(other, other_id, past=-count)
+        else:
+            _adjust(other, other_id, upcoming=-count)
+    Show.query.filter(key == entity_id).delete(synchronize_session=False)
+
+
+def roll_over(now=None):
+    # Moves shows that have started since the last roll-over from the upcoming
+    # to the past counters. Returns the number of shows moved.
+    now = now or datetime.now()
+    due = [
+        show_id
+        for show_id, in db.session.query(Show.id)
+        .filter(Show.counted_past.is_(False), Show.start_time <= now)
+        .with_for_update()
+    ]
+    if not due:
+        return 0
+    for model, key in SHOW_KEYS.items():
+        moved = (
+            db.session.query(key, func.count(Show.id))
+            .filter(Show.id.in_(due))
+            .group_by(key)
+        )
+        for entity_id, count in moved:
+            _adjust(model, entity_id, upcoming=-count, past=count)
+    Show.query.filter(Show.id.in_(due)).update(
+        {Show.counted_past: True}, synchronize_session=False
+    )
+    return len(due)
+
+
+def refresh(model, ids=None):
+    # Recomputes counters from the Show table, for all rows or just `ids`.
+    key = SHOW_KEYS[model]
+
+    def count(counted_past):
+        return (
+            select(func.count(Show.id))
+            .where(key == model.id, Show.counted_past.is_(counted_past))
+            .scalar_subquery()
+        )
+
+    query = model.query
+    if ids is not None:
+        query = query.filter(model.id.in_(ids))
+    query.update(
+        {
+            model.upcoming_shows_count: count(False),
+            model.past_shows_count: count(True),
+        },
+        synchronize_session=False,
+    )
+    if model is Venue:
+        areas.refresh(None if ids is None else areas.areas_of(ids))
+
+
+def drift(model, now):
+    # Rows whose stored counters disagree with the Show table at `now`.
+    counts = show_counts(SHOW_KEYS[model], now=now)
+    upcoming = func.coalesce(counts.c.upcoming, 0)
+    past = func.coalesce(counts.c.past, 0)
+    return (
+        db.session.query(
+            model.id,
+            model.upcoming_shows_count,
+            upcoming.label("upcoming"),
+            model.past_shows_count,
+            past.label("past"),
+        )
+        .outerjoin(counts, counts.c.id == model.id)
+        .filter(
+            (model.upcoming_shows_count != upcoming) | (model.past_shows_count != past)
+        )
+        .all()
+    )
+
+
+# ----------------------------------------------------------------------------#
+# Commands.
+# ----------------------------------------------------------------------------#
+
+counters_cli = AppGroup("counters", help="Maintain denormalized show counters.")
+
+
+@counters_cli.command("rollover")
+def rollover_command():
+    """Move shows that have started from upcoming to past counts."""
+    moved = roll_over()
+    db.session.commit()
+    click.echo(f"Rolled over {moved} shows.")
+
+
+@counters_cli.command("reconcile")
+@click.option("--fix", is_flag=True, help="Rewrite drifted counters.")
+def reconcile_command(fix):
+    """Check stored counters against the Show table."""
+    now = datetime.now()
+    roll_over(now)
+    drifted = 0
+    for model in SHOW_KEYS:
+        rows = drift(model, now)
+        drifted += len(rows)
+        for row in rows:
+            click.echo(
+                f"{model.__name__} {row.id}: "
+                f"upcoming {row.upcoming_shows_count} != {row.upcoming}, "
+                f"past {row.past_shows_count} != {row.past}"
+            )
+        if fix and rows:
+            refresh(model, [row.id for row in rows])
+    if fix:
+        # Area totals are cheap to rebuild; they may lag venue moves made
+        # outside the app.
+        areas.refresh()
+    db.session.commit()
+    click.echo(f"{drifted} rows drifted" + (", fixed." if fix and drifted else "."))
+    if drifted and not fix:
+        raise SystemExit(1)
@@ -0,0 +1,150 @@
+import csv
+import io
+import json
+import sys
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import select
+
+from models import db, Venue, Artist, Show
+
+# ----------------------------------------------------------------------------#
+# Bulk export.
+# ----------------------------------------------------------------------------#
+
+# Exports read the table in (updated_at, id) order through a server-side
+# cursor, EXPORT_CHUNK rows per fetch, and encode each row as it arrives, so
+# memory use doesn't depend on the size of the export. `since` restricts an
+# export to rows written at or after that time; partners pass the largest
+# updated_at of their previous export. Files use the importer's format (genres
+# joined with ";" in CSV), so an export can be loaded with `flask import`.
+
+EXPORTS = {
+    "venues": (
+        Venue,
+        (
+            "id",
+            "name",
+            "city",
+            "state",
+            "address",
+            "phone",
+            "genres",
+            "image_link",
+            "facebook_link",
+            "website",
+            "seeking_talent",
+            "seeking_description",
+            "updated_at",
+        ),
+    ),
+    "artists": (
+        Artist,
+        (
+            "id",
+            "name",
+            "city",
+            "state",
+            "phone",
+            "genres",
+            "image_link",
+            "facebook_link",
+            "website",
+            "seeking_venue",
+            "seeking_description",
+            "updated_at",
+        ),
+    ),
+    "shows": (
+        Show,
+        ("id", "venue_id", "artist_id", "start_time", "end_time", "updated_at"),
+    ),
+}
+
+MIMETYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+
+def export_rows(kind, since=None, chunk_size=None):
+    model, columns = EXPORTS[kind]
+    chunk_size = chunk_size or current_app.config["EXPORT_CHUNK"]
+    query = select(*[getattr(model, column) for column in columns]).order_by(
+        model.updated_at, model.id
+    )
+    if since is not None:
+        query = query.where(model.updated_at >= since)
+    result = db.session.execute(
+        query,
+        execution_options={"stream_results": True, "max_row_buffer": chunk_size},
+    )
+    for rows in result.partitions(chunk_size):
+        yield from rows
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _csv_value(value):
+    if isinstance(value, list):
+        return ";".join(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def encode_csv(kind, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORTS[kind][1])
+    for row in rows:
+        writer.writerow([_csv_value(value) for value in row])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def encode_jsonl(kind, rows):
+    for row in rows:
+        yield json.dumps(dict(row._mapping), default=_json_default) + "\n"
+
+
+ENCODERS = {"csv": encode_csv, "jsonl": encode_jsonl}
+
+
+def export(kind, fmt="jsonl", since=None, chunk_size=None):
+    # Generator of encoded lines for `kind`.
+    return ENCODERS[fmt](kind, export_rows(kind, since, chunk_size))
+
+
+def parse_since(value):
+    # `since` is an ISO 8601 timestamp in UTC, like updated_at itself.
+    return datetime.fromisoformat(value) if value else None
+
+
+@click.command("export")
+@click.argument("kind", type=click.Choice(sorted(EXPORTS)))
+@click.option(
+    "--format",
+    "fmt",
+    type=click.Choice(sorted(ENCODERS)),
+    default="jsonl",
+    show_default=True,
+)
+@click.option("--since", help="Only rows updated at or after this ISO timestamp.")
+@click.option("--output", "-o", type=click.File("w"), help="Default: stdout")
+@with_appcontext
+def export_command(kind, fmt, since, output):
+    """Stream venues, artists or shows as CSV or JSONL."""
+    try:
+        since = parse_since(since)
+    except ValueError:
+        raise click.BadParameter("expected an ISO 8601 timestamp", param_hint="since")
+    output = output or sys.stdout
+    for chunk in export(kind, fmt, since):
+        output.write(chunk)
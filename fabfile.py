@@ -1,13 +1,23 @@
-from fabric.api import local, settings, abort
+import os
+
+from fabric.api import abort, cd, env, local, prefix, run, settings
 from fabric.contrib.console import confirm
 
+# Our own hosts, as comma separated user@host entries, and where the app is
+# checked out on them (with its virtualenv in env/).
+env.hosts = [host for host in os.environ.get("FYYUR_HOSTS", "").split(",") if host]
+APP_DIR = os.environ.get("FYYUR_DIR", "/srv/fyyur")
+
 # prepare for deployment
 
 
 def test():
     with settings(warn_only=True):
         result = local(
-            "python test_tasks.py -v && python test_users.py -v", capture=True
+            "python -m pytest -q && "
+            "python benchmarks/explain.py && "
+            "python benchmarks/routes.py --compare benchmarks/baseline.json",
+            capture=True,
         )
     if result.failed and not confirm("Tests failed. Continue?"):
         abort("Aborted at user request.")
@@ -27,32 +37,53 @@ def prepare():
     commit()
     push()
 
-# deploy to heroku
+# deploy to our hosts (gunicorn, see server.py)
 
 
 def pull():
     local("git pull origin master")
 
 
-def heroku():
-    local("git push heroku master")
+def app_env():
+    return prefix("source {}/env/bin/activate".format(APP_DIR))
+
+
+def build():
+    with cd(APP_DIR), app_env():
+        run("pip install -r requirements.txt")
+        run("flask db upgrade")
+        run("flask assets build --clean")
+
 
+def start():
+    with cd(APP_DIR), app_env():
+        run("gunicorn --daemon")
 
-def heroku_test():
-    local(
-        "heroku run python test_tasks.py -v && heroku run python test_users.py -v"
-    )
+
+def reload():
+    with cd(APP_DIR), app_env():
+        run("python server.py reload")
+
+
+def stop():
+    with cd(APP_DIR), app_env():
+        run("python server.py stop")
 
 
 def deploy():
     pull()
     test()
-    commit()
-    heroku()
-    heroku_test()
+    push()
+    with cd(APP_DIR):
+        run("git pull origin master")
+    build()
+    reload()
 
-# rollback
+# rollback (code only: migrations are not downgraded)
 
 
-def rollback():
-    local("heroku rollback")
+def rollback(revision="HEAD@{1}"):
+    with cd(APP_DIR):
+        run("git checkout {}".format(revision))
+    build()
+    reload()
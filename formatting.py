@@ -0,0 +1,56 @@
+from datetime import datetime
+from functools import lru_cache
+
+import dateutil.parser
+from babel import Locale
+from babel.dates import parse_pattern
+
+# ----------------------------------------------------------------------------#
+# Date formatting.
+# ----------------------------------------------------------------------------#
+
+FORMATS = {
+    "full": "EEEE MMMM, d, y 'at' h:mma",
+    "medium": "EE MM, dd, y h:mma",
+    "day": "EEEE MMMM, d, y",
+    "time": "h:mma",
+}
+
+
+@lru_cache(maxsize=64)
+def compiled_format(format="medium", locale="en"):
+    # Babel pattern and locale for a (format, locale) pair, parsed once.
+    return parse_pattern(FORMATS.get(format, format)), Locale.parse(locale)
+
+
+def parse_datetime(value):
+    # Datetimes as-is; strings (from older callers) are nearly always ISO 8601,
+    # which is parsed natively; anything else goes through dateutil.
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return dateutil.parser.parse(value)
+
+
+def format_datetime(value, format="medium", locale="en"):
+    value = parse_datetime(value)
+    pattern, locale = compiled_format(format, locale)
+    return pattern.apply(value, locale)
+
+
+def format_datetimes(values, format="medium", locale="en"):
+    # Formats a column of datetimes, rendering each distinct value once.
+    pattern, locale = compiled_format(format, locale)
+    formatted = {}
+    result = []
+    for value in values:
+        # Strings are parsed first, so different spellings of one time share
+        # an entry.
+        value = parse_datetime(value)
+        text = formatted.get(value)
+        if text is None:
+            text = formatted[value] = pattern.apply(value, locale)
+        result.append(text)
+    return result
@@ -1,7 +1,7 @@
 from datetime import datetime
 from flask_wtf import Form
-from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField
-from wtforms.validators import DataRequired, AnyOf, URL
+from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField, IntegerField
+from wtforms.validators import DataRequired, AnyOf, URL, NumberRange, Optional
 
 
 class ShowForm(Form):
@@ -16,6 +16,11 @@ class ShowForm(Form):
         validators=[DataRequired()],
         default=datetime.today()
     )
+    # Minutes; blank means scheduling.DEFAULT_SHOW_LENGTH.
+    duration = IntegerField(
+        'duration',
+        validators=[Optional(), NumberRange(min=1, max=24 * 60)]
+    )
 
 
 class VenueForm(Form):
@@ -0,0 +1,68 @@
+from sqlalchemy import String, and_, cast, exists, select, true
+from sqlalchemy.dialects.postgresql import ARRAY, array
+from sqlalchemy.sql.functions import func
+
+from cache import response_cache
+from models import db
+
+# ----------------------------------------------------------------------------#
+# Genre facets.
+# ----------------------------------------------------------------------------#
+
+# On Postgres genres are a varchar[] with a GIN index, so "has all of these
+# genres" is array containment (@>) and "has any of them" is overlap (&&),
+# both answered from the index. On SQLite, used for local testing, genres are
+# a JSON array searched with json_each.
+#
+# Facet counts (rows per genre among the rows matching the current filter)
+# come from one grouped query over the unnested arrays. They are cached under
+# the "venues"/"artists" tag, which every venue/artist write invalidates.
+
+
+def _sqlite(dialect=None):
+    return (dialect or db.engine.dialect.name) == "sqlite"
+
+
+def _has_genre(model, genres):
+    each = func.json_each(model.genres).table_valued("value")
+    return exists(select(each.c.value).where(each.c.value.in_(genres)))
+
+
+def with_genres(query, model, genres, match_any=False, dialect=None):
+    # Filters a Venue/Artist query to rows with all (or any) of `genres`.
+    if not genres:
+        return query
+    if _sqlite(dialect):
+        if match_any:
+            return query.filter(_has_genre(model, genres))
+        return query.filter(and_(*[_has_genre(model, [genre]) for genre in genres]))
+    genres = cast(array(genres), ARRAY(String))
+    return query.filter(model.genres.op("&&" if match_any else "@>")(genres))
+
+
+def facet_query(model, genres=(), match_any=False, dialect=None):
+    # The table comes first and the unnested genres are joined to it: a
+    # function in FROM may only refer to tables listed before it.
+    if _sqlite(dialect):
+        genre = func.json_each(model.genres).table_valued("value").c.value
+    else:
+        genre = func.unnest(model.genres).table_valued("genre").render_derived()
+        genre = genre.c.genre
+    query = select(genre, func.count()).select_from(model).join(genre.table, true())
+    return with_genres(query, model, genres, match_any, dialect).group_by(genre)
+
+
+def _count_genres(model, genres, match_any):
+    rows = db.session.execute(facet_query(model, genres, match_any)).all()
+    return sorted(rows, key=lambda facet: (-facet[1], facet[0]))
+
+
+def genre_facets(model, genres=(), match_any=False):
+    # [(genre, rows)] among the rows matching the filter, most common first.
+    genres = sorted(set(genres))
+    kind = model.__tablename__.lower() + "s"
+    return response_cache.value(
+        f"facets:{kind}:{'any' if match_any else 'all'}:{'|'.join(genres)}",
+        [kind],
+        lambda: [tuple(facet) for facet in _count_genres(model, genres, match_any)],
+    )
@@ -0,0 +1,64 @@
+import multiprocessing
+import os
+import sys
+
+# Production settings; read by `gunicorn` from this directory. See server.py.
+# The app is loaded outside debug mode, and needs in the environment:
+#   SECRET_KEY       shared by all workers
+#   DATABASE_URL
+#   CACHE_REDIS_URL  e.g. redis://localhost:6379/0; the page cache must be
+#                    shared when there is more than one worker, and for
+#                    `flask import` to reach the workers' pages and indexes
+#   INTERNAL_TOKEN   bearer token for /metrics, the stats pages and /export
+#   METRICS_DIR      e.g. /run/fyyur/metrics; where workers write the metrics
+#                    /metrics sums, needed when there is more than one worker
+os.environ.setdefault("FLASK_DEBUG", "0")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import server  # noqa: E402
+
+wsgi_app = "wsgi:app"
+bind = os.environ.get("BIND", f"0.0.0.0:{os.environ.get('PORT', '8000')}")
+
+# Processes, each with a few threads: listings stream from the database, so a
+# worker spends most of a request waiting on it.
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "gthread"
+threads = int(os.environ.get("WEB_THREADS", 4))
+
+# Load the app once in the master; workers are forked from it.
+preload_app = True
+# Seconds a worker may spend on a request, and to finish requests in flight
+# when stopped or reloaded.
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+# Replace each worker after this many requests (spread out by the jitter).
+max_requests = 5000
+max_requests_jitter = 500
+
+pidfile = server.PIDFILE
+accesslog = "-"
+errorlog = "-"
+
+
+def when_ready(arbiter):
+    server.check_cache(arbiter.app.wsgi(), arbiter.cfg.workers)
+    server.check_metrics(arbiter.app.wsgi(), arbiter.cfg.workers)
+    server.warm(arbiter.app.wsgi())
+
+
+def post_fork(arbiter, worker):
+    try:
+        server.warm_pool(arbiter.app.wsgi(), arbiter.cfg.threads)
+    except Exception:
+        # Only a head start: the pool connects on demand anyway.
+        worker.log.exception("Couldn't warm the database pool")
+
+
+def post_worker_init(worker):
+    server.retire_old_master(worker)
+
+
+def child_exit(arbiter, worker):
+    server.retire_metrics(arbiter.app.wsgi(), worker.pid)
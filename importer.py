@@ -0,0 +1,315 @@
+import csv
+import json
+import os
+from datetime import datetime
+
+import click
+from flask.cli import with_appcontext
+from werkzeug.datastructures import MultiDict
+
+import areas
+from cache import response_cache
+from counters import refresh
+from forms import ArtistForm, ShowForm, VenueForm
+from models import db, Venue, Artist, Show
+from scheduling import booked_for, conflict_errors, find_conflicts, show_end
+
+# ----------------------------------------------------------------------------#
+# Bulk import.
+# ----------------------------------------------------------------------------#
+
+# Rows are streamed from CSV or JSONL, validated with the same forms as the
+# create pages, and inserted with one executemany per batch. After every
+# committed batch a checkpoint records how many input rows are done, so an
+# interrupted import resumes where it stopped; rows that fail validation are
+# appended to a rejects file with their errors.
+#
+# Each batch also invalidates the page cache tags of what it inserted, and the
+# "index:<kind>" tag the workers' autocomplete and matchmaking indexes check
+# to know they must be rebuilt. This command runs in its own process, so that
+# only reaches the server through a shared cache backend (CACHE_REDIS_URL);
+# with a per-process one, the server sees imported rows only as its pages
+# expire (CACHE_DEFAULT_TTL) and its indexes reach their max age.
+
+BOOLEAN_FIELDS = {"seeking_talent", "seeking_venue"}
+LIST_FIELDS = {"genres"}
+
+
+def read_rows(path, fmt):
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _formdata(row):
+    # Normalizes a raw CSV/JSONL row into form data for the WTForms forms.
+    data = MultiDict()
+    for field, value in row.items():
+        if value is None or field is None:
+            continue
+        if field in LIST_FIELDS:
+            if isinstance(value, str):
+                value = value.split(";") if value else []
+            data.setlist(field, [v.strip() for v in value if v.strip()])
+        elif field in BOOLEAN_FIELDS:
+            if str(value).strip().lower() in ("1", "true", "t", "yes", "y"):
+                data[field] = "y"
+        elif field == "start_time":
+            try:
+                value = datetime.fromisoformat(str(value).strip())
+                data[field] = value.strftime("%Y-%m-%d %H:%M:%S")
+            except ValueError:
+                data[field] = value
+        elif field == "website":
+            data["website_link"] = str(value)
+        elif field == "end_time":
+            continue
+        else:
+            data[field] = str(value)
+    if row.get("end_time") and not row.get("duration"):
+        # Exports carry end_time; the form takes a duration in minutes.
+        try:
+            start = datetime.fromisoformat(str(row.get("start_time")).strip())
+            end = datetime.fromisoformat(str(row["end_time"]).strip())
+            data["duration"] = str(int((end - start).total_seconds() // 60))
+        except ValueError:
+            data["duration"] = str(row["end_time"])
+    return data
+
+
+def venue_values(form):
+    return dict(
+        name=form.name.data,
+        city=form.city.data,
+        state=form.state.data,
+        address=form.address.data,
+        phone=form.phone.data,
+        image_link=form.image_link.data,
+        facebook_link=form.facebook_link.data,
+        seeking_talent=form.seeking_talent.data,
+        seeking_description=form.seeking_description.data,
+        genres=form.genres.data,
+        website=form.website_link.data,
+    )
+
+
+def artist_values(form):
+    return dict(
+        name=form.name.data,
+        city=form.city.data,
+        state=form.state.data,
+        phone=form.phone.data,
+        image_link=form.image_link.data,
+        facebook_link=form.facebook_link.data,
+        seeking_venue=form.seeking_venue.data,
+        seeking_description=form.seeking_description.data,
+        genres=form.genres.data,
+        website=form.website_link.data,
+    )
+
+
+def show_values(form):
+    return dict(
+        artist_id=form.artist_id.data,
+        venue_id=form.venue_id.data,
+        start_time=form.start_time.data,
+        end_time=show_end(form.start_time.data, form.duration.data),
+    )
+
+
+KINDS = {
+    "venues": (Venue, VenueForm, venue_values),
+    "artists": (Artist, ArtistForm, artist_values),
+    "shows": (Show, ShowForm, show_values),
+}
+
+
+def _resolve(model, ids, names):
+    # Maps the ids and names referenced by a batch to existing row ids; names
+    # that match more than one row stay unresolved.
+    found = {}
+    if ids:
+        for (entity_id,) in db.session.query(model.id).filter(model.id.in_(ids)):
+            found[str(entity_id)] = entity_id
+    if names:
+        matches = {}
+        for entity_id, name in db.session.query(model.id, model.name).filter(
+            model.name.in_(names)
+        ):
+            matches.setdefault(name, []).append(entity_id)
+        for name, entity_ids in matches.items():
+            if len(entity_ids) == 1:
+                found[name] = entity_ids[0]
+    return found
+
+
+def resolve_shows(batch):
+    # Fills in artist_id/venue_id for show rows, which may reference either
+    # side by id or by (unique) name. Returns the rows that don't resolve.
+    unresolved = {}
+    for side, model in (("artist", Artist), ("venue", Venue)):
+        ids = {
+            values[f"{side}_id"]
+            for _, _, values in batch
+            if (values[f"{side}_id"] or "").isdigit()
+        }
+        names = {
+            raw.get(f"{side}_name")
+            for _, raw, values in batch
+            if not values[f"{side}_id"] and raw.get(f"{side}_name")
+        }
+        found = _resolve(model, ids, names)
+        for line, raw, values in batch:
+            reference = values[f"{side}_id"] or raw.get(f"{side}_name")
+            if reference in found:
+                values[f"{side}_id"] = found[reference]
+            else:
+                errors = unresolved.setdefault(line, (line, raw, {}))[2]
+                errors[f"{side}_id"] = [f"Unknown {side} {reference!r}"]
+    return list(unresolved.values())
+
+
+def reject_conflicts(batch):
+    # Double bookings, against stored shows and within the batch (earlier
+    # rows win). Earlier batches are committed, so they count as stored.
+    bookings = [
+        (
+            values["venue_id"],
+            values["artist_id"],
+            values["start_time"],
+            values["end_time"],
+        )
+        for _, _, values in batch
+    ]
+    clashes = find_conflicts(bookings, booked_for(bookings))
+    return [
+        (line, raw, conflict_errors(clash))
+        for (line, raw, _), clash in zip(batch, clashes)
+        if clash is not None
+    ]
+
+
+def insert_batch(kind, batch):
+    # Inserts one batch and commits it. Returns the cache tags it touched and
+    # the rows rejected at this stage.
+    model = KINDS[kind][0]
+    rejected = []
+    tags = {kind}
+    if kind in ("venues", "artists"):
+        tags.add(f"index:{kind}")
+    if kind == "shows":
+        rejected = resolve_shows(batch)
+        bad = {line for line, _, _ in rejected}
+        batch = [entry for entry in batch if entry[0] not in bad]
+        rejected += reject_conflicts(batch)
+        bad = {line for line, _, _ in rejected}
+        batch = [entry for entry in batch if entry[0] not in bad]
+        now = datetime.now()
+        for _, _, values in batch:
+            values["counted_past"] = values["start_time"] <= now
+
+    rows = [dict(values, version=1) for _, _, values in batch]
+    if rows:
+        db.session.execute(model.__table__.insert(), rows)
+    if kind == "venues" and rows:
+        areas.refresh({(row["city"], row["state"]) for row in rows})
+    if kind == "shows" and rows:
+        venue_ids = {row["venue_id"] for row in rows}
+        artist_ids = {row["artist_id"] for row in rows}
+        refresh(Venue, venue_ids)
+        refresh(Artist, artist_ids)
+        tags.update(f"venue:{venue_id}" for venue_id in venue_ids)
+        tags.update(f"artist:{artist_id}" for artist_id in artist_ids)
+    db.session.commit()
+    return len(rows), rejected, tags
+
+
+def _load_checkpoint(path, source, kind):
+    if not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        state = json.load(f)
+    if state.get("source") != source or state.get("kind") != kind:
+        raise click.ClickException(f"{path} is a checkpoint for another import.")
+    return state["rows"]
+
+
+def _save_checkpoint(path, source, kind, rows):
+    with open(path + ".tmp", "w") as f:
+        json.dump({"source": source, "kind": kind, "rows": rows}, f)
+    os.replace(path + ".tmp", path)
+
+
+@click.command("import")
+@click.argument("kind", type=click.Choice(sorted(KINDS)))
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--format",
+    "fmt",
+    type=click.Choice(["csv", "jsonl"]),
+    help="Input format; inferred from the file extension by default.",
+)
+@click.option("--batch-size", default=1000, show_default=True, help="Rows per commit.")
+@click.option("--checkpoint", type=click.Path(), help="Default: PATH.checkpoint")
+@click.option("--rejects", type=click.Path(), help="Default: PATH.rejects.jsonl")
+@with_appcontext
+def import_command(kind, path, fmt, batch_size, checkpoint, rejects):
+    """Bulk-load venues, artists or shows from a CSV or JSONL file."""
+    source = os.path.abspath(path)
+    fmt = fmt or ("jsonl" if path.endswith((".jsonl", ".json")) else "csv")
+    checkpoint = checkpoint or path + ".checkpoint"
+    rejects = rejects or path + ".rejects.jsonl"
+    form_class, values_for = KINDS[kind][1:]
+
+    done = _load_checkpoint(checkpoint, source, kind)
+    if done:
+        click.echo(f"Resuming after row {done}.")
+    if not response_cache.backend.shared:
+        click.echo(
+            "The page cache isn't shared: a running server won't see the "
+            "imported rows until its pages and indexes expire.",
+            err=True,
+        )
+    inserted = rejected = 0
+    line = 0
+    batch = []
+    invalid = []
+
+    with open(rejects, "a", encoding="utf-8") as rejects_file:
+
+        def flush():
+            # Rejects are written together with the checkpoint, so resuming
+            # after a crash doesn't report the same rows twice.
+            nonlocal inserted, rejected, batch, invalid
+            count, bad, tags = insert_batch(kind, batch)
+            inserted += count
+            response_cache.invalidate(*tags)
+            for entry_line, raw, errors in sorted(invalid + bad, key=lambda e: e[0]):
+                rejects_file.write(
+                    json.dumps({"row": entry_line, "data": raw, "errors": errors})
+                    + "\n"
+                )
+                rejected += 1
+            rejects_file.flush()
+            _save_checkpoint(checkpoint, source, kind, line)
+            click.echo(f"{line} rows read, {inserted} inserted, {rejected} rejected")
+            batch, invalid = [], []
+
+        for line, raw in enumerate(read_rows(path, fmt), start=1):
+            if line <= done:
+                continue
+            form = form_class(formdata=_formdata(raw), meta={"csrf": False})
+            if form.validate():
+                batch.append((line, raw, values_for(form)))
+            else:
+                invalid.append((line, raw, form.errors))
+            if line % batch_size == 0:
+                flush()
+        flush()
+
+    os.remove(checkpoint)
+    click.echo(f"Done: {inserted} inserted, {rejected} rejected (see {rejects}).")
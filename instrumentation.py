@@ -0,0 +1,121 @@
+import time
+from collections import Counter
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# ----------------------------------------------------------------------------#
+# Request SQL instrumentation.
+# ----------------------------------------------------------------------------#
+
+# Every statement sent by any engine (primary or replica) while a request is
+# being handled is counted and timed, by its parameterized SQL. The totals go
+# out as a Server-Timing header, and requests slower than SLOW_REQUEST_MS are
+# logged with their statement counts. Statements a streamed body runs after
+# the headers are sent are only in the log.
+#
+# With SQL_DUPLICATE_LIMIT set (e.g. in tests), a request that runs the same
+# statement more than that many times raises DuplicateStatementError: the
+# signature of an N+1 query.
+
+
+class DuplicateStatementError(AssertionError):
+    pass
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statements = Counter()
+        self.db_time = 0.0
+
+    @property
+    def count(self):
+        return sum(self.statements.values())
+
+    def duplicates(self):
+        return {sql: n for sql, n in self.statements.items() if n > 1}
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        metrics = [
+            f'db;dur={self.db_time * 1000:.2f};desc="{self.count} statements"',
+            f"app;dur={self.elapsed() * 1000:.2f}",
+        ]
+        repeated = sum(n - 1 for n in self.duplicates().values())
+        if repeated:
+            metrics.append(f'db-dup;desc="{repeated} repeated statements"')
+        return ", ".join(metrics)
+
+
+def _stats():
+    if has_request_context():
+        return g.get("sql_stats")
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, many):
+    if _stats() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, many):
+    stats = _stats()
+    if stats is None or not conn.info.get("query_started"):
+        return
+    stats.db_time += time.perf_counter() - conn.info["query_started"].pop()
+    stats.statements[statement] += 1
+    limit = current_app.config["SQL_DUPLICATE_LIMIT"]
+    if limit is not None and stats.statements[statement] > limit:
+        raise DuplicateStatementError(
+            f"Statement ran {stats.statements[statement]} times "
+            f"(limit {limit}):\n{statement}"
+        )
+
+
+class SQLInstrumentation:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("SLOW_REQUEST_MS", 500)
+        app.config.setdefault("SQL_DUPLICATE_LIMIT", None)
+        if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+            event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+        @app.before_request
+        def start_sql_stats():
+            g.sql_stats = RequestStats()
+
+        @app.after_request
+        def add_server_timing(response):
+            stats = _stats()
+            if stats is not None:
+                response.headers["Server-Timing"] = stats.server_timing()
+            return response
+
+        @app.teardown_request
+        def log_slow_request(exc):
+            stats = _stats()
+            if stats is None:
+                return
+            elapsed = stats.elapsed() * 1000
+            if elapsed < app.config["SLOW_REQUEST_MS"]:
+                return
+            duplicates = sorted(stats.duplicates().items(), key=lambda d: -d[1])
+            app.logger.warning(
+                "Slow request %s %s: %.1f ms, %d statements in %.1f ms%s",
+                request.method,
+                request.full_path,
+                elapsed,
+                stats.count,
+                stats.db_time * 1000,
+                "".join(f"\n  {n}x {sql}" for sql, n in duplicates[:3]),
+            )
+
+
+instrumentation = SQLInstrumentation()
@@ -0,0 +1,73 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.orm import load_only, noload
+
+from models import db
+
+# ----------------------------------------------------------------------------#
+# Loader profiles.
+# ----------------------------------------------------------------------------#
+
+# Venue.shows / Artist.shows are lazy by default; routes that load whole
+# entities pick how much of them (and their shows) to load by naming the use
+# case instead of paying for a LEFT JOIN on Show with every query. Listings,
+# search and exports select just the columns they show, without entities.
+PROFILES = {
+    "detail": {"columns": None, "shows": noload},
+}
+
+
+def loader_options(model, profile):
+    spec = PROFILES[profile]
+    options = [spec["shows"](model.shows)]
+    if spec["columns"]:
+        options.append(load_only(*spec["columns"]))
+    return options
+
+
+def query_for(model, profile):
+    return model.query.options(*loader_options(model, profile))
+
+
+# ----------------------------------------------------------------------------#
+# SQL assertions.
+# ----------------------------------------------------------------------------#
+
+
+@contextmanager
+def capture_sql(engine=None):
+    # Collects every statement sent to the database inside the block.
+    engine = engine or db.engine
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def assert_route_sql(
+    client, path, method="GET", max_statements=None, forbid=(), **kwargs
+):
+    # Requests `path` through a Flask test client and checks the SQL it
+    # emitted: at most `max_statements` statements, none containing any of
+    # the `forbid` fragments (e.g. 'JOIN "Show"').
+    with capture_sql() as statements:
+        response = client.open(path, method=method, **kwargs)
+        response.get_data()
+    if max_statements is not None:
+        assert len(statements) <= max_statements, (
+            f"{method} {path} ran {len(statements)} statements "
+            f"(expected at most {max_statements}):\n" + "\n".join(statements)
+        )
+    for fragment in forbid:
+        offending = [s for s in statements if fragment in s]
+        assert not offending, f"{method} {path} emitted {fragment!r}:\n" + "\n".join(
+            offending
+        )
+    return statements
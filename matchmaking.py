@@ -0,0 +1,252 @@
+import threading
+import time
+
+import numpy as np
+from flask import current_app
+from sqlalchemy.sql.functions import func
+
+from cache import response_cache
+from models import db, Venue, Artist, Show
+
+# ----------------------------------------------------------------------------#
+# Artist-venue matchmaking.
+# ----------------------------------------------------------------------------#
+
+# Each side is held in process as columns: a 0/1 genre matrix (one column per
+# genre seen), area and state codes, and the seeking flag. Recommending for
+# one venue or artist scores every candidate on the other side at once:
+#
+#   score = GENRE * jaccard(genres) + LOCATION * (same city, or half for the
+#           same state) + HISTORY * (shows together, log-scaled)
+#
+# and takes the top k with argpartition, so a request over 100k candidates
+# costs one small matrix-vector product and a handful of vector operations.
+# Handlers in this process update rows as they write; the columns are rebuilt
+# from the database once they are older than MATCH_MAX_AGE seconds, or as soon
+# as `flask import` invalidates their tag (checked every INDEX_CHECK_SECONDS).
+
+GENRE = 0.6
+LOCATION = 0.25
+HISTORY = 0.15
+
+SEEKING = {Venue: Venue.seeking_talent, Artist: Artist.seeking_venue}
+SHOW_KEYS = {Venue: Show.venue_id, Artist: Show.artist_id}
+
+
+class Candidates:
+    def __init__(self, model, tag):
+        self.model = model
+        self.tag = tag
+        self._token = None
+        self._checked_at = None
+        self._built_at = None
+        self._lock = threading.Lock()
+
+    def _rows(self, ids=None):
+        query = db.session.query(
+            self.model.id,
+            self.model.name,
+            self.model.city,
+            self.model.state,
+            self.model.genres,
+            SEEKING[self.model].label("seeking"),
+        )
+        if ids is not None:
+            query = query.filter(self.model.id.in_(ids))
+        return query.order_by(self.model.id).all()
+
+    def build(self):
+        # The token is read first, so an import during the build is seen.
+        token = response_cache.token(self.tag)
+        rows = self._rows()
+        genre_index = {
+            genre: i
+            for i, genre in enumerate(
+                sorted({genre for row in rows for genre in row.genres or ()})
+            )
+        }
+        areas = {}
+        states = {}
+        genres = np.zeros((len(rows), len(genre_index)), dtype=np.float32)
+        for position, row in enumerate(rows):
+            for genre in row.genres or ():
+                genres[position, genre_index[genre]] = 1.0
+        with self._lock:
+            self.ids = np.array([row.id for row in rows], dtype=np.int64)
+            self.names = [row.name for row in rows]
+            self.area = np.array(
+                [areas.setdefault((row.state, row.city), len(areas)) for row in rows],
+                dtype=np.int32,
+            )
+            self.state = np.array(
+                [states.setdefault(row.state, len(states)) for row in rows],
+                dtype=np.int32,
+            )
+            self.seeking = np.array([bool(row.seeking) for row in rows], dtype=bool)
+            self.live = np.ones(len(rows), dtype=bool)
+            self.genres = genres
+            self.genre_counts = genres.sum(axis=1)
+            self._genre_index = genre_index
+            self._areas = areas
+            self._states = states
+            self._token = token
+            self._built_at = self._checked_at = time.monotonic()
+
+    def ensure_built(self):
+        if self._built_at is None:
+            self.build()
+
+    def _ensure_fresh(self):
+        now = time.monotonic()
+        max_age = current_app.config["MATCH_MAX_AGE"]
+        if self._built_at is None or now - self._built_at > max_age:
+            self.build()
+        elif now - self._checked_at > current_app.config["INDEX_CHECK_SECONDS"]:
+            self._checked_at = now
+            if response_cache.token(self.tag) != self._token:
+                self.build()
+
+    def _position(self, entity_id):
+        position = int(np.searchsorted(self.ids, entity_id))
+        if position < len(self.ids) and self.ids[position] == entity_id:
+            return position
+        return None
+
+    def _append(self):
+        # Room for one more row at the end (new rows have the highest id).
+        self.ids = np.append(self.ids, 0)
+        self.names.append(None)
+        self.area = np.append(self.area, -1)
+        self.state = np.append(self.state, -1)
+        self.seeking = np.append(self.seeking, False)
+        self.live = np.append(self.live, True)
+        self.genres = np.vstack([self.genres, np.zeros_like(self.genres[:1])])
+        self.genre_counts = np.append(self.genre_counts, 0.0)
+        return len(self.ids) - 1
+
+    def update(self, entity_id):
+        # Re-reads one row after a write, or appends it if it is new. Rows
+        # with a genre the matrix has no column for are left to the next
+        # rebuild, which this schedules.
+        if self._built_at is None:
+            return
+        rows = self._rows([entity_id])
+        if not rows:
+            self.remove(entity_id)
+            return
+        row = rows[0]
+        with self._lock:
+            if any(genre not in self._genre_index for genre in row.genres or ()):
+                self._built_at = None
+                return
+            position = self._position(entity_id)
+            if position is None:
+                if len(self.ids) and entity_id < self.ids[-1]:
+                    self._built_at = None
+                    return
+                position = self._append()
+                self.ids[position] = entity_id
+            self.names[position] = row.name
+            self.area[position] = self._areas.setdefault(
+                (row.state, row.city), len(self._areas)
+            )
+            self.state[position] = self._states.setdefault(row.state, len(self._states))
+            self.seeking[position] = bool(row.seeking)
+            self.genres[position] = 0.0
+            for genre in row.genres or ():
+                self.genres[position, self._genre_index[genre]] = 1.0
+            self.genre_counts[position] = self.genres[position].sum()
+
+    def remove(self, entity_id):
+        if self._built_at is None:
+            return
+        with self._lock:
+            position = self._position(entity_id)
+            if position is not None:
+                self.live[position] = False
+
+    def _profile(self, genres, city, state):
+        # The vectors a row of the other side is scored with. Under the lock:
+        # they index into the current columns.
+        vector = np.zeros(len(self._genre_index), dtype=np.float32)
+        for genre in genres or ():
+            if genre in self._genre_index:
+                vector[self._genre_index[genre]] = 1.0
+        return (
+            vector,
+            float(len(set(genres or ()))),
+            self._areas.get((state, city), -1),
+            self._states.get(state, -1),
+        )
+
+    def top(self, genres, city, state, history, limit, seeking_only=True):
+        # [(id, name, score)] of the best `limit` candidates for a subject
+        # with these genres and location. `history` maps candidate ids to the
+        # number of shows they played with the subject.
+        self._ensure_fresh()
+        with self._lock:
+            vector, count, area_code, state_code = self._profile(genres, city, state)
+            overlap = self.genres @ vector
+            union = self.genre_counts + count - overlap
+            scores = GENRE * np.divide(
+                overlap, union, out=np.zeros_like(overlap), where=union > 0
+            )
+            scores += LOCATION * (
+                (self.area == area_code) * 0.5 + (self.state == state_code) * 0.5
+            )
+            if history and len(self.ids):
+                ids = np.fromiter(history, dtype=np.int64, count=len(history))
+                shows = np.fromiter(history.values(), dtype=np.float32, count=len(ids))
+                positions = np.searchsorted(self.ids, ids).clip(0, len(self.ids) - 1)
+                found = self.ids[positions] == ids
+                if found.any():
+                    played = np.log1p(shows[found])
+                    scores[positions[found]] += HISTORY * played / played.max()
+            eligible = self.live & self.seeking if seeking_only else self.live
+            scores = np.where(eligible, scores, -1.0)
+            limit = min(limit, int(eligible.sum()))
+            if not limit:
+                return []
+            best = np.argpartition(-scores, limit - 1)[:limit]
+            best = best[np.argsort(-scores[best], kind="stable")]
+            return [
+                (int(self.ids[i]), self.names[i], round(float(scores[i]), 4))
+                for i in best
+            ]
+
+    def stats(self):
+        return {
+            "rows": len(self.ids) if self._built_at is not None else 0,
+            "genres": len(self._genre_index) if self._built_at is not None else 0,
+            "age": (
+                time.monotonic() - self._built_at
+                if self._built_at is not None
+                else None
+            ),
+        }
+
+
+venue_candidates = Candidates(Venue, "index:venues")
+artist_candidates = Candidates(Artist, "index:artists")
+CANDIDATES = {Venue: venue_candidates, Artist: artist_candidates}
+
+
+def matches(model, entity_id, limit=10, seeking_only=True):
+    # The best matches on the other side for one venue or artist, or None if
+    # it doesn't exist.
+    other = Artist if model is Venue else Venue
+    subject = (
+        db.session.query(model.genres, model.city, model.state)
+        .filter(model.id == entity_id)
+        .first()
+    )
+    if subject is None:
+        return None
+    history = dict(
+        db.session.query(SHOW_KEYS[other], func.count(Show.id))
+        .filter(SHOW_KEYS[model] == entity_id)
+        .group_by(SHOW_KEYS[other])
+    )
+    return CANDIDATES[other].top(
+        subject.genres, subject.city, subject.state, history, limit, seeking_only
+    )
@@ -0,0 +1,387 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+import weakref
+from bisect import bisect_left
+
+from flask import g, request, template_rendered, before_render_template
+
+log = logging.getLogger(__name__)
+
+# ----------------------------------------------------------------------------#
+# Prometheus metrics.
+# ----------------------------------------------------------------------------#
+
+# Each thread records into its own shard (plain dicts only that thread writes
+# to), so recording takes no lock; the lock is only held to register or retire
+# a shard and while /metrics sums the shards. A shard is retired, its numbers
+# folded into the totals of finished threads, when its thread ends.
+#
+# Values are per process. With several workers, `share(directory)` has each
+# one write its totals (and its scrape-time samples) to a file there every
+# second and collect() sum them all, so any worker can serve /metrics for the
+# whole server. Gauges are not summed but labelled with their worker's pid.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Totals of exited workers, folded together by retire_worker()
+RETIRED = "retired.json"
+
+
+class _Owner:
+    # Lives in the thread-local next to a shard, so it is released (and its
+    # finalizer run) when the thread ends.
+    __slots__ = ("__weakref__",)
+
+
+def _merge(totals, shard):
+    counters, histograms = totals
+    shard_counters, shard_histograms = shard
+    for key, value in shard_counters.copy().items():
+        counters[key] = counters.get(key, 0) + value
+    for key, histogram in shard_histograms.copy().items():
+        total = histograms.setdefault(key, [0] * len(histogram))
+        for i, value in enumerate(list(histogram)):
+            total[i] += value
+
+
+def _dump(counters, histograms, samples=()):
+    return {
+        "counters": [[*key, value] for key, value in counters.items()],
+        "histograms": [[*key, histogram] for key, histogram in histograms.items()],
+        "samples": [list(sample) for sample in samples],
+    }
+
+
+def _load(data):
+    # JSON turns the label tuples into lists.
+    def labels(pairs):
+        return tuple(tuple(pair) for pair in pairs)
+
+    counters = {(name, labels(l)): value for name, l, value in data["counters"]}
+    histograms = {(name, labels(l)): h for name, l, h in data["histograms"]}
+    samples = [
+        (kind, name, labels(l), value) for kind, name, l, value in data["samples"]
+    ]
+    return (counters, histograms), samples
+
+
+def _write(path, data):
+    # Readers see the old file or the new one, never half of one.
+    partial = f"{path}.{threading.get_ident()}.tmp"
+    with open(partial, "w") as f:
+        json.dump(data, f)
+    os.replace(partial, path)
+
+
+class Registry:
+    def __init__(self):
+        self.help = {}
+        # name -> function returning (type, name, labels, value) samples read at
+        # scrape time (or, when shared, at every write)
+        self.samplers = {}
+        self.directory = None
+        self.interval = 1.0
+        self._reset()
+        # A forked worker starts from nothing: its parent's numbers are the
+        # parent's to report.
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._shards = {}
+        self._retired = ({}, {})
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writer = None
+        self._name = f"{os.getpid()}-{uuid.uuid4().hex[:8]}.json"
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = ({}, {})
+            owner = _Owner()
+            weakref.finalize(owner, self._retire, shard)
+            with self._lock:
+                self._shards[id(shard)] = shard
+                if self.directory is not None and self._writer is None:
+                    self._start_writer()
+            self._local.shard, self._local.owner = shard, owner
+        return shard
+
+    def _retire(self, shard):
+        # Runs when the shard's thread has ended, so nothing writes to it.
+        with self._lock:
+            if self._shards.get(id(shard)) is shard:
+                del self._shards[id(shard)]
+                _merge(self._retired, shard)
+
+    def inc(self, name, labels=(), amount=1):
+        counters = self._shard()[0]
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + amount
+
+    def observe(self, name, labels, value, buckets=LATENCY_BUCKETS):
+        histograms = self._shard()[1]
+        key = (name, labels)
+        histogram = histograms.get(key)
+        if histogram is None:
+            # One count per bucket, then +Inf, then the sum.
+            histogram = histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+        histogram[bisect_left(buckets, value)] += 1
+        histogram[-1] += value
+
+    def _collect_local(self):
+        totals = ({}, {})
+        with self._lock:
+            for shard in [self._retired, *self._shards.values()]:
+                _merge(totals, shard)
+        return totals
+
+    def _samples_local(self):
+        return [sample for sampler in self.samplers.values() for sample in sampler()]
+
+    def collect(self):
+        # Sums all shards: ({(name, labels): value}, {(name, labels): buckets}),
+        # and the scrape-time samples; of every worker when shared.
+        if self.directory is None:
+            return self._collect_local(), self._samples_local()
+        self.write()
+        totals, counters, samples = ({}, {}), {}, []
+        for name, (shard, shard_samples) in _read(self.directory).items():
+            _merge(totals, shard)
+            for kind, sample_name, labels, value in shard_samples:
+                if kind == "counter":
+                    key = (kind, sample_name, labels)
+                    counters[key] = counters.get(key, 0) + value
+                else:
+                    worker = (("worker", name.split("-")[0]),)
+                    samples.append((kind, sample_name, labels + worker, value))
+        samples += [key + (value,) for key, value in counters.items()]
+        return totals, samples
+
+    # Sharing between workers.
+
+    def share(self, directory, interval=1.0):
+        os.makedirs(directory, exist_ok=True)
+        self.directory, self.interval = directory, interval
+
+    def write(self):
+        counters, histograms = self._collect_local()
+        _write(
+            os.path.join(self.directory, self._name),
+            _dump(counters, histograms, self._samples_local()),
+        )
+
+    def _start_writer(self):
+        # One per process, started by its first recording thread (workers are
+        # forked without the parent's threads).
+        def run():
+            while True:
+                time.sleep(self.interval)
+                self._try_write()
+
+        self._writer = threading.Thread(target=run, name="metrics-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self._try_write)
+
+    def _try_write(self):
+        try:
+            self.write()
+        except Exception:
+            log.exception("Couldn't write metrics to %s", self.directory)
+
+
+def _read(directory):
+    # {file name: (totals, samples)} of every worker, and of the exited ones.
+    shared = {}
+    try:
+        with open(os.path.join(directory, RETIRED)) as f:
+            retired = json.load(f)
+    except FileNotFoundError:
+        retired = None
+    for name in os.listdir(directory):
+        if not name.endswith(".json") or name == RETIRED:
+            continue
+        if retired is not None and name in retired["files"]:
+            continue
+        try:
+            with open(os.path.join(directory, name)) as f:
+                shared[name] = _load(json.load(f))
+        except FileNotFoundError:
+            continue
+    if retired is not None:
+        shared[RETIRED] = _load(retired)
+    return shared
+
+
+def retire_worker(directory, pid):
+    # Folds the totals of an exited worker into RETIRED, so its counts outlive
+    # it without a file per worker ever started; its gauges are dropped. Only
+    # the gunicorn master runs this.
+    path = os.path.join(directory, RETIRED)
+    try:
+        with open(path) as f:
+            retired = json.load(f)
+        (totals, _), files = _load(retired), retired["files"]
+    except FileNotFoundError:
+        totals, files = ({}, {}), []
+    names = [
+        name
+        for name in os.listdir(directory)
+        if name.startswith(f"{pid}-") and name.endswith(".json")
+    ]
+    for name in names:
+        with open(os.path.join(directory, name)) as f:
+            _merge(totals, _load(json.load(f))[0])
+    # Readers skip the files listed here, which are removed just after.
+    files = [name for name in files if os.path.exists(os.path.join(directory, name))]
+    _write(path, dict(_dump(*totals), files=files + names))
+    for name in names:
+        os.remove(os.path.join(directory, name))
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in labels
+    )
+    return "{" + pairs + "}"
+
+
+def render(registry, buckets=LATENCY_BUCKETS):
+    # Prometheus text exposition format (0.0.4).
+    (counters, histograms), samples = registry.collect()
+    lines = []
+    typed = set()
+
+    def header(name, kind):
+        if name not in typed:
+            typed.add(name)
+            if name in registry.help:
+                lines.append(f"# HELP {name} {registry.help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), value in sorted(counters.items()):
+        header(name, "counter")
+        lines.append(f"{name}{_labels(labels)} {value}")
+    for kind, name, labels, value in sorted(samples, key=lambda s: s[:3]):
+        header(name, kind)
+        lines.append(f"{name}{_labels(labels)} {value}")
+    for (name, labels), histogram in sorted(histograms.items()):
+        header(name, "histogram")
+        cumulative = 0
+        for bound, count in zip(buckets + ("+Inf",), histogram[:-1]):
+            cumulative += count
+            lines.append(
+                f"{name}_bucket{_labels(labels + (('le', bound),))} {cumulative}"
+            )
+        lines.append(f"{name}_sum{_labels(labels)} {histogram[-1]}")
+        lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+registry.help.update(
+    {
+        "fyyur_http_requests_total": "Requests handled, by endpoint and status.",
+        "fyyur_http_request_duration_seconds": "Request latency, by endpoint.",
+        "fyyur_db_statements_total": "SQL statements run by requests, by endpoint.",
+        "fyyur_db_pool_checked_out": "Connections currently checked out.",
+        "fyyur_db_pool_overflow": "Connections open beyond the pool size.",
+        "fyyur_db_pool_size": "Configured pool size.",
+        "fyyur_cache_requests_total": "Page cache lookups, by result.",
+        "fyyur_cache_hit_ratio": "Page cache hits over lookups.",
+        "fyyur_template_render_seconds": "Template render time, by template.",
+    }
+)
+
+
+# ----------------------------------------------------------------------------#
+# Flask integration.
+# ----------------------------------------------------------------------------#
+
+
+def _start_render(app, template, context):
+    g.setdefault("template_started", []).append(time.perf_counter())
+
+
+def _end_render(app, template, context):
+    if g.get("template_started"):
+        elapsed = time.perf_counter() - g.template_started.pop()
+        registry.observe(
+            "fyyur_template_render_seconds", (("template", template.name),), elapsed
+        )
+
+
+def pool_gauges(db, app):
+    # Checked-out/overflow connections of every engine with a queue pool.
+    gauges = []
+    for bind in [None] + list(app.config.get("SQLALCHEMY_BINDS") or ()):
+        pool = db.get_engine(app, bind=bind).pool
+        if not hasattr(pool, "checkedout"):
+            continue
+        labels = (("bind", bind or "primary"),)
+        gauges.append(("gauge", "fyyur_db_pool_checked_out", labels, pool.checkedout()))
+        gauges.append(
+            ("gauge", "fyyur_db_pool_overflow", labels, max(0, pool.overflow()))
+        )
+        gauges.append(("gauge", "fyyur_db_pool_size", labels, pool.size()))
+    return gauges
+
+
+def cache_samples(response_cache):
+    stats = response_cache.stats()
+    return [
+        ("counter", "fyyur_cache_requests_total", (("result", "hit"),), stats["hits"]),
+        (
+            "counter",
+            "fyyur_cache_requests_total",
+            (("result", "miss"),),
+            stats["misses"],
+        ),
+        ("gauge", "fyyur_cache_hit_ratio", (), stats["hit_ratio"]),
+    ]
+
+
+def init_app(app):
+    if app.config.get("METRICS_DIR"):
+        registry.share(app.config["METRICS_DIR"])
+    # Render timing rides on Flask's template signals, which need blinker.
+    before_render_template.connect(_start_render, app)
+    template_rendered.connect(_end_render, app)
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_status(response):
+        g.response_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def record_request(exc):
+        if "request_started" not in g:
+            return
+        endpoint = request.endpoint or "unmatched"
+        status = 500 if exc is not None else g.get("response_status", 500)
+        registry.inc(
+            "fyyur_http_requests_total",
+            (("endpoint", endpoint), ("method", request.method), ("status", status)),
+        )
+        registry.observe(
+            "fyyur_http_request_duration_seconds",
+            (("endpoint", endpoint),),
+            time.perf_counter() - g.request_started,
+        )
+        if g.get("sql_stats") is not None:
+            registry.inc(
+                "fyyur_db_statements_total",
+                (("endpoint", endpoint),),
+                g.sql_stats.count,
+            )
@@ -1,8 +1,17 @@
-from flask_sqlalchemy import SQLAlchemy
+from datetime import datetime
+
 from sqlalchemy.sql.functions import now
 from sqlalchemy import Column, String, Integer
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import declared_attr
+
+from routing import RoutingSQLAlchemy
+
+db = RoutingSQLAlchemy()
 
-db = SQLAlchemy()
+# Postgres stores genres as a native array; SQLite (local testing) as JSON.
+Genres = db.ARRAY(db.String).with_variant(db.JSON(), "sqlite")
+SearchVector = TSVECTOR().with_variant(db.Text(), "sqlite")
 
 
 # ----------------------------------------------------------------------------#
@@ -10,7 +19,20 @@ db = SQLAlchemy()
 # ----------------------------------------------------------------------------#
 
 
-class Venue(db.Model):
+class Versioned:
+    # Maintained by the ORM on every write; the detail pages use them as
+    # HTTP cache validators.
+    updated_at = db.Column(
+        db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+    version = db.Column(db.Integer, nullable=False)
+
+    @declared_attr
+    def __mapper_args__(cls):
+        return {"version_id_col": cls.version}
+
+
+class Venue(Versioned, db.Model):
     __tablename__ = "Venue"
 
     id = db.Column(db.Integer, primary_key=True)
@@ -23,14 +45,46 @@ class Venue(db.Model):
     facebook_link = db.Column(db.String(120))
     seeking_talent = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.String(120))
-    genres = db.Column(db.ARRAY(db.String), nullable=False)
+    genres = db.Column(Genres, nullable=False)
     website = db.Column(db.String(120))
-    shows = db.relationship("Show", backref="venue", lazy='joined')
+    shows = db.relationship("Show", backref="venue")
+    # Denormalized show counters, maintained by counters.py.
+    upcoming_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default="0"
+    )
+    past_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default="0"
+    )
+    # Maintained by a database trigger, see search.py.
+    search_vector = db.deferred(db.Column(SearchVector))
+
+    __table_args__ = (
+        db.Index("ix_Venue_updated_at", "updated_at", "id"),
+        db.Index("ix_Venue_area", "state", "city", "name", "id"),
+        db.Index("ix_Venue_search_vector", "search_vector", postgresql_using="gin"),
+        db.Index("ix_Venue_genres", "genres", postgresql_using="gin"),
+        db.Index(
+            "ix_Venue_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
 
     # TODO: implement any missing fields, as a database migration using Flask-Migrate
 
 
-class Artist(db.Model):
+class Area(db.Model):
+    # Venue directory summary per (city, state), maintained by areas.py.
+    __tablename__ = "Area"
+
+    state = db.Column(db.String(120), primary_key=True)
+    city = db.Column(db.String(120), primary_key=True)
+    venue_count = db.Column(db.Integer, nullable=False, default=0)
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class Artist(Versioned, db.Model):
     __tablename__ = "Artist"
 
     id = db.Column(db.Integer, primary_key=True)
@@ -38,22 +92,59 @@ class Artist(db.Model):
     city = db.Column(db.String(120))
     state = db.Column(db.String(120))
     phone = db.Column(db.String(120))
-    genres = db.Column(db.ARRAY(db.String), nullable=False)
+    genres = db.Column(Genres, nullable=False)
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
     seeking_venue = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.String(120))
     website = db.Column(db.String(120))
-    shows = db.relationship("Show", backref="artist", lazy='joined')
-
-
-class Show(db.Model):
+    shows = db.relationship("Show", backref="artist")
+    # Denormalized show counters, maintained by counters.py.
+    upcoming_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default="0"
+    )
+    past_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default="0"
+    )
+    # Maintained by a database trigger, see search.py.
+    search_vector = db.deferred(db.Column(SearchVector))
+
+    __table_args__ = (
+        db.Index("ix_Artist_updated_at", "updated_at", "id"),
+        db.Index("ix_Artist_search_vector", "search_vector", postgresql_using="gin"),
+        db.Index("ix_Artist_genres", "genres", postgresql_using="gin"),
+        db.Index(
+            "ix_Artist_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
+
+
+class Show(Versioned, db.Model):
     __tablename__ = "Show"
 
     id = db.Column(db.Integer, primary_key=True)
     artist_id = db.Column(db.Integer, db.ForeignKey("Artist.id"), nullable=False)
     venue_id = db.Column(db.Integer, db.ForeignKey("Venue.id"), nullable=False)
     start_time = db.Column(db.DateTime, nullable=False)
+    # Bookings are [start_time, end_time); see scheduling.py.
+    end_time = db.Column(db.DateTime, nullable=False)
+    # Whether this show is counted in the past (rather than upcoming) counters.
+    counted_past = db.Column(
+        db.Boolean, nullable=False, default=False, server_default=db.false()
+    )
+
+    __table_args__ = (
+        db.Index("ix_Show_updated_at", "updated_at", "id"),
+        # Past/upcoming splits and calendars: an equality on one side, then a
+        # range on start_time.
+        db.Index("ix_Show_venue_id_start_time", "venue_id", "start_time"),
+        db.Index("ix_Show_artist_id_start_time", "artist_id", "start_time"),
+        db.Index("ix_Show_start_time", "start_time", "id"),
+        db.CheckConstraint("end_time > start_time", name="ck_Show_end_after_start"),
+    )
 
     # TODO: implement any missing fields, as a database migration using Flask-Migrate
 
@@ -0,0 +1,138 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from flask import abort, current_app, request, url_for
+from sqlalchemy import tuple_
+
+# ----------------------------------------------------------------------------#
+# Keyset pagination.
+# ----------------------------------------------------------------------------#
+
+
+def encode_cursor(direction, values):
+    payload = json.dumps([direction, values], default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, keys):
+    # Cursors are opaque to clients; anything that doesn't decode to a
+    # direction plus one value per sort key is a bad request.
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        direction, values = json.loads(base64.urlsafe_b64decode(padded))
+        if direction not in ("next", "prev") or len(values) != len(keys):
+            raise ValueError(cursor)
+        values = [
+            (
+                datetime.fromisoformat(value)
+                if value is not None and key.type.python_type is datetime
+                else value
+            )
+            for key, value in zip(keys, values)
+        ]
+    except (binascii.Error, TypeError, ValueError):
+        abort(400)
+    return direction, values
+
+
+def page_size(per_page=None):
+    per_page = per_page or current_app.config["PAGE_SIZE"]
+    return max(1, min(per_page, current_app.config["MAX_PAGE_SIZE"]))
+
+
+class Page:
+    def __init__(self, items, keys, has_prev=False, has_next=False):
+        self.items = items
+        self.keys = keys
+        self.has_prev = has_prev
+        self.has_next = has_next
+        self.first = items[0] if items else None
+        self.last = items[-1] if items else None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def _cursor(self, direction, row):
+        return encode_cursor(direction, [getattr(row, key.key) for key in self.keys])
+
+    @property
+    def next_cursor(self):
+        if self.has_next and self.last is not None:
+            return self._cursor("next", self.last)
+
+    @property
+    def prev_cursor(self):
+        if self.has_prev and self.first is not None:
+            return self._cursor("prev", self.first)
+
+    def url(self, cursor):
+        # Link to the same endpoint with the same arguments, other than cursor.
+        args = request.args.to_dict(flat=False)
+        args.update(request.view_args or {})
+        args["cursor"] = cursor
+        return url_for(request.endpoint, **args)
+
+
+class StreamedPage(Page):
+    # Rows are consumed lazily (e.g. from a server-side cursor) and are not
+    # kept; next_cursor is only known once the page has been iterated, which
+    # is fine for templates that render their pager after the rows.
+    def __init__(self, rows, keys, per_page, has_prev=False):
+        super().__init__([], keys, has_prev=has_prev)
+        self.rows = rows
+        self.per_page = per_page
+
+    def __iter__(self):
+        for count, row in enumerate(self.rows):
+            if count == self.per_page:
+                self.has_next = True
+                continue
+            if self.first is None:
+                self.first = row
+            self.last = row
+            yield row
+
+
+def paginate(query, keys, cursor=None, per_page=None, stream=False):
+    # Orders `query` by `keys` (ascending, unique as a tuple) and returns one
+    # page of rows after/before the cursor position. Rows must expose each
+    # key column as an attribute of the same name.
+    per_page = page_size(per_page)
+    direction, values = decode_cursor(cursor, keys) if cursor else ("next", None)
+
+    if direction == "prev":
+        query = query.filter(tuple_(*keys) < tuple_(*values))
+        rows = query.order_by(*[key.desc() for key in keys]).limit(per_page + 1).all()
+        items = rows[:per_page]
+        items.reverse()
+        return Page(items, keys, has_prev=len(rows) > per_page, has_next=True)
+
+    if values is not None:
+        query = query.filter(tuple_(*keys) > tuple_(*values))
+    query = query.order_by(*keys).limit(per_page + 1)
+    if stream:
+        return StreamedPage(
+            query.yield_per(current_app.config["YIELD_PER"]),
+            keys,
+            per_page,
+            has_prev=values is not None,
+        )
+    rows = query.all()
+    return Page(
+        rows[:per_page],
+        keys,
+        has_prev=values is not None,
+        has_next=len(rows) > per_page,
+    )
+
+
+def paginate_request(query, keys, stream=False):
+    return paginate(
+        query,
+        keys,
+        cursor=request.args.get("cursor"),
+        per_page=request.args.get("per_page", type=int),
+        stream=stream,
+    )
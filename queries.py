@@ -0,0 +1,108 @@
+from datetime import datetime
+
+from sqlalchemy import case
+from sqlalchemy.sql.functions import func
+
+from models import db, Venue, Artist, Show
+
+# ----------------------------------------------------------------------------#
+# Show count aggregation.
+# ----------------------------------------------------------------------------#
+
+
+def show_counts(key, now=None):
+    # Upcoming/past show counts per venue or artist in a single grouped pass
+    # over Show. `key` is Show.venue_id or Show.artist_id.
+    now = now or datetime.now()
+    query = db.session.query(
+        key.label("id"),
+        func.count(case((Show.start_time > now, Show.id))).label("upcoming"),
+        func.count(case((Show.start_time <= now, Show.id))).label("past"),
+    )
+    return query.group_by(key).subquery()
+
+
+# ----------------------------------------------------------------------------#
+# Page validators.
+# ----------------------------------------------------------------------------#
+
+
+def _page_state(model, other, key, other_key, entity_id, now=None):
+    # Everything a venue/artist detail page is built from, reduced to one
+    # aggregate row: the entity's version, its shows, the entities on the other
+    # side of those shows, and how many shows have started by `now`.
+    now = now or datetime.now()
+    return (
+        db.session.query(
+            model.version,
+            model.updated_at,
+            func.count(Show.id),
+            func.count(case((Show.start_time < now, Show.id))),
+            func.max(Show.updated_at),
+            func.max(other.updated_at),
+        )
+        .outerjoin(Show, key == model.id)
+        .outerjoin(other, other.id == other_key)
+        .filter(model.id == entity_id)
+        .group_by(model.id)
+        .first()
+    )
+
+
+def venue_page_state(venue_id, now=None):
+    return _page_state(Venue, Artist, Show.venue_id, Show.artist_id, venue_id, now)
+
+
+def artist_page_state(artist_id, now=None):
+    return _page_state(Artist, Venue, Show.artist_id, Show.venue_id, artist_id, now)
+
+
+# ----------------------------------------------------------------------------#
+# Time windows.
+# ----------------------------------------------------------------------------#
+
+# Shows are filtered on a half-open [start, end) window of start_time, which
+# (with a venue_id/artist_id equality in front) is a range scan over
+# ix_Show_start_time or ix_Show_{venue,artist}_id_start_time.
+
+SHOW_SIDES = {
+    Venue: (Show.venue_id, Artist, Show.artist_id),
+    Artist: (Show.artist_id, Venue, Show.venue_id),
+}
+
+
+def parse_window(start, end):
+    # ISO 8601 dates or timestamps; either bound may be missing. Raises
+    # ValueError for anything else or an empty window.
+    start = datetime.fromisoformat(start) if start else None
+    end = datetime.fromisoformat(end) if end else None
+    if start is not None and end is not None and end <= start:
+        raise ValueError("The window ends before it starts.")
+    return start, end
+
+
+def in_window(query, start=None, end=None):
+    if start is not None:
+        query = query.filter(Show.start_time >= start)
+    if end is not None:
+        query = query.filter(Show.start_time < end)
+    return query
+
+
+def calendar(model, entity_id, start, end):
+    # A venue's or artist's shows starting in [start, end), in start order,
+    # each with the other side's id, name and image.
+    key, other, other_key = SHOW_SIDES[model]
+    query = (
+        db.session.query(
+            Show.id,
+            Show.start_time,
+            Show.end_time,
+            other.id.label("other_id"),
+            other.name.label("other_name"),
+            other.image_link.label("other_image_link"),
+        )
+        .join(other, other.id == other_key)
+        .filter(key == entity_id)
+    )
+    return in_window(query, start, end).order_by(Show.start_time, Show.id)
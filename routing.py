@@ -0,0 +1,94 @@
+import random
+import time
+
+from flask import g, has_request_context, request, session
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
+from sqlalchemy.orm import Session as SessionBase, sessionmaker
+from sqlalchemy.sql import Select
+
+# ----------------------------------------------------------------------------#
+# Read replica routing.
+# ----------------------------------------------------------------------------#
+
+# Every bind in SQLALCHEMY_BINDS whose key starts with "replica" is a read
+# replica of the primary database. Plain SELECTs issued while handling a GET
+# or HEAD request go to one replica, picked once per request; flushes, locking
+# reads, other statements and all other requests use the primary. After a
+# request that may have written, the client's session is pinned to the
+# primary for DB_STICKY_SECONDS so it reads its own writes while replicas
+# catch up.
+
+READ_METHODS = ("GET", "HEAD")
+
+
+def read_replica(app):
+    # The replica bind key to read from in the current request, if any.
+    if not has_request_context():
+        return None
+    if "db_read_bind" not in g:
+        replicas = app.extensions.get("db_replicas")
+        pinned = session.get("db_primary_until", 0) > time.time()
+        g.db_read_bind = (
+            random.choice(replicas)
+            if replicas and request.method in READ_METHODS and not pinned
+            else None
+        )
+    return g.db_read_bind
+
+
+class RoutingSession(SignallingSession):
+    def __init__(self, db, **options):
+        self.db = db
+        super().__init__(db, **options)
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        replica = read_replica(self.app)
+        if (
+            replica is not None
+            and not self._flushing
+            and isinstance(clause, Select)
+            and clause._for_update_arg is None
+        ):
+            return self.db.get_engine(self.app, bind=replica)
+        # Tables with a __bind_key__ are in the session's `binds`.
+        return SessionBase.get_bind(self, mapper, clause, **kwargs)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    def init_app(self, app):
+        app.config.setdefault("DB_STATEMENT_TIMEOUT", None)
+        app.config.setdefault("DB_STICKY_SECONDS", 5)
+        super().init_app(app)
+        app.extensions["db_replicas"] = sorted(
+            key
+            for key in app.config.get("SQLALCHEMY_BINDS") or ()
+            if key.startswith("replica")
+        )
+
+        @app.after_request
+        def pin_to_primary(response):
+            if app.extensions["db_replicas"] and request.method not in READ_METHODS:
+                session["db_primary_until"] = (
+                    time.time() + app.config["DB_STICKY_SECONDS"]
+                )
+            return response
+
+    def create_session(self, options):
+        return sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def create_engine(self, sa_url, engine_opts):
+        engine_opts = dict(engine_opts)
+        if sa_url.drivername == "sqlite":
+            # SQLite files don't use a queue pool.
+            for option in ("pool_size", "max_overflow", "pool_timeout"):
+                engine_opts.pop(option, None)
+        elif sa_url.drivername.startswith("postgresql"):
+            timeout = self.get_app().config["DB_STATEMENT_TIMEOUT"]
+            if timeout:
+                connect_args = engine_opts["connect_args"] = dict(
+                    engine_opts.get("connect_args", {})
+                )
+                connect_args["options"] = (
+                    connect_args.get("options", "") + f" -c statement_timeout={timeout}"
+                ).strip()
+        return super().create_engine(sa_url, engine_opts)
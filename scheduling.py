@@ -0,0 +1,190 @@
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import timedelta
+
+from sqlalchemy import DDL, event, or_
+
+from models import db, Show
+
+# ----------------------------------------------------------------------------#
+# Schema.
+# ----------------------------------------------------------------------------#
+
+# A show books its venue and its artist for [start_time, end_time); two
+# bookings of the same venue or artist may not overlap (back-to-back is fine).
+# On Postgres this is enforced by exclusion constraints over
+# tsrange(start_time, end_time), each backed by a GiST index (btree_gist
+# supplies the integer equality part). SQLite, used for local testing, only
+# gets the checks below. The migration creates the same constraints for
+# deployed databases; these hooks cover db.create_all().
+
+DEFAULT_SHOW_LENGTH = timedelta(hours=2)
+
+event.listen(
+    db.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS btree_gist").execute_if(dialect="postgresql"),
+)
+for _side in ("venue", "artist"):
+    event.listen(
+        Show.__table__,
+        "after_create",
+        DDL(
+            f'ALTER TABLE "Show" ADD CONSTRAINT "ex_Show_{_side}_booking" '
+            f"EXCLUDE USING gist ({_side}_id WITH =, "
+            "tsrange(start_time, end_time) WITH &&)"
+        ).execute_if(dialect="postgresql"),
+    )
+
+
+def show_end(start_time, minutes=None):
+    if minutes is None:
+        return start_time + DEFAULT_SHOW_LENGTH
+    return start_time + timedelta(minutes=minutes)
+
+
+# ----------------------------------------------------------------------------#
+# Conflict checks.
+# ----------------------------------------------------------------------------#
+
+# Proposed bookings are checked in memory against the stored ones (and each
+# other), so validating an import of n shows costs one query plus
+# O(n log n) comparisons instead of a query per show.
+
+
+class IntervalIndex:
+    # Static index over [start, end) intervals that may overlap each other:
+    # sorted by start, with the furthest-reaching interval among each prefix,
+    # so finding an interval that overlaps a query is one bisect.
+    def __init__(self, intervals):
+        self._intervals = sorted(intervals)
+        self._starts = [start for start, _ in self._intervals]
+        self._furthest = []
+        best = None
+        for i, (_, end) in enumerate(self._intervals):
+            if best is None or end > self._intervals[best][1]:
+                best = i
+            self._furthest.append(best)
+
+    def overlapping(self, start, end):
+        k = bisect_left(self._starts, end)
+        if k:
+            found = self._intervals[self._furthest[k - 1]]
+            if found[1] > start:
+                return found
+        return None
+
+
+class Calendar:
+    # Disjoint [start, end) intervals accepted one at a time, each starting
+    # at one of `starts`, known up front. A Fenwick tree over those starts
+    # counts the accepted ones, so the neighbours of a new interval (the only
+    # ones that can overlap it) are found, and it is added, in O(log n).
+    def __init__(self, starts):
+        self._starts = sorted(set(starts))
+        self._ends = {}
+        self._tree = [0] * (len(self._starts) + 1)
+
+    def _count(self, k):
+        # Accepted intervals among the first k starts.
+        total = 0
+        while k:
+            total += self._tree[k]
+            k &= k - 1
+        return total
+
+    def _nth(self, n):
+        # Position of the n-th (1-based) accepted start.
+        position = 0
+        step = 1 << (len(self._tree) - 1).bit_length()
+        while step:
+            if position + step < len(self._tree) and self._tree[position + step] < n:
+                position += step
+                n -= self._tree[position]
+            step >>= 1
+        return position
+
+    def _interval(self, position):
+        return self._starts[position], self._ends[position]
+
+    def overlapping(self, start, end):
+        before = self._count(bisect_left(self._starts, start))
+        if before:
+            found = self._interval(self._nth(before))
+            if found[1] > start:
+                return found
+        if self._count(bisect_left(self._starts, end)) > before:
+            return self._interval(self._nth(before + 1))
+        return None
+
+    def add(self, start, end):
+        position = bisect_left(self._starts, start)
+        self._ends[position] = end
+        k = position + 1
+        while k < len(self._tree):
+            self._tree[k] += 1
+            k += k & -k
+
+
+def find_conflicts(proposed, booked=()):
+    # `proposed` and `booked` are (venue_id, artist_id, start, end) tuples.
+    # Returns, for each proposal in order, None if it is free or the
+    # ("venue" | "artist", start, end) booking it clashes with. Proposals are
+    # accepted first come, first served: one that clashes doesn't block later
+    # ones.
+    stored = defaultdict(list)
+    for venue_id, artist_id, start, end in booked:
+        stored["venue", venue_id].append((start, end))
+        stored["artist", artist_id].append((start, end))
+    indexes = {key: IntervalIndex(intervals) for key, intervals in stored.items()}
+    starts = defaultdict(list)
+    for venue_id, artist_id, start, _ in proposed:
+        starts["venue", venue_id].append(start)
+        starts["artist", artist_id].append(start)
+    accepted = {key: Calendar(key_starts) for key, key_starts in starts.items()}
+
+    results = []
+    for venue_id, artist_id, start, end in proposed:
+        keys = (("venue", venue_id), ("artist", artist_id))
+        clash = None
+        for key in keys:
+            found = accepted[key].overlapping(start, end)
+            if found is None and key in indexes:
+                found = indexes[key].overlapping(start, end)
+            if found is not None:
+                clash = (key[0],) + found
+                break
+        if clash is None:
+            for key in keys:
+                accepted[key].add(start, end)
+        results.append(clash)
+    return results
+
+
+def booked_for(proposed):
+    # The stored bookings that could clash with `proposed`: those of the same
+    # venues and artists that overlap the proposals' overall time span.
+    if not proposed:
+        return []
+    venue_ids = {venue_id for venue_id, _, _, _ in proposed}
+    artist_ids = {artist_id for _, artist_id, _, _ in proposed}
+    return (
+        db.session.query(Show.venue_id, Show.artist_id, Show.start_time, Show.end_time)
+        .filter(
+            or_(Show.venue_id.in_(venue_ids), Show.artist_id.in_(artist_ids)),
+            Show.start_time < max(end for _, _, _, end in proposed),
+            Show.end_time > min(start for _, _, start, _ in proposed),
+        )
+        .all()
+    )
+
+
+def conflict_errors(clash):
+    # Form-style errors for a clash returned by find_conflicts().
+    side, start, end = clash
+    return {
+        f"{side}_id": [
+            f"The {side} is already booked from {start:%Y-%m-%d %H:%M} "
+            f"to {end:%Y-%m-%d %H:%M}."
+        ]
+    }
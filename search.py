@@ -0,0 +1,153 @@
+import re
+
+from flask import current_app
+from sqlalchemy import DDL, Float, Integer, event, literal, or_, text
+from sqlalchemy.sql.functions import func
+
+from models import db, Venue, Artist
+
+# ----------------------------------------------------------------------------#
+# Schema.
+# ----------------------------------------------------------------------------#
+
+# On Postgres every Venue/Artist row carries a tsvector over name, city, state
+# and genres (kept current by a trigger) with a GIN index, plus a pg_trgm GIN
+# index on name for substring matches. On SQLite, used for local testing, an
+# external-content FTS5 table with the trigram tokenizer plays both roles.
+# The migration creates the same objects for deployed databases; these hooks
+# cover db.create_all().
+
+SEARCHABLE = (Venue, Artist)
+
+PG_SEARCH_VECTOR_FUNCTION = """
+CREATE OR REPLACE FUNCTION fyyur_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('simple',
+            coalesce(NEW.city, '') || ' ' || coalesce(NEW.state, '')), 'B') ||
+        setweight(to_tsvector('simple',
+            coalesce(array_to_string(NEW.genres, ' '), '')), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql
+"""
+
+event.listen(
+    db.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+event.listen(
+    db.metadata,
+    "before_create",
+    DDL(PG_SEARCH_VECTOR_FUNCTION).execute_if(dialect="postgresql"),
+)
+
+
+def fts_table(model):
+    return f"{model.__tablename__}_fts"
+
+
+def _install(model):
+    table = model.__tablename__
+    fts = fts_table(model)
+    columns = "name, city, state, genres"
+    new_values = "new.id, new.name, new.city, new.state, new.genres"
+    old_values = "old.id, old.name, old.city, old.state, old.genres"
+
+    postgresql = [
+        f'CREATE TRIGGER "{table}_search_vector" '
+        f'BEFORE INSERT OR UPDATE OF name, city, state, genres ON "{table}" '
+        f"FOR EACH ROW EXECUTE FUNCTION fyyur_search_vector_update()",
+    ]
+    sqlite = [
+        f'CREATE VIRTUAL TABLE "{fts}" USING fts5({columns}, '
+        f"content='{table}', content_rowid='id', tokenize='trigram')",
+        f'CREATE TRIGGER "{fts}_ai" AFTER INSERT ON "{table}" BEGIN '
+        f'INSERT INTO "{fts}"(rowid, {columns}) VALUES ({new_values}); END',
+        f'CREATE TRIGGER "{fts}_ad" AFTER DELETE ON "{table}" BEGIN '
+        f'INSERT INTO "{fts}"("{fts}", rowid, {columns}) '
+        f"VALUES ('delete', {old_values}); END",
+        f'CREATE TRIGGER "{fts}_au" AFTER UPDATE ON "{table}" BEGIN '
+        f'INSERT INTO "{fts}"("{fts}", rowid, {columns}) '
+        f"VALUES ('delete', {old_values}); "
+        f'INSERT INTO "{fts}"(rowid, {columns}) VALUES ({new_values}); END',
+    ]
+    for statement in postgresql:
+        event.listen(
+            model.__table__,
+            "after_create",
+            DDL(statement).execute_if(dialect="postgresql"),
+        )
+    for statement in sqlite:
+        event.listen(
+            model.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite")
+        )
+    event.listen(
+        model.__table__,
+        "before_drop",
+        DDL(f'DROP TABLE IF EXISTS "{fts}"').execute_if(dialect="sqlite"),
+    )
+
+
+for model in SEARCHABLE:
+    _install(model)
+
+
+# ----------------------------------------------------------------------------#
+# Queries.
+# ----------------------------------------------------------------------------#
+
+
+def _like_pattern(term):
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _postgresql_matches(model, term, limit):
+    conditions = [model.name.ilike(_like_pattern(term), escape="\\")]
+    rank = literal(0.0)
+    words = re.findall(r"\w+", term.lower())
+    if words:
+        query = func.to_tsquery("simple", " & ".join(f"{word}:*" for word in words))
+        conditions.append(model.search_vector.op("@@")(query))
+        rank = func.ts_rank(model.search_vector, query)
+    return (
+        db.session.query(model.id.label("id"), rank.label("rank"))
+        .filter(or_(*conditions))
+        .order_by(rank.desc(), model.id)
+        .limit(limit)
+        .cte("matches")
+    )
+
+
+def _sqlite_matches(model, term, limit):
+    # The trigram tokenizer needs at least three characters to match.
+    if len(term.strip()) < 3:
+        return (
+            db.session.query(model.id.label("id"), literal(0.0).label("rank"))
+            .filter(model.name.like(_like_pattern(term), escape="\\"))
+            .order_by(model.id)
+            .limit(limit)
+            .cte("matches")
+        )
+    fts = fts_table(model)
+    return (
+        text(
+            f'SELECT rowid AS id, -bm25("{fts}") AS rank FROM "{fts}" '
+            f'WHERE "{fts}" MATCH :query ORDER BY rank DESC LIMIT :limit'
+        )
+        .bindparams(query='"' + term.replace('"', '""') + '"', limit=limit)
+        .columns(id=Integer, rank=Float)
+        .cte("matches")
+    )
+
+
+def search(model, term, limit=None):
+    # Returns a CTE of (id, rank) for the best `limit` matches of `term`
+    # against the model's name, city, state and genres.
+    limit = limit or current_app.config["SEARCH_RESULT_LIMIT"]
+    if db.engine.dialect.name == "sqlite":
+        return _sqlite_matches(model, term, limit)
+    return _postgresql_matches(model, term, limit)
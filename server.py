@@ -0,0 +1,182 @@
+"""Production server: gunicorn hooks, and graceful reloads.
+
+gunicorn                     # settings in gunicorn.conf.py, app in wsgi.py
+python server.py reload      # new workers on the current code, then old ones stop
+python server.py stop        # finish in-flight requests, then exit
+
+gunicorn.conf.py preloads the app in the master process and calls warm()
+before forking workers, so templates, the asset manifest and the in-process
+autocomplete/matchmaking indexes are loaded once and shared copy-on-write.
+Database connections can't be shared across a fork: the master only checks
+that every database answers, then closes its connections, and each worker
+opens its own pool in warm_pool(). Workers also count their own requests, and
+write them to METRICS_DIR for /metrics to sum; an exited worker's counts are
+folded into the totals there by retire_metrics().
+
+A preloaded master keeps running the code it started with, so reload
+re-executes it (USR2). gunicorn writes the new master's pid to <pidfile>.2
+while the old one still owns <pidfile>. The new master loads and warms the
+new code while the old one keeps serving. Once the new master's first worker
+has booted, that worker stops the old master with TERM, which lets the old
+workers finish their requests. The new master then takes over <pidfile>. If
+the new master fails to start, the old one keeps serving.
+"""
+
+import argparse
+import os
+import signal
+import sys
+import time
+
+basedir = os.path.abspath(os.path.dirname(__file__))
+PIDFILE = os.environ.get("GUNICORN_PIDFILE", os.path.join(basedir, "gunicorn.pid"))
+
+
+def _engines(app):
+    from models import db
+
+    return [
+        db.get_engine(app, bind=bind)
+        for bind in [None] + list(app.config.get("SQLALCHEMY_BINDS") or ())
+    ]
+
+
+def check_cache(app, workers):
+    # Tag invalidations only reach the worker that made them unless the
+    # page cache backend is shared, so other workers would serve stale pages.
+    backend = app.extensions["response_cache"].backend
+    if workers > 1 and app.config["CACHE_ENABLED"] and not backend.shared:
+        raise RuntimeError(
+            f"{type(backend).__name__} is per-process; set CACHE_REDIS_URL to "
+            "share the page cache between workers (or run one worker)."
+        )
+
+
+def check_metrics(app, workers):
+    # Every worker counts its own requests; with several, /metrics can only
+    # report them all if they write them to METRICS_DIR. Its files are from
+    # the previous run, so it starts empty.
+    directory = app.config.get("METRICS_DIR")
+    if directory is None:
+        if workers > 1:
+            raise RuntimeError(
+                "Metrics are per-process; set METRICS_DIR so /metrics sums "
+                "every worker's (or run one worker)."
+            )
+        return
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+
+
+def retire_metrics(app, pid):
+    # child_exit hook: keeps an exited worker's counts in the totals.
+    import metrics
+
+    if app.config.get("METRICS_DIR"):
+        metrics.retire_worker(app.config["METRICS_DIR"], pid)
+
+
+def warm(app):
+    # In the master, before the fork.
+    import assets
+    from autocomplete import NAME_INDEXES
+    from matchmaking import CANDIDATES
+    from models import db
+
+    with app.app_context():
+        for engine in _engines(app):
+            with engine.connect() as connection:
+                connection.execute(db.text("SELECT 1"))
+        assets.manifest()
+        for index in NAME_INDEXES.values():
+            index.build()
+        for candidates in CANDIDATES.values():
+            candidates.build()
+        db.session.remove()
+        for engine in _engines(app):
+            engine.dispose()
+
+
+def warm_pool(app, connections):
+    # In each worker, after the fork: opens `connections` connections per
+    # database, so the first requests don't wait for them.
+    with app.app_context():
+        for engine in _engines(app):
+            opened = [engine.connect() for _ in range(connections)]
+            for connection in opened:
+                connection.close()
+
+
+# ----------------------------------------------------------------------------#
+# Signals.
+# ----------------------------------------------------------------------------#
+
+
+def _read_pid(path):
+    try:
+        with open(path) as f:
+            return int(f.read().strip())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+def retire_old_master(worker):
+    # post_worker_init hook. Workers of a master started by reload carry the
+    # old master's pid (GUNICORN_PID) until the new master is promoted; the
+    # first one to boot stops it. The pid must still be the one in the pid
+    # file, so a recycled pid is never signalled.
+    old = int(os.environ.get("GUNICORN_PID") or 0)
+    if old and _read_pid(worker.cfg.pidfile) == old and _running(old):
+        os.kill(old, signal.SIGTERM)
+
+
+def reload(pidfile=PIDFILE, timeout=120):
+    old = _read_pid(pidfile)
+    if old is None or not _running(old):
+        sys.exit(f"No gunicorn master running (no pid in {pidfile}).")
+    os.kill(old, signal.SIGUSR2)
+    new_pidfile = f"{pidfile}.2"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(0.5)
+        new = _read_pid(pidfile)
+        if new is not None and new != old and _running(new):
+            print(f"Reloaded: master {old} -> {new}.")
+            return
+        new = _read_pid(new_pidfile)
+        if new is not None and not _running(new):
+            # The new master exited before taking over; the old one never
+            # got its TERM and is still serving.
+            os.remove(new_pidfile)
+            sys.exit(f"The new master {new} failed to start; {old} keeps serving.")
+    new = _read_pid(new_pidfile)
+    state = f"new master {new} hasn't taken over" if new else "no new master started"
+    sys.exit(f"Reload timed out after {timeout}s: {state}; check the error log.")
+
+
+def stop(pidfile=PIDFILE):
+    pid = _read_pid(pidfile)
+    if pid is None or not _running(pid):
+        sys.exit(f"No gunicorn master running (no pid in {pidfile}).")
+    os.kill(pid, signal.SIGTERM)
+    print(f"Stopping master {pid}.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["reload", "stop"])
+    parser.add_argument("--pidfile", default=PIDFILE)
+    parser.add_argument("--timeout", type=int, default=120)
+    args = parser.parse_args()
+    if args.command == "reload":
+        reload(args.pidfile, args.timeout)
+    else:
+        stop(args.pidfile)
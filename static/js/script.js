@@ -2,3 +2,50 @@ window.parseISOString = function parseISOString(s) {
   var b = s.split(/\D+/);
   return new Date(Date.UTC(b[0], --b[1], b[2], b[3], b[4], b[5], b[6]));
 };
+
+// Fills the <datalist> of inputs with a data-autocomplete URL from the
+// server's name index as the user types. Options carry the row id, or the
+// name when data-autocomplete-value="name".
+document.addEventListener('DOMContentLoaded', function () {
+  document.querySelectorAll('input[data-autocomplete]').forEach(function (input) {
+    var list = document.getElementById(input.getAttribute('list'));
+    var useName = input.getAttribute('data-autocomplete-value') === 'name';
+    var timer = null;
+    input.addEventListener('input', function () {
+      clearTimeout(timer);
+      timer = setTimeout(function () {
+        var url = input.getAttribute('data-autocomplete') + '?q=' + encodeURIComponent(input.value);
+        fetch(url).then(function (response) {
+          return response.json();
+        }).then(function (suggestions) {
+          list.innerHTML = '';
+          suggestions.forEach(function (suggestion) {
+            var option = document.createElement('option');
+            option.value = useName ? suggestion.name : suggestion.id;
+            option.textContent = useName ? '' : suggestion.name;
+            list.appendChild(option);
+          });
+        });
+      }, 100);
+    });
+  });
+});
+
+// Loads an area's venue list into the directory the first time it is opened.
+document.addEventListener('DOMContentLoaded', function () {
+  document.querySelectorAll('details[data-area-url]').forEach(function (area) {
+    area.addEventListener('toggle', function () {
+      if (!area.open || area.hasAttribute('data-loaded')) {
+        return;
+      }
+      area.setAttribute('data-loaded', '');
+      var url = area.getAttribute('data-area-url');
+      url += (url.indexOf('?') === -1 ? '?' : '&') + 'partial=1';
+      fetch(url).then(function (response) {
+        return response.text();
+      }).then(function (html) {
+        area.querySelector('.area-venues').innerHTML = html;
+      });
+    });
+  });
+});
@@ -0,0 +1,66 @@
+import os
+
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from cache import response_cache
+
+# ----------------------------------------------------------------------------#
+# Template compilation.
+# ----------------------------------------------------------------------------#
+
+# Compiled templates are kept as bytecode in TEMPLATE_CACHE_DIR, shared by
+# every worker and kept across restarts, and all templates are loaded when
+# the app starts, so the first request of a new worker doesn't compile any.
+# Jinja checks each template's source checksum, so edits are picked up.
+
+
+def precompile(app):
+    # Loads every template once; returns how many there are.
+    names = app.jinja_env.list_templates(extensions=["html"])
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
+
+
+# ----------------------------------------------------------------------------#
+# Fragment cache.
+# ----------------------------------------------------------------------------#
+
+# {% cache "venue:" ~ venue.id %}...{% endcache %} stores the rendered block
+# in the response cache under its first key. Every key is also a tag, so a
+# tile is re-rendered once any entity it shows is invalidated:
+#
+#   {% cache "show:" ~ show.id, "venue:" ~ show.venue_id,
+#            "artist:" ~ show.artist_id %}
+
+
+class FragmentCacheExtension(Extension):
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        keys = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            keys.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method("_render", [nodes.List(keys)]), [], [], body
+        ).set_lineno(lineno)
+
+    def _render(self, keys, caller):
+        keys = [str(key) for key in keys]
+        return Markup(
+            response_cache.value(f"fragment:{keys[0]}", keys, lambda: str(caller()))
+        )
+
+
+def init_app(app):
+    app.config.setdefault("TEMPLATE_CACHE_DIR", None)
+    directory = app.config["TEMPLATE_CACHE_DIR"]
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    precompile(app)
@@ -0,0 +1,84 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path[:0] = [ROOT, os.path.join(ROOT, "benchmarks")]
+
+# config.py reads the environment once, when the app is first imported.
+_scratch = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = os.environ.get("TEST_DATABASE_URL") or (
+    f"sqlite:///{os.path.join(_scratch.name, 'test.db')}"
+)
+os.environ.pop("DATABASE_REPLICA_URLS", None)
+
+VENUES = 40
+
+
+@pytest.fixture(scope="session")
+def app():
+    # One app over a seeded scratch database (dropped and recreated, so only
+    # point TEST_DATABASE_URL at a throwaway Postgres database).
+    from app import create_app
+    from models import db
+    from seed import seed
+
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        seed(VENUES, 2 * VENUES, 10 * VENUES)
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def no_cache():
+    # Runs views instead of answering from the page cache.
+    from cache import response_cache
+
+    enabled, response_cache.enabled = response_cache.enabled, False
+    yield
+    response_cache.enabled = enabled
+
+
+@pytest.fixture
+def make_app(app, tmp_path):
+    # Builds another app over an empty scratch database, for tests that need
+    # other settings than the seeded one. create_app() re-initialises the
+    # module-level page cache and metrics samplers; they are put back after.
+    import config
+    from app import create_app
+    from cache import response_cache
+    from metrics import registry
+    from models import db
+
+    cache_state = vars(response_cache).copy()
+    samplers = dict(registry.samplers)
+    db.session.remove()
+
+    def make_app(**settings):
+        merged = {name: getattr(config, name) for name in dir(config) if name.isupper()}
+        merged.update(
+            SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'primary.db'}",
+            CACHE_ENABLED=False,
+            TESTING=True,
+        )
+        merged.update(settings)
+        scratch = create_app(type("ScratchConfig", (), merged))
+        with scratch.app_context():
+            db.create_all()
+        return scratch
+
+    yield make_app
+    db.session.remove()
+    vars(response_cache).update(cache_state)
+    registry.samplers.update(samplers)
@@ -0,0 +1,87 @@
+import re
+
+import pytest
+
+from api import FIELDS, _query
+from models import db, Venue, Artist, Show
+
+
+def _get(client, path, status=200):
+    response = client.get(path)
+    assert response.status_code == status
+    assert response.mimetype == "application/json"
+    return response.get_json()
+
+
+def _statements(response):
+    timing = response.headers["Server-Timing"]
+    return int(re.search(r'desc="(\d+) statements"', timing).group(1))
+
+
+def test_all_fields_by_default(client, no_cache):
+    venue = _get(client, "/api/v1/venues")["data"][0]
+    assert list(venue) == list(FIELDS["venues"])
+
+
+def test_fields_picks_columns_and_always_has_id(client, no_cache):
+    data = _get(client, "/api/v1/venues?fields=name,city,id")["data"]
+    assert all(list(venue) == ["id", "name", "city"] for venue in data)
+    venue = db.session.get(Venue, data[0]["id"])
+    assert data[0]["name"] == venue.name and data[0]["city"] == venue.city
+    show = _get(client, "/api/v1/shows?fields=artist_name")["data"][0]
+    assert show["artist_name"] == db.session.get(Show, show["id"]).artist.name
+
+
+def test_related_tables_are_joined_only_when_asked_for(app):
+    with app.test_request_context():
+        fields = FIELDS["shows"]
+        assert "JOIN" not in str(_query("shows", {"id": fields["id"]}))
+        joined = str(_query("shows", {"venue_name": fields["venue_name"]}))
+        assert '"Venue"' in joined and '"Artist"' not in joined
+
+
+def test_include_shows_adds_each_owners_shows_in_one_query(client, no_cache):
+    plain = client.get("/api/v1/artists?fields=name")
+    included = client.get("/api/v1/artists?fields=name&include=shows")
+    assert _statements(included) == _statements(plain) + 1
+    for artist in included.get_json()["data"]:
+        shows = Show.query.filter_by(artist_id=artist["id"])
+        assert sorted(show["id"] for show in artist["shows"]) == sorted(
+            show.id for show in shows
+        )
+        for show in artist["shows"]:
+            assert show["venue_name"] == db.session.get(Venue, show["venue_id"]).name
+
+
+def test_next_links_keep_fields_and_includes(client, no_cache):
+    links = _get(client, "/api/v1/venues?fields=name&include=shows&per_page=5")["links"]
+    assert links["prev"] is None
+    assert "fields=name" in links["next"] and "include=shows" in links["next"]
+    page = _get(client, links["next"])
+    assert page["links"]["prev"] and len(page["data"]) == 5
+    assert list(page["data"][0]) == ["id", "name", "shows"]
+
+
+@pytest.mark.parametrize(
+    "path, status, error",
+    [
+        ("/api/v1/venues?fields=name,bogus", 400, "Unknown fields: bogus"),
+        ("/api/v1/venues?include=bogus", 400, "Unknown include: bogus"),
+        ("/api/v1/shows?include=shows", 400, "Unknown include: shows"),
+        ("/api/v1/venues?cursor=bogus", 400, None),
+        ("/api/v1/venues/999999", 404, "No venue 999999"),
+        ("/api/v1/shows/999999", 404, "No show 999999"),
+        ("/api/v1/artists/999999/matches", 404, "No artist 999999"),
+    ],
+)
+def test_errors_are_json(client, no_cache, path, status, error):
+    body = _get(client, path, status)
+    assert list(body) == ["error"]
+    if error is not None:
+        assert body["error"] == error
+
+
+def test_detail(client, no_cache):
+    artist = Artist.query.first()
+    data = _get(client, f"/api/v1/artists/{artist.id}?fields=name")["data"]
+    assert data == {"id": artist.id, "name": artist.name}
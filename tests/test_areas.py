@@ -0,0 +1,49 @@
+from sqlalchemy.sql.functions import func
+
+import areas
+from models import db, Area, Venue
+
+
+def _summary():
+    return {
+        (row.state, row.city): (row.venue_count, row.upcoming_shows_count)
+        for row in Area.query
+    }
+
+
+def _expected():
+    rows = (
+        db.session.query(
+            Venue.state,
+            Venue.city,
+            func.count(Venue.id),
+            func.sum(Venue.upcoming_shows_count),
+        )
+        .group_by(Venue.state, Venue.city)
+        .all()
+    )
+    return {(state, city): (count, upcoming) for state, city, count, upcoming in rows}
+
+
+def test_refresh_upserts_existing_rows(app):
+    try:
+        venue = Venue.query.first()
+        area = (venue.city, venue.state)
+        # Refreshing an area whose row exists (twice, as two requests
+        # would) updates it instead of inserting a duplicate.
+        areas.refresh([area])
+        areas.refresh([area])
+        assert _summary() == _expected()
+
+        venue = Venue(name="Test venue", city="Nowhere", state="NY")
+        db.session.add(venue)
+        areas.refresh([("Nowhere", "NY")])
+        assert _summary()[("NY", "Nowhere")] == (1, 0)
+        assert _summary() == _expected()
+
+        db.session.delete(venue)
+        areas.refresh([("Nowhere", "NY")])
+        assert ("NY", "Nowhere") not in _summary()
+        assert _summary() == _expected()
+    finally:
+        db.session.rollback()
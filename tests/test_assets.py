@@ -0,0 +1,57 @@
+import gzip
+import os
+import pathlib
+import re
+
+import pytest
+
+import assets
+
+
+@pytest.fixture(scope="module")
+def built(app, tmp_path_factory):
+    # One build for the module: Brotli at its highest quality takes a while.
+    directory = app.config["ASSETS_DIR"]
+    app.config["ASSETS_DIR"] = str(tmp_path_factory.mktemp("assets"))
+    yield assets.build(clean=True)
+    app.config["ASSETS_DIR"] = directory
+
+
+def test_build_fingerprints_and_compresses(app, built):
+    tmp_path = pathlib.Path(app.config["ASSETS_DIR"])
+    assert re.fullmatch(r"app\.[0-9a-f]{12}\.css", built["app.css"])
+    assert re.fullmatch(
+        r"vendor/fontawesome/webfonts/fa-solid-900\.[0-9a-f]{12}\.woff2",
+        built["vendor/fontawesome/webfonts/fa-solid-900.woff2"],
+    )
+    css = (tmp_path / built["app.css"]).read_bytes()
+    assert gzip.decompress((tmp_path / (built["app.css"] + ".gz")).read_bytes()) == css
+    # Font Awesome's url()s point at the fingerprinted webfonts.
+    assert built["vendor/fontawesome/webfonts/fa-solid-900.woff2"].encode() in css
+    with app.test_request_context():
+        assert assets.bundle_urls("app.css") == [f"/assets/{built['app.css']}"]
+
+
+@pytest.mark.parametrize(
+    "accept, encoding",
+    [("gzip", "gzip"), ("br, gzip", "br" if assets.brotli else "gzip"), ("", None)],
+)
+def test_assets_are_negotiated_and_immutable(client, built, accept, encoding):
+    response = client.get(
+        f"/assets/{built['app.css']}", headers={"Accept-Encoding": accept}
+    )
+    assert response.status_code == 200
+    assert response.headers.get("Content-Encoding") == encoding
+    assert "Accept-Encoding" in response.headers["Vary"]
+    cache_control = response.headers["Cache-Control"]
+    assert "immutable" in cache_control and "max-age=31536000" in cache_control
+    response.close()
+
+
+def test_manifest_is_not_served(client, built):
+    assert client.get(f"/assets/{assets.MANIFEST}").status_code == 404
+
+
+def test_vendored_font_awesome_is_committed(app):
+    for name in assets.VENDOR:
+        assert os.path.exists(os.path.join(app.static_folder, *name.split("/"))), name
@@ -0,0 +1,84 @@
+import pytest
+
+from autocomplete import NAME_INDEXES, PrefixIndex, venue_names
+from matchmaking import CANDIDATES
+from models import Venue
+
+
+@pytest.fixture
+def index(app):
+    index = PrefixIndex(Venue, "index:venues")
+    index.build()
+    return index
+
+
+def _names(index, prefix, limit=10):
+    return [name for _, name in index.suggest(prefix, limit)]
+
+
+def test_suggest_matches_word_starts_case_insensitively(index):
+    index.add(-1, "The Musical Zither")
+    index.add(-2, "Zitherine Hall")
+    # In key order: "zither" (the last word of the first) before "zitherine hall".
+    assert _names(index, "zith") == ["The Musical Zither", "Zitherine Hall"]
+    assert _names(index, "MUSICAL  z") == ["The Musical Zither"]
+    assert _names(index, "the musical zither") == ["The Musical Zither"]
+    assert _names(index, "usical z") == []
+
+
+def test_suggest_lists_each_row_once_up_to_the_limit(index):
+    index.add(-1, "Echo Echo")
+    index.add(-2, "Echo Chamber")
+    index.add(-3, "Echoes")
+    assert _names(index, "echo") == ["Echo Echo", "Echo Chamber", "Echoes"]
+    assert _names(index, "echo", limit=2) == ["Echo Echo", "Echo Chamber"]
+
+
+def test_rename_and_remove(index):
+    index.add(-1, "Park Square Live")
+    index.add(-1, "Riverside Live")
+    assert _names(index, "park square") == []
+    assert _names(index, "riverside") == ["Riverside Live"]
+    keys = index.stats()["keys"]
+    index.remove(-1)
+    assert _names(index, "riverside") == []
+    assert index.stats()["keys"] == keys - 2
+    # Removing an unknown row is a no-op.
+    index.remove(-1)
+
+
+def test_a_built_index_has_every_row(index):
+    venue = Venue.query.first()
+    assert (venue.id, venue.name) in index.suggest(venue.name, 50)
+    assert index.stats()["rows"] == Venue.query.count()
+
+
+def test_changes_before_the_first_build_are_left_to_it(app):
+    index = PrefixIndex(Venue, "index:venues")
+    index.add(-1, "Not In The Database")
+    index.remove(Venue.query.first().id)
+    assert _names(index, "not in the") == []
+    assert index.stats()["rows"] == Venue.query.count()
+
+
+def test_indexes_are_built_before_the_first_request(make_app):
+    # The module-level indexes, emptied and then put back.
+    indexes = [*NAME_INDEXES.values(), *CANDIDATES.values()]
+    states = [vars(index).copy() for index in indexes]
+    try:
+        for index in indexes:
+            index._built_at = None
+        scratch = make_app()
+        scratch.test_client().get("/autocomplete/stats")
+        assert all(index._built_at is not None for index in indexes)
+        assert venue_names.stats()["rows"] == 0
+    finally:
+        for index, state in zip(indexes, states):
+            vars(index).update(state)
+
+
+def test_autocomplete_endpoint(client):
+    venue = Venue.query.first()
+    response = client.get("/autocomplete/venues", query_string={"q": venue.name})
+    assert {"id": venue.id, "name": venue.name} in response.get_json()
+    assert len(client.get("/autocomplete/venues?q=&limit=3").get_json()) == 3
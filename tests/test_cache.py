@@ -0,0 +1,98 @@
+import pytest
+from flask import g
+
+import app as views
+from cache import response_cache
+from models import Show
+
+KEY = "view:/shows?"
+
+
+def test_streamed_page_is_sent_in_chunks_and_cached_once_complete(client):
+    response_cache.backend.clear()
+    response = client.get("/shows", buffered=False)
+    assert response.is_streamed
+    chunks = iter(response.response)
+    first = next(chunks)
+    assert first and response_cache.backend.get(KEY) is None
+    body = first + b"".join(chunks)
+    response.close()
+    assert response_cache.backend.get(KEY)["body"] == body
+
+    hits = response_cache.stats()["hits"]
+    cached = client.get("/shows")
+    assert response_cache.stats()["hits"] == hits + 1
+    assert cached.data == body
+
+
+def test_abandoned_stream_is_not_cached(client):
+    response_cache.backend.clear()
+    response = client.get("/shows", buffered=False)
+    next(iter(response.response))
+    response.close()
+    assert response_cache.backend.get(KEY) is None
+
+
+def test_replica_reads_are_not_cached_right_after_a_write(app, monkeypatch):
+    # g is the (session-wide) app context's; monkeypatch puts it back.
+    response_cache.backend.clear()
+    response_cache.invalidate("shows")
+    with app.test_request_context("/shows"):
+        monkeypatch.setattr(g, "db_read_bind", "replica", raising=False)
+        assert response_cache.value("shows", ["shows"], lambda: 1) == 1
+        assert response_cache.backend.get("value:shows") is None
+        monkeypatch.setattr(g, "db_read_bind", None)
+        response_cache.value("shows", ["shows"], lambda: 1)
+        assert response_cache.backend.get("value:shows")["value"] == 1
+
+
+def test_replica_reads_are_cached_once_replicas_caught_up(app, monkeypatch):
+    response_cache.backend.clear()
+    response_cache.invalidate("shows")
+    monkeypatch.setitem(app.config, "DB_STICKY_SECONDS", 0)
+    with app.test_request_context("/shows"):
+        monkeypatch.setattr(g, "db_read_bind", "replica", raising=False)
+        response_cache.value("shows", ["shows"], lambda: 1)
+        assert response_cache.backend.get("value:shows")["value"] == 1
+
+
+@pytest.mark.parametrize("before_read", [True, False])
+def test_page_isnt_cached_when_a_tag_it_adds_changes_while_rendering(
+    client, monkeypatch, before_read
+):
+    # The artist page tags itself with its venues once it has read their shows;
+    # another request invalidates one of them just before or after that.
+    show = Show.query.first()
+    path = f"/artists/{show.artist_id}"
+    key = f"view:{path}?"
+    add_cache_tags = views.add_cache_tags
+
+    def add_while_invalidating(*tags):
+        if before_read:
+            response_cache.invalidate(f"venue:{show.venue_id}")
+        add_cache_tags(*tags)
+        if not before_read:
+            response_cache.invalidate(f"venue:{show.venue_id}")
+
+    response_cache.backend.clear()
+    monkeypatch.setattr(views, "add_cache_tags", add_while_invalidating)
+    assert client.get(path).status_code == 200
+    assert response_cache.backend.get(key) is None
+
+    monkeypatch.setattr(views, "add_cache_tags", add_cache_tags)
+    client.get(path)
+    assert f"venue:{show.venue_id}" in response_cache.backend.get(key)["tags"]
+
+
+def test_value_isnt_cached_when_invalidated_while_computed(app):
+    response_cache.backend.clear()
+
+    def compute():
+        response_cache.invalidate("shows")
+        return 1
+
+    with app.test_request_context("/shows"):
+        assert response_cache.value("shows", ["shows"], compute) == 1
+        assert response_cache.backend.get("value:shows") is None
+        response_cache.value("shows", ["shows"], lambda: 2)
+        assert response_cache.backend.get("value:shows")["value"] == 2
@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import queries
+from models import db, Show
+
+
+@pytest.fixture
+def upcoming(app):
+    return (
+        db.session.query(Show.venue_id, Show.start_time)
+        .filter(Show.start_time > datetime.now())
+        .order_by(Show.start_time)
+        .first()
+    )
+
+
+def test_revalidates_with_the_etag(client, upcoming):
+    path = f"/venues/{upcoming.venue_id}"
+    response = client.get(path)
+    assert response.status_code == 200
+    assert response.headers["ETag"] and "Last-Modified" not in response.headers
+    etag = response.headers["ETag"]
+    assert client.get(path, headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(path, headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_if_modified_since_alone_is_not_enough(client, upcoming):
+    # The page can change with no write at all (a show starting), so a date
+    # can't validate it.
+    later = (datetime.utcnow() + timedelta(days=1)).strftime("%a, %d %b %Y %H:%M:%S GMT")
+    response = client.get(
+        f"/venues/{upcoming.venue_id}", headers={"If-Modified-Since": later}
+    )
+    assert response.status_code == 200
+
+
+def test_a_show_starting_changes_the_etag(client, upcoming, monkeypatch):
+    path = f"/venues/{upcoming.venue_id}"
+    etag = client.get(path).headers["ETag"]
+
+    class Later(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return upcoming.start_time + timedelta(seconds=1)
+
+    monkeypatch.setattr(queries, "datetime", Later)
+    response = client.get(path, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
@@ -0,0 +1,139 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.sql.functions import func
+
+import areas
+from counters import drift, forget, roll_over
+from models import db, Area, Venue, Artist, Show
+from seed import seed
+
+
+@pytest.fixture
+def scratch(make_app):
+    # Its own seeded database: the commands under test commit.
+    scratch = make_app()
+    with scratch.app_context():
+        seed(5, 10, 60)
+        yield scratch
+        db.session.remove()
+
+
+def _drifted(now=None):
+    now = now or datetime.now()
+    return drift(Venue, now) + drift(Artist, now)
+
+
+def _counts(model, entity_id):
+    # Read afresh: requests close the session the test shares.
+    return tuple(
+        db.session.query(model.upcoming_shows_count, model.past_shows_count)
+        .filter(model.id == entity_id)
+        .one()
+    )
+
+
+def _area_totals_match():
+    venues = {
+        (city, state): upcoming
+        for city, state, upcoming in db.session.query(
+            Venue.city, Venue.state, func.sum(Venue.upcoming_shows_count)
+        ).group_by(Venue.city, Venue.state)
+    }
+    areas = {
+        (area.city, area.state): area.upcoming_shows_count for area in Area.query
+    }
+    return venues == areas
+
+
+def _create_show(client, venue_id, artist_id, start):
+    response = client.post(
+        "/shows/create",
+        data={
+            "venue_id": str(venue_id),
+            "artist_id": str(artist_id),
+            "start_time": start.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+    )
+    assert response.status_code == 200
+
+
+def test_creating_shows_counts_them(scratch):
+    venue_id, artist_id = Venue.query.first().id, Artist.query.first().id
+    before = _counts(Venue, venue_id), _counts(Artist, artist_id)
+    # Far enough apart that neither is a double booking.
+    client = scratch.test_client()
+    _create_show(client, venue_id, artist_id, datetime.now() + timedelta(days=400))
+    _create_show(client, venue_id, artist_id, datetime.now() - timedelta(days=400))
+    for model, entity_id, (upcoming, past) in [
+        (Venue, venue_id, before[0]),
+        (Artist, artist_id, before[1]),
+    ]:
+        assert _counts(model, entity_id) == (upcoming + 1, past + 1)
+    assert _drifted() == [] and _area_totals_match()
+
+
+def test_deleting_a_venue_takes_its_shows_off_the_artists(scratch):
+    venue_id, artist_id = db.session.query(Show.venue_id, Show.artist_id).first()
+    shows = Show.query.filter_by(venue_id=venue_id, artist_id=artist_id)
+    upcoming, past = _counts(Artist, artist_id)
+    lost_upcoming = shows.filter_by(counted_past=False).count()
+    lost_past = shows.filter_by(counted_past=True).count()
+    # As the delete view does.
+    venue_areas = areas.areas_of([venue_id])
+    forget(Venue, venue_id)
+    Venue.query.filter_by(id=venue_id).delete()
+    areas.refresh(venue_areas)
+    db.session.commit()
+    assert Show.query.filter_by(venue_id=venue_id).count() == 0
+    assert _counts(Artist, artist_id) == (
+        upcoming - lost_upcoming,
+        past - lost_past,
+    )
+    assert _drifted() == [] and _area_totals_match()
+
+
+def test_roll_over_moves_started_shows_to_past(scratch):
+    # Just after the next show starts.
+    later = db.session.query(func.min(Show.start_time)).filter(
+        Show.counted_past.is_(False)
+    ).scalar() + timedelta(seconds=1)
+    due = Show.query.filter(
+        Show.counted_past.is_(False), Show.start_time <= later
+    ).count()
+    assert due
+    # Counters are as of the last roll-over, so they drift as time passes...
+    assert _drifted(later)
+    assert roll_over(later) == due
+    assert roll_over(later) == 0
+    db.session.commit()
+    # ...until the next one.
+    assert _drifted(later) == [] and _area_totals_match()
+
+
+def test_reconcile_reports_and_fixes_drift(scratch):
+    venue_id = Venue.query.first().id
+    Venue.query.filter_by(id=venue_id).update(
+        {Venue.upcoming_shows_count: Venue.upcoming_shows_count + 5}
+    )
+    db.session.commit()
+    runner = scratch.test_cli_runner()
+
+    result = runner.invoke(args=["counters", "reconcile"])
+    assert result.exit_code == 1
+    assert f"Venue {venue_id}: upcoming" in result.output
+    assert "1 rows drifted." in result.output
+
+    result = runner.invoke(args=["counters", "reconcile", "--fix"])
+    assert result.exit_code == 0
+    assert "1 rows drifted, fixed." in result.output
+    assert _drifted() == [] and _area_totals_match()
+    result = runner.invoke(args=["counters", "reconcile"])
+    assert result.exit_code == 0 and "0 rows drifted." in result.output
+
+
+def test_rollover_command(scratch):
+    result = scratch.test_cli_runner().invoke(args=["counters", "rollover"])
+    assert result.exit_code == 0
+    assert result.output.startswith("Rolled over ")
+    assert _drifted() == []
@@ -0,0 +1,14 @@
+from datetime import datetime
+
+from explain import checks, explain
+from models import db
+
+
+def test_show_window_queries_use_their_index(app):
+    db.session.execute(db.text("ANALYZE"))
+    failures = {}
+    for name, (query, index) in checks(datetime.now()).items():
+        plan = explain(query)
+        if index not in plan:
+            failures[name] = f"doesn't use {index}:\n{plan}"
+    assert not failures
@@ -0,0 +1,98 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+from export import EXPORTS, export
+from models import db, Venue, Show
+
+LATER = datetime(2031, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def touched(app):
+    # Three venues written "later" than the rest, in the test's transaction.
+    ids = [id for (id,) in db.session.query(Venue.id).order_by(Venue.id.desc())][:3]
+    db.session.execute(
+        Venue.__table__.update().where(Venue.id.in_(ids)).values(updated_at=LATER)
+    )
+    yield sorted(ids)
+    db.session.rollback()
+
+
+def _jsonl(lines):
+    return [json.loads(line) for line in "".join(lines).splitlines()]
+
+
+def _csv(lines):
+    return list(csv.DictReader(io.StringIO("".join(lines))))
+
+
+def test_jsonl_has_every_row_in_updated_order(app):
+    rows = _jsonl(export("shows", "jsonl"))
+    assert len(rows) == Show.query.count()
+    assert all(list(row) == list(EXPORTS["shows"][1]) for row in rows)
+    keys = [(row["updated_at"], row["id"]) for row in rows]
+    assert keys == sorted(keys)
+    datetime.fromisoformat(rows[0]["start_time"])
+
+
+def test_csv_uses_the_importer_format(app):
+    rows = _csv(export("venues", "csv"))
+    assert len(rows) == Venue.query.count()
+    assert list(rows[0]) == list(EXPORTS["venues"][1])
+    venue = db.session.get(Venue, int(rows[0]["id"]))
+    assert rows[0]["genres"] == ";".join(venue.genres)
+    assert rows[0]["seeking_talent"] == str(venue.seeking_talent)
+
+
+def test_since_limits_to_rows_written_at_or_after(touched):
+    for fmt, parse in (("jsonl", _jsonl), ("csv", _csv)):
+        rows = parse(export("venues", fmt, since=LATER))
+        assert [int(row["id"]) for row in rows] == touched
+    assert _jsonl(export("venues", since=datetime(2032, 1, 1))) == []
+    # The rest come first, in updated_at order.
+    assert [row["id"] for row in _jsonl(export("venues"))][-3:] == touched
+
+
+def test_small_chunks_export_the_same_rows(app):
+    assert list(export("artists", chunk_size=7)) == list(export("artists"))
+
+
+def test_export_endpoint(client, monkeypatch, touched):
+    monkeypatch.setitem(client.application.config, "INTERNAL_TOKEN", "t")
+    auth = {"Authorization": "Bearer t"}
+    response = client.get(
+        f"/export/venues?format=csv&since={LATER.isoformat()}", headers=auth
+    )
+    assert response.mimetype == "text/csv"
+    assert "filename=venues.csv" in response.headers["Content-Disposition"]
+    assert [int(row["id"]) for row in _csv(response.get_data(as_text=True))] == touched
+    assert client.get("/export/venues?since=yesterday", headers=auth).status_code == 400
+    assert client.get("/export/venues?format=xml", headers=auth).status_code == 404
+    assert client.get("/export/areas", headers=auth).status_code == 404
+
+
+def test_export_command(app, tmp_path, monkeypatch):
+    # Loading the app for a command sets app.debug from FLASK_DEBUG.
+    monkeypatch.setattr(app, "debug", app.debug)
+    runner = app.test_cli_runner()
+    path = tmp_path / "shows.jsonl"
+    result = runner.invoke(args=["export", "shows", "-o", str(path)])
+    assert result.exit_code == 0
+    assert len(path.read_text().splitlines()) == Show.query.count()
+    result = runner.invoke(args=["export", "shows", "--since", "yesterday"])
+    assert result.exit_code == 2 and "ISO 8601" in result.output
+
+
+def test_an_export_imports_into_another_database(app, make_app, tmp_path):
+    path = tmp_path / "venues.csv"
+    path.write_text("".join(export("venues", "csv")))
+    names = sorted(name for (name,) in db.session.query(Venue.name))
+    scratch = make_app()
+    result = scratch.test_cli_runner().invoke(args=["import", "venues", str(path)])
+    assert f"Done: {len(names)} inserted, 0 rejected" in result.output
+    with scratch.app_context():
+        assert sorted(name for (name,) in db.session.query(Venue.name)) == names
@@ -0,0 +1,23 @@
+from datetime import datetime
+
+from formatting import format_datetime, format_datetimes, parse_datetime
+
+WHEN = datetime(2019, 5, 21, 21, 30)
+
+
+def test_parse_datetime():
+    assert parse_datetime(WHEN) is WHEN
+    assert parse_datetime("2019-05-21T21:30:00") == WHEN
+    assert parse_datetime("2019-05-21 21:30") == WHEN
+    # Not ISO 8601: dateutil.
+    assert parse_datetime("May 21 2019 9:30PM") == WHEN
+
+
+def test_format_datetime():
+    assert format_datetime(WHEN, "full") == "Tuesday May, 21, 2019 at 9:30PM"
+    assert format_datetime("2019-05-21 21:30:00", "medium") == "Tue 05, 21, 2019 9:30PM"
+
+
+def test_strings_and_datetimes_share_formatting():
+    values = [WHEN, "2019-05-21T21:30:00", "2019-05-21 21:30", "May 21 2019 9:30PM"]
+    assert format_datetimes(values, "full") == [format_datetime(WHEN, "full")] * 4
@@ -0,0 +1,41 @@
+import warnings
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+from genres import facet_query, genre_facets
+from models import Artist, Venue
+
+
+def _sql(query, dialect):
+    return " ".join(str(query.compile(dialect=dialect)).split())
+
+
+def test_facets_unnest_after_the_table_on_postgres():
+    for model in (Venue, Artist):
+        table = f'"{model.__tablename__}"'
+        for genres in ([], ["Jazz"]):
+            query = facet_query(model, genres, dialect="postgresql")
+            sql = _sql(query, postgresql.dialect())
+            assert f"FROM {table} JOIN unnest({table}.genres)" in sql
+
+
+def test_facets_join_json_each_after_the_table_on_sqlite():
+    sql = _sql(facet_query(Venue, ["Jazz"], dialect="sqlite"), sqlite.dialect())
+    assert 'FROM "Venue" JOIN json_each("Venue".genres)' in sql
+
+
+def test_facet_counts(app, no_cache):
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        facets = genre_facets(Venue, ["Jazz"])
+    counts = dict(facets)
+    venues = Venue.query.all()
+    jazz = [venue for venue in venues if "Jazz" in (venue.genres or ())]
+    assert counts.get("Jazz", 0) == len(jazz)
+    for genre, count in facets:
+        assert count == sum(genre in (venue.genres or ()) for venue in jazz)
+
+
+def test_filtered_listings(client, no_cache):
+    for path in ("/venues", "/venues?genre=Jazz", "/artists", "/artists?genre=Jazz"):
+        assert client.get(path).status_code == 200
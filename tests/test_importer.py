@@ -0,0 +1,181 @@
+import csv
+import json
+
+import pytest
+
+import importer
+from autocomplete import PrefixIndex
+from cache import response_cache
+from models import db, Venue, Artist, Show
+
+VENUE = {
+    "city": "Austin",
+    "state": "TX",
+    "address": "1 Main Street",
+    "phone": "512-555-0100",
+    "genres": "Jazz;Blues",
+    "facebook_link": "https://www.facebook.com/venue",
+}
+
+
+@pytest.fixture
+def scratch(make_app):
+    return make_app(INDEX_CHECK_SECONDS=0)
+
+
+def _import(app, *args):
+    return app.test_cli_runner().invoke(args=["import", *map(str, args)])
+
+
+def _write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    return path
+
+
+def _write_jsonl(path, rows):
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows))
+    return path
+
+
+def _names(app, model):
+    with app.app_context():
+        return sorted(name for (name,) in db.session.query(model.name))
+
+
+def _rejects(path):
+    return [json.loads(line) for line in open(f"{path}.rejects.jsonl")]
+
+
+def test_csv_import_inserts_valid_rows_and_rejects_the_rest(scratch, tmp_path):
+    path = _write_csv(
+        tmp_path / "venues.csv",
+        [
+            dict(VENUE, name="The Hop"),
+            dict(VENUE, name="No City", city=""),
+            dict(VENUE, name="Blue Room"),
+        ],
+    )
+    result = _import(scratch, "venues", path)
+    assert result.exit_code == 0
+    assert "Done: 2 inserted, 1 rejected" in result.output
+    assert _names(scratch, Venue) == ["Blue Room", "The Hop"]
+    [reject] = _rejects(path)
+    assert reject["row"] == 2 and reject["data"]["name"] == "No City"
+    assert "city" in reject["errors"]
+    assert not (tmp_path / "venues.csv.checkpoint").exists()
+
+
+def test_jsonl_import(scratch, tmp_path):
+    artist = {k: v for k, v in VENUE.items() if k != "address"}
+    path = _write_jsonl(
+        tmp_path / "artists.jsonl",
+        [
+            dict(artist, name="Guns N Petals", genres=["Rock n Roll"]),
+            dict(artist, name="Seeking", seeking_venue="yes"),
+        ],
+    )
+    assert _import(scratch, "artists", path).exit_code == 0
+    with scratch.app_context():
+        artists = {artist.name: artist for artist in Artist.query}
+        assert artists["Guns N Petals"].genres == ["Rock n Roll"]
+        assert artists["Seeking"].seeking_venue
+        assert not artists["Guns N Petals"].seeking_venue
+
+
+def test_an_interrupted_import_resumes_after_its_checkpoint(
+    scratch, tmp_path, monkeypatch
+):
+    rows = [dict(VENUE, name=f"Venue {i}") for i in range(1, 6)]
+    rows[0]["city"] = ""
+    path = _write_csv(tmp_path / "venues.csv", rows)
+    insert_batch = importer.insert_batch
+    batches = []
+
+    def crash_on_second_batch(kind, batch):
+        batches.append(batch)
+        if len(batches) == 2:
+            raise RuntimeError("connection lost")
+        return insert_batch(kind, batch)
+
+    monkeypatch.setattr(importer, "insert_batch", crash_on_second_batch)
+    result = _import(scratch, "venues", path, "--batch-size", 2)
+    assert isinstance(result.exception, RuntimeError)
+    assert _names(scratch, Venue) == ["Venue 2"]
+    assert json.load(open(f"{path}.checkpoint"))["rows"] == 2
+
+    monkeypatch.setattr(importer, "insert_batch", insert_batch)
+    result = _import(scratch, "venues", path, "--batch-size", 2)
+    assert "Resuming after row 2." in result.output
+    assert _names(scratch, Venue) == [f"Venue {i}" for i in range(2, 6)]
+    # The reject from the first batch is reported once.
+    assert [reject["row"] for reject in _rejects(path)] == [1]
+
+
+def test_checkpoint_of_another_import_is_refused(scratch, tmp_path):
+    path = _write_csv(tmp_path / "venues.csv", [dict(VENUE, name="The Hop")])
+    checkpoint = tmp_path / "venues.csv.checkpoint"
+    checkpoint.write_text(json.dumps({"source": "other.csv", "kind": "venues"}))
+    result = _import(scratch, "venues", path)
+    assert result.exit_code != 0
+    assert "checkpoint for another import" in result.output
+    assert _names(scratch, Venue) == []
+
+
+def test_shows_resolve_venues_and_artists_by_name(scratch, tmp_path):
+    artist = {k: v for k, v in VENUE.items() if k != "address"}
+    _import(
+        scratch,
+        "venues",
+        _write_csv(
+            tmp_path / "venues.csv",
+            [dict(VENUE, name=name) for name in ("The Hop", "Twin", "Twin")],
+        ),
+    )
+    _import(
+        scratch,
+        "artists",
+        _write_csv(tmp_path / "artists.csv", [dict(artist, name="Guns N Petals")]),
+    )
+    with scratch.app_context():
+        hop = Venue.query.filter_by(name="The Hop").one()
+    show = {"start_time": "2030-05-21T21:30:00", "artist_name": "Guns N Petals"}
+    path = _write_jsonl(
+        tmp_path / "shows.jsonl",
+        [
+            dict(show, venue_name="The Hop"),
+            dict(show, venue_name="Nowhere"),
+            dict(show, venue_name="Twin"),
+            dict(show, venue_id=str(hop.id), start_time="2030-05-22T21:30:00"),
+        ],
+    )
+    result = _import(scratch, "shows", path)
+    assert "Done: 2 inserted, 2 rejected" in result.output
+    with scratch.app_context():
+        assert [show.venue_id for show in Show.query] == [hop.id, hop.id]
+    rejects = {reject["row"]: reject["errors"] for reject in _rejects(path)}
+    assert rejects[2] == {"venue_id": ["Unknown venue 'Nowhere'"]}
+    # Ambiguous names don't resolve.
+    assert rejects[3] == {"venue_id": ["Unknown venue 'Twin'"]}
+
+
+def test_import_invalidates_pages_and_indexes(scratch, tmp_path):
+    names = PrefixIndex(Venue, "index:venues")
+    with scratch.app_context():
+        names.build()
+        token = response_cache.token("venues")
+    _import(
+        scratch,
+        "venues",
+        _write_csv(tmp_path / "venues.csv", [dict(VENUE, name="The Hop")]),
+    )
+    with scratch.app_context():
+        assert response_cache.token("venues") != token
+        assert [name for _, name in names.suggest("hop")] == ["The Hop"]
+
+
+def test_warns_when_the_cache_isnt_shared(scratch, tmp_path):
+    path = _write_csv(tmp_path / "venues.csv", [dict(VENUE, name="The Hop")])
+    assert "page cache isn't shared" in _import(scratch, "venues", path).output
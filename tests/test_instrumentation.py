@@ -0,0 +1,43 @@
+import random
+
+import pytest
+from flask import g
+
+from instrumentation import DuplicateStatementError, RequestStats
+from models import Artist, Show, Venue, db
+from routes import REQUESTS
+
+# Every route that only reads, as benchmarks/routes.py requests it.
+READS = sorted(endpoint for endpoint in REQUESTS if "submission" not in endpoint)
+
+
+@pytest.fixture
+def strict(app, monkeypatch):
+    monkeypatch.setitem(app.config, "SQL_DUPLICATE_LIMIT", 1)
+
+
+@pytest.fixture(scope="module")
+def ids(app):
+    return {
+        "venues": [id for id, in db.session.query(Venue.id)],
+        "artists": [id for id, in db.session.query(Artist.id)],
+        "shows": [id for id, in db.session.query(Show.id)],
+        "areas": list(db.session.query(Venue.state, Venue.city).distinct()),
+    }
+
+
+@pytest.mark.parametrize("endpoint", READS)
+def test_no_repeated_statements(client, no_cache, strict, ids, endpoint):
+    method, path, data = REQUESTS[endpoint](random.Random(42), ids)
+    response = client.open(path, method=method, data=data)
+    response.get_data()
+    assert response.status_code == 200
+    assert "db;dur=" in response.headers["Server-Timing"]
+
+
+def test_strict_mode_raises_on_a_repeated_statement(app, strict, monkeypatch):
+    with app.test_request_context("/"):
+        monkeypatch.setattr(g, "sql_stats", RequestStats(), raising=False)
+        db.session.execute(db.text("SELECT 1"))
+        with pytest.raises(DuplicateStatementError):
+            db.session.execute(db.text("SELECT 1"))
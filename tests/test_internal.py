@@ -0,0 +1,24 @@
+import pytest
+
+PATHS = ["/metrics", "/cache/stats", "/autocomplete/stats", "/export/venues"]
+
+
+@pytest.fixture
+def token(app, monkeypatch):
+    monkeypatch.setitem(app.config, "INTERNAL_TOKEN", "s3cret")
+    return "s3cret"
+
+
+@pytest.mark.parametrize("path", PATHS)
+def test_needs_the_token(client, token, path):
+    assert client.get(path).status_code == 403
+    assert client.get(path, headers={"Authorization": "Bearer nope"}).status_code == 403
+    auth = {"Authorization": f"Bearer {token}"}
+    assert client.get(path, headers=auth).status_code == 200
+
+
+@pytest.mark.parametrize("path", PATHS)
+def test_hidden_without_a_token_outside_debug(app, client, monkeypatch, path):
+    monkeypatch.setitem(app.config, "INTERNAL_TOKEN", None)
+    monkeypatch.setitem(app.config, "DEBUG", False)
+    assert client.get(path).status_code == 404
@@ -0,0 +1,34 @@
+import pytest
+
+from loading import assert_route_sql
+
+SEARCH = {"data": {"search_term": "a"}}
+
+# (method, path, request options, most statements); none of these pages
+# needs the Show table beyond what their own queries select.
+LISTINGS = [
+    ("GET", "/venues", {}, 2),
+    ("GET", "/venues/areas/NY/New York", {}, 1),
+    ("GET", "/artists", {}, 2),
+    ("POST", "/venues/search", SEARCH, 1),
+    ("POST", "/artists/search", SEARCH, 1),
+    ("GET", "/export/venues", {}, 1),
+    ("GET", "/export/artists?format=csv", {}, 1),
+]
+
+
+@pytest.mark.parametrize("method, path, options, most", LISTINGS)
+def test_listing_sql(client, no_cache, method, path, options, most):
+    assert_route_sql(
+        client, path, method, max_statements=most, forbid=['JOIN "Show"'], **options
+    )
+
+
+@pytest.mark.parametrize("path", ["/venues/1", "/artists/1"])
+def test_detail_sql(client, no_cache, path):
+    # Validators, the entity (without its shows), past and upcoming shows.
+    assert_route_sql(client, path, max_statements=4)
+
+
+def test_shows_sql(client, no_cache):
+    assert_route_sql(client, "/shows", max_statements=1)
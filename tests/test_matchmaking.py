@@ -0,0 +1,128 @@
+import threading
+from collections import namedtuple
+
+import pytest
+
+from matchmaking import GENRE, HISTORY, LOCATION, Candidates
+from models import db, Venue
+
+
+@pytest.fixture
+def candidates(app):
+    candidates = Candidates(Venue, "index:venues")
+    candidates.build()
+    yield candidates
+    db.session.rollback()
+
+
+def _expected(venue, genres, city, state):
+    wanted, have = set(genres), set(venue.genres)
+    union = len(wanted | have)
+    location = 0.5 * ((venue.state, venue.city) == (state, city)) + 0.5 * (
+        venue.state == state
+    )
+    return GENRE * (len(wanted & have) / union if union else 0) + LOCATION * location
+
+
+def _add(genres, city="Nowhere", state="ZZ"):
+    venue = Venue(name="Test venue", city=city, state=state, genres=genres)
+    venue.seeking_talent = True
+    db.session.add(venue)
+    db.session.flush()
+    return venue
+
+
+def test_top_scores_every_candidate(candidates):
+    venues = Venue.query.all()
+    found = candidates.top(["Jazz", "Blues"], "Chicago", "IL", {}, len(venues), False)
+    assert len(found) == len(venues)
+    scores = [score for _, _, score in found]
+    assert scores == sorted(scores, reverse=True)
+    by_id = {venue.id: venue for venue in venues}
+    for venue_id, name, score in found:
+        expected = _expected(by_id[venue_id], ["Jazz", "Blues"], "Chicago", "IL")
+        assert name == by_id[venue_id].name
+        assert score == pytest.approx(expected, abs=1e-4)
+
+
+def test_top_limits_and_filters_on_seeking(candidates):
+    found = candidates.top(["Jazz"], "Chicago", "IL", {}, 5)
+    assert len(found) == 5
+    assert all(db.session.get(Venue, venue_id).seeking_talent for venue_id, *_ in found)
+
+
+def test_history_adds_to_the_score(candidates):
+    venue = Venue.query.first()
+    args = (["Jazz"], "Chicago", "IL")
+    before = {i: s for i, _, s in candidates.top(*args, {}, 1000, False)}
+    after = {i: s for i, _, s in candidates.top(*args, {venue.id: 3}, 1000, False)}
+    assert after[venue.id] == pytest.approx(before[venue.id] + HISTORY, abs=1e-4)
+
+
+def test_update_rereads_a_row(candidates):
+    venue = Venue.query.first()
+    venue.genres, venue.city, venue.state = ["Jazz"], "Nowhere", "ZZ"
+    db.session.flush()
+    candidates.update(venue.id)
+    assert candidates.top(["Jazz"], "Nowhere", "ZZ", {}, 1, False)[0] == (
+        venue.id,
+        venue.name,
+        round(GENRE + LOCATION, 4),
+    )
+
+
+def test_update_appends_a_new_row(candidates):
+    rows = candidates.stats()["rows"]
+    venue = _add(["Jazz"])
+    candidates.update(venue.id)
+    assert candidates.stats()["rows"] == rows + 1
+    assert candidates.top(["Jazz"], "Nowhere", "ZZ", {}, 1)[0][0] == venue.id
+
+
+def test_a_new_genre_schedules_a_rebuild(candidates):
+    venue = _add(["Zydeco"])
+    candidates.update(venue.id)
+    assert candidates.stats()["age"] is None
+    found = candidates.top(["Zydeco"], "Nowhere", "ZZ", {}, 1)
+    assert found[0] == (venue.id, venue.name, round(GENRE + LOCATION, 4))
+
+
+def test_remove(candidates):
+    venue_id = candidates.top(["Jazz"], "Chicago", "IL", {}, 1)[0][0]
+    candidates.remove(venue_id)
+    found = candidates.top(["Jazz"], "Chicago", "IL", {}, 1000, False)
+    assert venue_id not in {i for i, _, _ in found}
+
+
+def test_top_during_rebuilds_with_another_genre_count(app, monkeypatch):
+    # Rebuilds alternate between two and three genre columns while another
+    # thread scores; each score must use one build's columns throughout.
+    Row = namedtuple("Row", "id name city state genres seeking")
+    other = Row(2, "b", "Y", "ZZ", ["Pop"], True)
+    builds = [
+        [Row(1, "a", "X", "ZZ", ["Jazz"], True), other],
+        [Row(1, "a", "X", "ZZ", ["Jazz", "Folk"], True), other],
+    ]
+    candidates = Candidates(Venue, "index:venues")
+    count = iter(range(10**9))
+    monkeypatch.setattr(candidates, "_rows", lambda: builds[next(count) % 2])
+    candidates.build()
+    errors = []
+    done = threading.Event()
+
+    def score():
+        with app.app_context():
+            try:
+                for _ in range(2000):
+                    candidates.top(["Jazz", "Folk"], "X", "ZZ", {}, 2)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                done.set()
+
+    thread = threading.Thread(target=score)
+    thread.start()
+    while not done.is_set():
+        candidates.build()
+    thread.join()
+    assert not errors
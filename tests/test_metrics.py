@@ -0,0 +1,88 @@
+import os
+import subprocess
+import sys
+import threading
+
+import metrics
+from metrics import Registry, retire_worker
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _count(registry, name="requests"):
+    (counters, _), _ = registry.collect()
+    return counters.get((name, ()), 0)
+
+
+def test_shards_of_finished_threads_are_retired():
+    registry = Registry()
+    threads = [
+        threading.Thread(target=registry.inc, args=("requests",)) for _ in range(20)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert registry._shards == {}
+    assert _count(registry) == 20
+    registry.inc("requests")
+    registry.observe("latency", (), 0.02)
+    assert len(registry._shards) == 1
+    assert _count(registry) == 21
+
+
+def test_shared_registries_sum_counters_and_label_gauges(tmp_path):
+    worker, other = Registry(), Registry()
+    for registry, gauge in [(worker, 2), (other, 3)]:
+        registry.share(str(tmp_path), interval=3600)
+        registry.samplers["pool"] = lambda gauge=gauge: [
+            ("gauge", "pool", (), gauge),
+            ("counter", "hits", (), gauge),
+        ]
+        for _ in range(gauge):
+            registry.inc("requests")
+            registry.observe("latency", (), 0.02)
+    other.write()
+    (counters, histograms), samples = worker.collect()
+    assert counters[("requests", ())] == 5
+    assert sum(histograms[("latency", ())][:-1]) == 5
+    assert ("counter", "hits", (), 5) in samples
+    pid = str(os.getpid())
+    gauges = sorted(value for kind, _, labels, value in samples if kind == "gauge")
+    assert gauges == [2, 3]
+    assert all(
+        labels == (("worker", pid),)
+        for kind, _, labels, _ in samples
+        if kind == "gauge"
+    )
+
+
+def test_an_exited_workers_counts_are_kept(tmp_path):
+    script = (
+        "from metrics import Registry\n"
+        "registry = Registry()\n"
+        f"registry.share({str(tmp_path)!r})\n"
+        "registry.samplers['pool'] = lambda: [('gauge', 'pool', (), 1)]\n"
+        "for _ in range(4):\n"
+        "    registry.inc('requests')\n"
+    )
+    for _ in range(2):
+        worker = subprocess.Popen([sys.executable, "-c", script], cwd=ROOT)
+        assert worker.wait() == 0
+        retire_worker(str(tmp_path), worker.pid)
+    registry = Registry()
+    registry.share(str(tmp_path), interval=3600)
+    registry.inc("requests")
+    (counters, _), samples = registry.collect()
+    assert counters[("requests", ())] == 9
+    assert samples == []
+    assert sorted(os.listdir(tmp_path)) == sorted([metrics.RETIRED, registry._name])
+
+
+def test_metrics_page_renders_the_samplers(client, monkeypatch):
+    monkeypatch.setitem(client.application.config, "INTERNAL_TOKEN", "t")
+    client.get("/venues")
+    response = client.get("/metrics", headers={"Authorization": "Bearer t"})
+    text = response.get_data(as_text=True)
+    assert 'fyyur_http_requests_total{endpoint="venues"' in text
+    assert "fyyur_cache_requests_total" in text
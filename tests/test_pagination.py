@@ -0,0 +1,89 @@
+from datetime import datetime
+
+import pytest
+from werkzeug.exceptions import BadRequest
+
+from models import db, Artist, Show
+from pagination import decode_cursor, encode_cursor, paginate
+
+KEYS = (Artist.name, Artist.id)
+
+
+def _query():
+    return db.session.query(Artist.id, Artist.name)
+
+
+def _pages(app, direction, **options):
+    # Follows next (or prev) cursors from the first (or last) page.
+    pages = []
+    cursor = None
+    with app.test_request_context():
+        if direction == "prev":
+            # Just past the last row.
+            last = _query().order_by(*[key.desc() for key in KEYS]).first()
+            cursor = encode_cursor("prev", [last.name, last.id + 1])
+        while True:
+            page = paginate(_query(), KEYS, cursor, per_page=7, **options)
+            pages.append([(row.name, row.id) for row in page])
+            cursor = page.next_cursor if direction == "next" else page.prev_cursor
+            if cursor is None:
+                return pages
+
+
+def test_cursor_round_trip(app):
+    start = datetime(2030, 5, 21, 21, 30, 15)
+    cursor = encode_cursor("prev", [start, 42])
+    assert decode_cursor(cursor, (Show.start_time, Show.id)) == ("prev", [start, 42])
+    cursor = encode_cursor("next", ["The Hop", 3])
+    assert decode_cursor(cursor, KEYS) == ("next", ["The Hop", 3])
+
+
+@pytest.mark.parametrize(
+    "cursor, keys",
+    [
+        ("not a cursor", KEYS),
+        ("W10", KEYS),  # []
+        (encode_cursor("sideways", ["The Hop", 3]), KEYS),
+        (encode_cursor("next", ["The Hop"]), KEYS),
+        (encode_cursor("next", ["not a date", 3]), (Show.start_time, Show.id)),
+    ],
+)
+def test_bad_cursor_is_a_bad_request(app, cursor, keys):
+    with pytest.raises(BadRequest):
+        decode_cursor(cursor, keys)
+
+
+def test_bad_cursor_in_a_request_is_a_400(client):
+    assert client.get("/artists?cursor=not-a-cursor").status_code == 400
+    # The API pages by id alone.
+    cursor = encode_cursor("next", ["The Hop", 3])
+    assert client.get(f"/api/v1/venues?cursor={cursor}").status_code == 400
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_next_cursors_walk_every_row_once_in_order(app, stream):
+    pages = _pages(app, "next", stream=stream)
+    rows = [row for page in pages for row in page]
+    expected = [(row.name, row.id) for row in _query().order_by(*KEYS)]
+    assert rows == expected
+    assert all(len(page) == 7 for page in pages[:-1])
+
+
+def test_prev_cursors_walk_back_over_the_same_rows(app):
+    pages = _pages(app, "prev")
+    rows = [row for page in reversed(pages) for row in page]
+    assert rows == [(row.name, row.id) for row in _query().order_by(*KEYS)]
+
+
+def test_page_size_is_capped(app):
+    with app.test_request_context():
+        limit = app.config["MAX_PAGE_SIZE"]
+        page = paginate(_query(), KEYS, per_page=limit + 100)
+        assert len(page.items) == min(limit, _query().count())
+
+
+def test_pager_links_keep_the_other_arguments(client):
+    response = client.get("/artists?per_page=5&genre=Jazz")
+    html = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert "cursor=" in html and "per_page=5" in html and "genre=Jazz" in html
@@ -0,0 +1,74 @@
+import random
+
+import pytest
+from flask import g
+
+from models import db, Venue
+from routes import _form
+from routing import read_replica
+
+REPLICAS = ("replica0", "replica1")
+
+
+@pytest.fixture
+def routed(make_app, tmp_path):
+    # A second app on a primary and two replica files, each holding venue 1
+    # under its own name, so a read shows which database answered it.
+    routed = make_app(
+        SQLALCHEMY_BINDS={name: f"sqlite:///{tmp_path / name}.db" for name in REPLICAS}
+    )
+    with routed.app_context():
+        for bind, name in [(None, "primary"), *((r, r) for r in REPLICAS)]:
+            engine = db.get_engine(routed, bind=bind)
+            db.Model.metadata.create_all(engine)
+            with engine.begin() as connection:
+                connection.execute(
+                    Venue.__table__.insert(),
+                    {"id": 1, "version": 1, "name": name, "genres": []},
+                )
+    return routed
+
+
+def _read(client):
+    response = client.get("/api/v1/venues/1?fields=name")
+    assert response.status_code == 200
+    return response.get_json()["data"]["name"]
+
+
+def test_get_reads_from_the_replicas(routed):
+    client = routed.test_client()
+    assert {_read(client) for _ in range(50)} == set(REPLICAS)
+
+
+def test_writes_go_to_the_primary_and_pin_reads_to_it(routed):
+    client = routed.test_client()
+    form = _form(random.Random(1), "venue")
+    assert client.post("/venues/create", data=form).status_code == 200
+    with routed.app_context():
+        engines = {
+            name: db.get_engine(routed, bind=bind)
+            for bind, name in [(None, "primary"), *((r, r) for r in REPLICAS)]
+        }
+        for name, engine in engines.items():
+            with engine.connect() as connection:
+                names = set(connection.execute(db.select(Venue.name)).scalars())
+            assert (form["name"] in names) == (name == "primary")
+    # The client reads its own write for DB_STICKY_SECONDS...
+    assert {_read(client) for _ in range(10)} == {"primary"}
+    # ...and other clients keep reading the replicas.
+    assert _read(routed.test_client()) in REPLICAS
+
+
+def test_pinning_expires(routed, monkeypatch):
+    monkeypatch.setitem(routed.config, "DB_STICKY_SECONDS", 0)
+    client = routed.test_client()
+    client.post("/venues/create", data=_form(random.Random(2), "venue"))
+    assert _read(client) in REPLICAS
+
+
+def test_without_replicas_everything_uses_the_primary(app, monkeypatch):
+    assert app.extensions["db_replicas"] == []
+    with app.test_request_context("/venues"):
+        monkeypatch.delattr(g, "db_read_bind", raising=False)
+        assert read_replica(app) is None
+        assert db.session.get_bind(clause=db.select(Venue.id)) is db.engine
@@ -0,0 +1,161 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from importer import reject_conflicts
+from models import db, Show
+from scheduling import Calendar, IntervalIndex, booked_for, find_conflicts
+
+T = datetime(2030, 1, 1)
+
+
+def h(hours):
+    return T + timedelta(hours=hours)
+
+
+def test_interval_index():
+    index = IntervalIndex([(h(0), h(10)), (h(1), h(2)), (h(12), h(13))])
+    # A short interval after a long one is still found through the long one.
+    assert index.overlapping(h(5), h(6)) == (h(0), h(10))
+    assert index.overlapping(h(12), h(14)) == (h(12), h(13))
+    # Touching ends don't overlap.
+    assert index.overlapping(h(10), h(12)) is None
+    assert index.overlapping(h(13), h(20)) is None
+    assert index.overlapping(h(-2), h(0)) is None
+    assert IntervalIndex([]).overlapping(h(0), h(1)) is None
+
+
+def test_calendar():
+    calendar = Calendar([h(0), h(2), h(4), h(6), h(1)])
+    assert calendar.overlapping(h(0), h(9)) is None
+    calendar.add(h(2), h(4))
+    calendar.add(h(6), h(8))
+    assert calendar.overlapping(h(0), h(2)) is None
+    assert calendar.overlapping(h(4), h(6)) is None
+    assert calendar.overlapping(h(1), h(3)) == (h(2), h(4))
+    assert calendar.overlapping(h(3), h(5)) == (h(2), h(4))
+    assert calendar.overlapping(h(4), h(7)) == (h(6), h(8))
+    assert calendar.overlapping(h(0), h(10)) == (h(2), h(4))
+
+
+def test_find_conflicts_within_a_batch():
+    proposed = [
+        (1, 1, h(0), h(2)),
+        (1, 2, h(2), h(4)),  # back to back at venue 1
+        (1, 3, h(3), h(5)),  # overlaps the previous one at venue 1
+        (2, 1, h(1), h(3)),  # artist 1 is at venue 1 until 2h
+        (2, 3, h(4), h(6)),  # the rejected proposal didn't book artist 3
+    ]
+    assert find_conflicts(proposed) == [
+        None,
+        None,
+        ("venue", h(2), h(4)),
+        ("artist", h(0), h(2)),
+        None,
+    ]
+
+
+def test_find_conflicts_against_stored_bookings():
+    booked = [(1, 9, h(0), h(10)), (8, 2, h(20), h(22))]
+    proposed = [
+        (1, 1, h(10), h(11)),
+        (1, 1, h(9), h(10)),
+        (3, 2, h(21), h(23)),
+        (3, 2, h(22), h(23)),
+    ]
+    assert find_conflicts(proposed, booked) == [
+        None,
+        ("venue", h(0), h(10)),
+        ("artist", h(20), h(22)),
+        None,
+    ]
+
+
+def _naive(proposed, booked):
+    accepted = []
+    results = []
+    for venue_id, artist_id, start, end in proposed:
+        clash = None
+        for side, key in (("venue", 0), ("artist", 1)):
+            entity = (venue_id, artist_id)[key]
+            for other in [*accepted, *booked]:
+                if other[key] == entity and other[2] < end and start < other[3]:
+                    clash = True
+            if clash:
+                break
+        if not clash:
+            accepted.append((venue_id, artist_id, start, end))
+        results.append(clash)
+    return results
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_find_conflicts_matches_pairwise_checks(seed):
+    rng = random.Random(seed)
+
+    def booking():
+        start = h(rng.randrange(200))
+        return (rng.randrange(5), rng.randrange(5), start, start + timedelta(hours=2))
+
+    booked = [booking() for _ in range(50)]
+    proposed = [booking() for _ in range(300)]
+    found = [clash is not None for clash in find_conflicts(proposed, booked)]
+    assert found == [bool(clash) for clash in _naive(proposed, booked)]
+
+
+def test_booked_for_returns_overlapping_stored_shows(app):
+    show = Show.query.first()
+    proposed = [(show.venue_id, -1, show.start_time, show.end_time)]
+    booked = booked_for(proposed)
+    assert (show.venue_id, show.artist_id, show.start_time, show.end_time) in booked
+    assert all(
+        (venue_id == show.venue_id or artist_id == -1)
+        and start < show.end_time
+        and end > show.start_time
+        for venue_id, artist_id, start, end in booked
+    )
+    assert booked_for([]) == []
+
+
+def test_create_show_rejects_a_double_booking(client):
+    show = Show.query.first()
+    shows = Show.query.count()
+    response = client.post(
+        "/shows/create",
+        data={
+            "venue_id": str(show.venue_id),
+            "artist_id": str(show.artist_id),
+            "start_time": (show.start_time + timedelta(minutes=30)).strftime(
+                "%Y-%m-%d %H:%M:%S"
+            ),
+        },
+    )
+    assert response.status_code == 200
+    assert b"already booked" in response.data
+    assert Show.query.count() == shows
+
+
+def test_import_rejects_double_bookings(app):
+    show = Show.query.first()
+    start = show.start_time
+
+    def row(line, venue_id, artist_id, start):
+        values = dict(
+            venue_id=venue_id,
+            artist_id=artist_id,
+            start_time=start,
+            end_time=start + timedelta(hours=2),
+        )
+        return line, {"line": line}, values
+
+    batch = [
+        row(1, show.venue_id, -1, start + timedelta(hours=1)),  # stored show
+        row(2, -2, -3, start),
+        row(3, -2, -4, start + timedelta(hours=2)),  # back to back
+        row(4, -5, -3, start + timedelta(hours=1)),  # row 2's artist
+    ]
+    rejected = reject_conflicts(batch)
+    assert [line for line, _, _ in rejected] == [1, 4]
+    assert "venue_id" in rejected[0][2] and "artist_id" in rejected[1][2]
+    db.session.rollback()
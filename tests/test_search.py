@@ -0,0 +1,88 @@
+import pytest
+
+from models import db, Venue, Artist
+from search import search
+
+
+@pytest.fixture
+def venues(app):
+    # Rows added in the test's transaction (the FTS triggers fire in it too),
+    # rolled back after.
+    def add(name, city="Austin", state="TX", genres=("Jazz",)):
+        venue = Venue(
+            name=name, city=city, state=state, address="1 Main St", genres=list(genres)
+        )
+        db.session.add(venue)
+        db.session.flush()
+        return venue.id
+
+    yield add
+    db.session.rollback()
+
+
+def _found(model, term):
+    matches = search(model, term)
+    return [
+        name
+        for (name,) in db.session.query(model.name)
+        .join(matches, matches.c.id == model.id)
+        .order_by(matches.c.rank.desc(), model.id)
+    ]
+
+
+def test_matches_substrings_of_any_column_case_insensitively(venues):
+    venues("The Musical Zither")
+    venues("Zitherine Hall", city="Quuxville")
+    venues("Quiet Room", genres=["Zitherwave"])
+    assert _found(Venue, "usical zit") == ["The Musical Zither"]
+    assert set(_found(Venue, "ZITHER")) == {
+        "The Musical Zither",
+        "Zitherine Hall",
+        "Quiet Room",
+    }
+    assert _found(Venue, "quuxv") == ["Zitherine Hall"]
+    assert _found(Venue, "zitherzither") == []
+
+
+def test_rows_matching_in_more_columns_rank_first(venues):
+    venues("Zither Hall")
+    venues("Zither Lounge", city="Zither Falls", genres=["Zitherwave"])
+    assert _found(Venue, "zither") == ["Zither Lounge", "Zither Hall"]
+
+
+def test_short_terms_match_names_only(venues):
+    first = venues("Qx Lounge")
+    venues("Quiet Room", city="Qx")
+    matches = search(Venue, "qx")
+    assert [row.id for row in db.session.query(matches)] == [first]
+    # LIKE wildcards in the term are literal.
+    assert _found(Venue, "%") == []
+
+
+def test_quotes_in_the_term_are_literal(venues):
+    venues('The "Zither" Room')
+    assert _found(Venue, '"zither"') == ['The "Zither" Room']
+    assert _found(Venue, 'zither" OR "hall') == []
+
+
+def test_index_follows_updates_and_deletes(venues):
+    venue = db.session.get(Venue, venues("Zither Hall"))
+    venue.name = "Quux Hall"
+    db.session.flush()
+    assert _found(Venue, "zither") == []
+    assert _found(Venue, "quux") == ["Quux Hall"]
+    db.session.delete(venue)
+    db.session.flush()
+    assert _found(Venue, "quux") == []
+
+
+def test_limit(app):
+    matches = search(Artist, "the", limit=3)
+    assert db.session.query(matches).count() == 3
+
+
+def test_search_page_lists_matches(client):
+    artist = Artist.query.first()
+    response = client.post("/artists/search", data={"search_term": artist.name})
+    assert response.status_code == 200
+    assert artist.name in response.get_data(as_text=True)
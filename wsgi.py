@@ -0,0 +1,4 @@
+from app import create_app
+
+# The WSGI entry point for gunicorn (and `flask`, which finds it by name).
+app = create_app()